@@ -1,13 +1,24 @@
 import sys
 import time
-import pyautogui
 from botcity.core import DesktopBot
 from datetime import datetime
 import os
 import logging
-import pandas as pd
-import psycopg2
-from tqdm import tqdm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.database_manager import DatabaseManager
+from core.utils import read_excel_streaming
+from core.schema import PRECOS_API_SCHEMA, apply_schema, get_column_types
+from core.price_sync import PriceSync
+from core.price_history import PriceHistory
+from core.uniplus_interface import wait_until, screen_stable
+from core.file_watch import wait_for_saved_file
+from core.uniplus_session import UniplusSession
+from core.pipeline import Pipeline, Stage
+from core.lazy import lazy_import
+
+pyautogui = lazy_import('pyautogui')
+pd = lazy_import('pandas')
 
 #CREATE LOG FILE IN MEMORY
 # log_dir = r"G:\Meu Drive\Reports\Vendas\Diario\Log" ## alterar
@@ -27,6 +38,7 @@ output_folder = r'G:\Meu Drive\Reports\Estoque\precos_servidor'
 data_rel = datetime.now().strftime('%d_%m_%Y')
 data_rel_file = str(data_rel).replace('/','')
 file_name = f'precos_{data_rel_file}'
+refresh_mode = os.getenv('PRECOS_REFRESH_MODE', 'incremental') # incremental | swap | delete
 print(file_name)
 
 class Bot(DesktopBot):
@@ -44,18 +56,13 @@ class Bot(DesktopBot):
         def extracao_uniplus():
             def open_system():
                 try:
-                    self.execute(r"C:\ProgramData\Microsoft\Windows\Start Menu\Programs\Uniplus\Uniplus.lnk")
-                    self.execute(r"C:\ProgramData\Microsoft\Windows\Start Menu\Programs\Uniplus\Uniplus.lnk")
-                    time.sleep(1)
-                    self.key_esc()
-                    self.key_esc()
-                    self.key_esc()
-                    self.key_esc()
-                    self.key_esc()
-                    self.key_esc()
-                    self.key_esc()
-                    self.key_esc()
-                    self.key_esc()
+                    # Reaproveita o Uniplus já aberto por outro bot; só abre se não estiver rodando
+                    sessao = UniplusSession(os.getenv(
+                        'UNIPLUS_PATH', r"C:\ProgramData\Microsoft\Windows\Start Menu\Programs\Uniplus\Uniplus.lnk"
+                    ))
+                    if sessao.start() == 'launched':
+                        wait_until(screen_stable(stable_for=1.0), timeout=30)
+                    sessao.go_home()
                     logging.warning("Inicializacao Uniplus completa: %s \n", datetime.now())
                 except:
                     logging.error("Erro na inicializacao do Uniplus: %s \n", datetime.now())
@@ -70,27 +77,24 @@ class Bot(DesktopBot):
                 self.click()
 
             executar_com_repeticao(open_produtos)
-            time.sleep(10)
+            wait_until(screen_stable(stable_for=1.0), timeout=30)
 
             def ajuste_relatorio():
                 try:
-                    time.sleep(1)
                     self.tab()
-                    time.sleep(1)
+                    wait_until(screen_stable(stable_for=0.3), timeout=5)
                     self.kb_type('report_precos')
-                    time.sleep(1)
                     self.enter()
-                    time.sleep(1)
+                    wait_until(screen_stable(stable_for=0.3), timeout=5)
                     pyautogui.click(x=456, y=141) ## carregando a visão
-                    time.sleep(15)
+                    wait_until(screen_stable(stable_for=1.5), timeout=60)
                     self.tab()
                     self.tab()
                     self.tab()
-                    time.sleep(1)
                     self.enter()
-                    time.sleep(1)
+                    wait_until(screen_stable(stable_for=0.3), timeout=5)
                     pyautogui.click(x=1901, y=134) ## carregando a grade
-                    time.sleep(15)
+                    wait_until(screen_stable(stable_for=1.5), timeout=60)
                     logging.warning("Sucesso ao configurar o template do relatório: %s \n", datetime.now())
                 except:
                     logging.error("Erro ao tentar ajustar o template do relatório: %s \n", datetime.now())
@@ -100,7 +104,6 @@ class Bot(DesktopBot):
             def imprimir_relatorio():
                 try:
                     self.control_p()
-                    time.sleep(1)
                     if not self.find( "click_imagem_excel", matching=0.97, waiting_time=10000):
                         if not self.find_text( "click_excel_texto", threshold=230, waiting_time=10000):
                             self.not_found("click_excel_texto")
@@ -119,34 +122,32 @@ class Bot(DesktopBot):
             ##################### salvar o arquivo
             def salvando_xlsx(file_name, output_folder):
                 try:
-                    time.sleep(5)
+                    wait_until(screen_stable(stable_for=1.0), timeout=30)
                     ## val
                     # if not self.find( "find_arquivo", matching=0.97, waiting_time=10000):
                     #     if not self.find_text( "find_text_arquivo", threshold=230, waiting_time=10000):
                     #         self.not_found("find_text_arquivo")
-                    time.sleep(0.5)
                     self.key_f12()
-                    time.sleep(0.5)
+                    wait_until(screen_stable(stable_for=0.2), timeout=5)
                     self.kb_type(file_name)
-                    time.sleep(0.5)
                     self.key_f4()
-                    time.sleep(0.5)
+                    wait_until(screen_stable(stable_for=0.2), timeout=5)
                     self.control_a()
-                    time.sleep(0.5)
                     self.kb_type(output_folder)
-                    time.sleep(0.5)
                     self.enter()
-                    time.sleep(0.5)
+                    wait_until(screen_stable(stable_for=0.2), timeout=5)
+                    salvo_em = time.time()
                     self.type_keys(['alt', 's'])
                     # if not self.find( "confirmar_salvar_como", matching=0.97, waiting_time=10000):
                     #     if not self.find_text( "confirma_salvar_como", threshold=230, waiting_time=10000):
                     #         print('Não existe um arquivo igual')
-                    time.sleep(0.5)
                     # self.kb_type('s')
+                    # Só segue quando o xlsx estiver completo na pasta do Google Drive
+                    if wait_for_saved_file(os.path.join(output_folder, file_name + '.xlsx'), salvo_em, timeout=120) is None:
+                        raise Exception("arquivo não foi salvo")
                     logging.warning("Relatório salvo com sucesso: %s \n", datetime.now())
                 except:
                     logging.error("Erro ao salvar relatório na pasta do Google Drive: %s \n", datetime.now())
-                time.sleep(3)
 
                 try:
                     self.alt_f4()
@@ -159,17 +160,15 @@ class Bot(DesktopBot):
                 self.not_found("find_cadastro_produtos")
                 sys.exit()
 
-        executar_com_repeticao(extracao_uniplus)
-
         def process_file(file_name, output_folder):
             file_path = os.path.join(output_folder, file_name +'.xlsx')
             if file_path.endswith('.xls') or file_path.endswith('.xlsx'):
-                # Lê o arquivo Excel e carrega-o em um DataFrame
-                df = pd.read_excel(file_path)
-                # Define a segunda linha como cabeçalho
-                df.columns = df.iloc[0]
-                # Remove a primeira e as duas últimas linhas
-                df = df.iloc[1:-2]
+                # Lê o arquivo Excel em modo streaming, usando a segunda linha como cabeçalho
+                # e descartando as duas últimas linhas (rodapé)
+                df = read_excel_streaming(file_path, header_row=1, footer_rows=2)
+                if df is None:
+                    raise Exception(f"Erro ao ler o arquivo {file_path}")
+                df.index = df.index + 1 # mantém a numeração de linhas usada como id
                 os.remove(file_path)
                 print(df.columns)
                 return df
@@ -179,50 +178,82 @@ class Bot(DesktopBot):
                 print("O arquivo não é um arquivo Excel válido.")
 
 
-        df = executar_com_repeticao(process_file, file_name, output_folder)
-        print(df)
-
         def importar_df_railway(dataframe):
-            if dataframe is not None:
+            ## relatório sem linhas não substitui nem apaga os preços já carregados
+            if dataframe is not None and not dataframe.empty:
                 try:
+                    dataframe['id'] = dataframe.index #id
+                    dataframe['date_insert'] = datetime.now() #tag com hora
+                    print(dataframe)
+
+                    ## converte para os tipos declarados da tabela (preços numéricos, códigos em texto)
+                    carga = apply_schema(pd.DataFrame({
+                        'id': dataframe['id'],
+                        'date_insert': dataframe['date_insert'],
+                        'sku': dataframe['Código'],
+                        'ean': dataframe['Código de barras'],
+                        'preco_ultima_compra': dataframe['Preço unit.'],
+                        'preco_venda': dataframe['Valor do preço na última compra']
+                    }), PRECOS_API_SCHEMA)
+
                     # Conectar ao banco de dados
-                    postgres_conn = psycopg2.connect(
-                        ####conexão com o banco
-                    )
-                    with postgres_conn.cursor() as cursor:
-                        ## deleta todas as linhas da tabela
-                        cursor.execute("DELETE FROM precos_api")
-
-                        dataframe['id'] = dataframe.index #id
-                        dataframe['date_insert'] = datetime.now() #tag com hora
-                        dataframe = dataframe.astype(str)
-                        print(dataframe)
-
-
-                        # Iterar sobre as linhas do DataFrame e inserir os dados no banco de dados
-                        for index, row in tqdm(dataframe.iterrows(), total=len(dataframe)):
-                            data_tuple = (
-                                row['id'], row['date_insert'], row['Código'], row['Código de barras'],
-                                row['Preço unit.'],
-                                row['Valor do preço na última compra']
-                            )
-                            cursor.execute("""
-                                 INSERT INTO precos_api (
-                                     id, date_insert, sku, ean, preco_ultima_compra, preco_venda
-                                 ) VALUES (%s, %s, %s, %s, %s, %s)
-                             """, data_tuple)
-
-                    postgres_conn.commit()
-                    postgres_conn.close()
+                    with DatabaseManager() as db:
+                        db.ensure_table('precos_api', get_column_types(PRECOS_API_SCHEMA))
+                        if refresh_mode == 'delete':
+                            ## deleta todas as linhas da tabela e carrega tudo via COPY na mesma transação
+                            db.cursor.execute("DELETE FROM precos_api")
+                            db.insert_dataframe(carga, 'precos_api')
+                        elif refresh_mode == 'swap':
+                            ## carrega uma tabela sombra e troca pela atual com rename, sem deixar a API vazia
+                            db.replace_table(carga, 'precos_api')
+                        else:
+                            ## grava apenas os SKUs novos, alterados ou removidos desde a última carga
+                            ## e mantém o histórico de preços com valid_from/valid_to; as linhas são
+                            ## identificadas pelo sku e o id dos SKUs novos vem de uma sequência do banco
+                            PriceSync(db, id_column='id', history=PriceHistory(db)).sync(carga)
+
                     logging.warning("Relatório inserido no banco com sucesso: %s \n", datetime.now())
-                except:
-                    logging.error("Erro ao inserir o relatório no banco de dados: %s \n", datetime.now())
+                    return True
+                except Exception as e:
+                    ## relança para executar_com_repeticao tentar de novo e, esgotadas as tentativas, retornar None
+                    logging.error("Erro ao inserir o relatório no banco de dados: %s - %s \n", datetime.now(), e)
+                    raise
             else:
                 logging.warning("Dataframe vazio, nada a inserir no banco: %s \n", datetime.now())
+                return False
 
+        def extrair(nome):
+            try:
+                executar_com_repeticao(extracao_uniplus)
+            except SystemExit:
+                # tela de cadastro de produtos não encontrada: nada para ler nem carregar
+                return None
+            return nome
+
+        def ler(nome):
+            df = executar_com_repeticao(process_file, nome, output_folder)
+            print(df)
+            return df
+
+        def carregar(dataframe):
+            ## None descarta o item na etapa, então a carga só conta como feita se chegou ao banco
+            if not executar_com_repeticao(importar_df_railway, dataframe):
+                return None
+            return True
+
+        ## grafo de etapas: extração no Uniplus (GUI) -> leitura do xlsx -> carga no banco,
+        ## ligadas por filas limitadas como no bot de vendas por PDV
+        etapas = Pipeline('precos', [
+            Stage('extracao', extrair),
+            Stage('leitura', ler),
+            Stage('carga', carregar)
+        ])
         try:
-            executar_com_repeticao(importar_df_railway,df)
-            logging.warning("Processo finalizado com sucesso: %s \n", datetime.now())
+            stats = etapas.run([file_name])
+            if stats['carga']['processed']:
+                logging.warning("Processo finalizado com sucesso: %s \n", datetime.now())
+            else:
+                logging.error("Relatório não foi carregado no banco: %s \n", datetime.now())
         except:
             logging.error("Erro de importação no banco: %s \n", datetime.now())
 
@@ -1,25 +1,46 @@
+from __future__ import annotations
 import os
-import time
-import pandas as pd
 import shutil
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Optional, Set, Iterator
+from core.lazy import lazy_import
 from core.uniplus_interface import UniplusInterface
-from core.utils import setup_project_structure, read_excel_to_dataframe, save_dataframe_to_excel
+from core.navigation import get_route
+from concurrent.futures import ProcessPoolExecutor, Future
+from core.utils import setup_project_structure, save_dataframe_to_excel
 from core.database_manager import DatabaseManager
+from core.report_cache import ReportCache
+from core.file_watch import folder_lock, is_valid_xlsx
+from core.schema import VENDAS_PDV_SCHEMA, TABLE_UNIQUE_KEYS, get_column_types
+from core.tracing import span
+from core.pipeline import Pipeline, Stage
+from bots.vendas_pdv.parser import PARSER_VERSION, parse_report, process_dataframe
+
+pd = lazy_import('pandas')
+sql = lazy_import('psycopg2.sql')
 
 class VendasPdvBot(UniplusInterface):
     def __init__(self):
         super().__init__('vendas_pdv')
         self._setup_paths()
         self._setup_database_config()
-        self.db_manager = DatabaseManager()
+        self.db_manager = DatabaseManager(self.logger)
+        self.report_cache = ReportCache(
+            os.getenv('VENDAS_CACHE_DIR', os.path.join('cache', 'vendas_pdv')),
+            PARSER_VERSION,
+            max_bytes=int(os.getenv('REPORT_CACHE_MAX_MB', '512')) * 1024 * 1024,
+            logger=self.logger
+        )
         
     def _setup_paths(self):
         self.input_dir = os.getenv('VENDAS_INPUT_DIR', r'G:\Meu Drive\Reports\Vendas\Diario')
         self.output_dir = os.getenv('VENDAS_OUTPUT_DIR', r'G:\Meu Drive\Reports\Vendas\Diario\Processados')
         os.makedirs(self.input_dir, exist_ok=True)
         os.makedirs(self.output_dir, exist_ok=True)
+        self.backlog_workers = int(os.getenv('VENDAS_BACKLOG_WORKERS', str(min(4, os.cpu_count() or 1))))
+        # Menu path of the sales by PDV report (see core.navigation)
+        self.report_menu_path = ['vendas', 'relatorios', 'vendas_por_pdv']
         
     def _setup_database_config(self):
         self.db_connection_str = os.getenv('DB_CONNECTION_STR')
@@ -30,136 +51,252 @@ class VendasPdvBot(UniplusInterface):
             'v_venda', 'devolucao_troca', 'v_liquido', 'canc',
             'cliente', 'cnpj_cpf', 'finalizador', 'valor_finalizador'
         ]
+        self.unique_key = TABLE_UNIQUE_KEYS[self.table_name]
+        self._unique_key_ready = False
         
-    def _extract_report(self) -> bool:
+        # State of the stages of the current pipeline run
+        self._report_screen = None
+        self._parse_executor = None
+        self._pending_fed = threading.Event()
+        self._pending_fed.set()
+        self._input_lock = None
+        
+    def _start_run(self) -> None:
+        """Take the input folder, shared with the other jobs of this bot, then start the run"""
+        lock = folder_lock(self.input_dir)
+        if not lock.acquire(blocking=False):
+            self.logger.info(f"Waiting for another run using {self.input_dir}")
+            lock.acquire()
+        self._input_lock = lock
+        super()._start_run()
+        
+    def _end_run(self) -> None:
+        """End the run and release the input folder"""
         try:
-            # Open Uniplus
-            if not self.open_uniplus():
-                return False
-                
-            # Navigate to sales report
-            menu_path = ['vendas', 'relatorios', 'vendas_por_pdv']
-            if not self.navigate_to_menu(menu_path):
-                return False
-                
-            time.sleep(10)  # Wait for report to load
-            
-            # Try to find and click the Excel button using multiple methods
-            excel_button_found = False
+            super()._end_run()
+        finally:
+            lock, self._input_lock = self._input_lock, None
+            if lock is not None:
+                lock.release()
+        
+    def _open_report_screen(self) -> bool:
+        """Open Uniplus on the sales by PDV report"""
+        # Open Uniplus
+        if not self.open_uniplus():
+            return False
             
-            # Method 1: Try with primary image
-            if self._click_element(image_path='screenshots/excel_button_1.png'):
-                excel_button_found = True
-                self.logger.info("Found Excel button using primary image")
+        # Navigate to sales report
+        return self.navigate_to_menu(self.report_menu_path)
+        
+    def _export_range(self, start: date, end: date) -> Optional[str]:
+        """
+        Export the report of a date range from the open report screen
+        
+        Args:
+            start: First day of the range
+            end: Last day of the range
             
-            # Method 2: Try with secondary image
-            if not excel_button_found and self._click_element(image_path='screenshots/excel_button_2.png'):
-                excel_button_found = True
-                self.logger.info("Found Excel button using secondary image")
+        Returns:
+            Name of the saved file in input_dir, None on failure
+        """
+        # Try to find and click the Excel button using multiple methods
+        excel_button_found = False
+        route = get_route(self.report_menu_path)
+        
+        # Method 1: Try the images of the button that marks the report screen against
+        # the same screenshots, waiting for the report to load until one of them shows up
+        matched_image = self._click_any_element(route.expect, timeout=30)
+        if matched_image:
+            excel_button_found = True
+            self.logger.info(f"Found Excel button using image {matched_image}")
+        
+        # Method 2: Try with text recognition, reading only the report toolbar
+        if not excel_button_found:
+            excel_button_found = self._click_text(route.expect_text, region=self.screen_region(route.text_region))
+            if excel_button_found:
+                self.logger.info("Found Excel button using text recognition")
+        
+        if not excel_button_found:
+            self.logger.error("Could not find Excel export button")
+            return None
             
-            # Method 3: Try with text recognition
-            if not excel_button_found:
-                excel_button_found = self._click_text('Exportar para Excel')
-                if excel_button_found:
-                    self.logger.info("Found Excel button using text recognition")
+        self._wait_for_screen_stable()
+        
+        # Set date range
+        self._press_key('tab')
+        self._press_key('tab')
+        self._press_key('tab')
+        self._wait_for_screen_stable(stable_for=0.2)
+        
+        # The date inputs are masked and jump to the next field when full,
+        # so they are typed with keystrokes and cannot be read back
+        start_text = start.strftime('%d%m%Y')
+        end_text = end.strftime('%d%m%Y')
+        self._type_text(start_text, strategy='bulk')
+        self._wait_for_screen_stable(stable_for=0.2)
+        self._type_text(end_text, strategy='bulk')
+        self._press_key('f10')
+        
+        # Wait for the export to finish rendering
+        self._wait_for_screen_stable(timeout=30, stable_for=0.5)
+        
+        # Save report
+        filename = self._report_filename(start, end)
+        if not self.save_report(filename, self.input_dir):
+            return None
             
-            if not excel_button_found:
-                self.logger.error("Could not find Excel export button")
+        return filename
+        
+    @staticmethod
+    def _report_filename(start: date, end: date) -> str:
+        """Name of the exported file of a date range"""
+        if start == end:
+            return f'vendas_pdv_{start:%d%m%Y}.xlsx'
+        return f'vendas_pdv_{start:%d%m%Y}_{end:%d%m%Y}.xlsx'
+        
+    def _extract_report(self) -> bool:
+        try:
+            if not self._open_report_screen():
                 return False
                 
-            time.sleep(1)
+            today = datetime.now().date()
+            with span('export_report', start=str(today), end=str(today)):
+                return self._export_range(today, today) is not None
             
-            # Set date range
-            self._press_key('tab')
-            self._press_key('tab')
-            self._press_key('tab')
-            time.sleep(1)
+        except Exception as e:
+            self.logger.error(f"Error extracting report: {str(e)}")
+            return False
             
-            current_date = datetime.now().strftime('%d%m%Y')
-            self._type_text(current_date)
-            time.sleep(1)
-            self._type_text(current_date)
-            self._press_key('f10')
+    def _loaded_dates(self, start: date, end: date) -> Set[date]:
+        """
+        Get the days of a range that already have sales in the table
+        
+        Args:
+            start: First day of the range
+            end: Last day of the range
             
-            time.sleep(2)
+        Returns:
+            Set of loaded days (empty if the table does not exist yet)
+        """
+        if not self.db_manager.connection:
+            self.db_manager.connect()
+        try:
+            self.db_manager.cursor.execute(
+                sql.SQL("SELECT DISTINCT emissao::date FROM {} WHERE emissao::date BETWEEN %s AND %s").format(
+                    sql.Identifier(self.table_name)
+                ),
+                (start, end)
+            )
+            return {row[0] for row in self.db_manager.cursor.fetchall()}
+        except Exception as e:
+            self.db_manager.rollback()
+            self.logger.warning(f"Could not read loaded dates, exporting the whole range: {str(e)}")
+            return set()
             
-            # Save report
-            filename = f'vendas_pdv_{current_date}.xlsx'
-            if not self.save_report(filename, self.input_dir):
-                return False
+    @staticmethod
+    def _missing_ranges(start: date, end: date, loaded: Set[date], chunk_days: int) -> List[tuple]:
+        """
+        Split the days of a range that are not loaded into export ranges
+        
+        Ranges only cover consecutive missing days, so loaded days are never
+        exported again, and hold at most chunk_days days each.
+        
+        Args:
+            start: First day of the range
+            end: Last day of the range
+            loaded: Days that are already loaded
+            chunk_days: Maximum number of days per export
+            
+        Returns:
+            List of (first day, last day) tuples
+        """
+        ranges = []
+        current = None
+        day = start
+        while day <= end:
+            if day in loaded:
+                current = None
+            elif current and (day - current[0]).days < chunk_days:
+                current[1] = day
+            else:
+                current = [day, day]
+                ranges.append(current)
+            day += timedelta(days=1)
+        return [tuple(current) for current in ranges]
+        
+    def run_backfill(self, start: date, end: date, chunk_days: int = 1) -> Dict[str, int]:
+        """
+        Export and load the sales of a date range in one Uniplus session
+        
+        Uniplus is opened and navigated once; each export only reopens the
+        Excel dialog and retypes the dates. Days already present in the table
+        are skipped. Each exported file is parsed and loaded while the next
+        range is being exported.
+        
+        Args:
+            start: First day to load
+            end: Last day to load
+            chunk_days: Maximum number of days per exported file
+            
+        Returns:
+            Dict with the number of skipped days, exported and failed ranges
+            and loaded files
+        """
+        self.logger.info(f"Starting Vendas PDV backfill from {start:%d/%m/%Y} to {end:%d/%m/%Y}")
+        self._start_run()
+        result = {'skipped_days': 0, 'exported': 0, 'failed': 0, 'loaded': 0}
+        
+        try:
+            loaded = self._loaded_dates(start, end)
+            result['skipped_days'] = len(loaded)
+            ranges = self._missing_ranges(start, end, loaded, max(1, chunk_days))
+            self.logger.info(f"{len(loaded)} days already loaded, {len(ranges)} ranges to export")
+            if not ranges:
+                return result
                 
-            return True
+            stats = self._run_pipeline(ranges)
+            result['exported'] = stats['export']['processed']
+            result['failed'] = len(ranges) - result['exported']
+            result['loaded'] = stats['load']['processed']
+                
+            return result
             
-        except Exception as e:
-            self.logger.error(f"Error extracting report: {str(e)}")
-            return False
+        finally:
+            self._finish_run(f"Vendas PDV backfill completed: {result}")
             
     def _process_file(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
         try:
-            # Find the row with 'PDV' value
-            pdv_index = df[df.iloc[:, 0] == 'PDV'].index[0]
-            
-            # Set the header
-            df.columns = df.iloc[pdv_index]
-            
-            # Filter rows where PDV is 1, 2, or 3
-            df['PDV'] = df['PDV'].astype(str)
-            df = df[df['PDV'].isin(['1', '2', '3'])]
-            df.reset_index(drop=True, inplace=True)
-            
-            # Remove rows with empty Documento
-            df = df.dropna(subset=['Documento'])
-            
-            # Rename columns
-            column_mapping = {
-                'PDV': 'pdv',
-                'Filial': 'filial',
-                'Usuário': 'usuario',
-                'Vendedor': 'vendedor',
-                'Emissão': 'emissao',
-                'Hora': 'hora',
-                'Documento': 'documento',
-                'CCF': 'ccf',
-                'V.bruto': 'v_bruto',
-                'Desconto': 'desconto',
-                'Acréscimo': 'acrescimo',
-                'V.venda': 'v_venda',
-                'Devolução/Troca': 'devolucao_troca',
-                'V.líquido': 'v_liquido',
-                'Canc.': 'canc',
-                'Cliente': 'cliente',
-                'Cnpj/Cpf': 'cnpj_cpf',
-                'Finalizador': 'finalizador',
-                'Valor finalizador': 'valor_finalizador'
-            }
-            df = df.rename(columns=column_mapping)
-            df = df.astype(str)
-            
-            return df
+            return process_dataframe(df)
             
         except Exception as e:
             self.logger.error(f"Error processing file: {str(e)}")
             return None
             
+    def _read_file(self, file_path: str) -> Optional[pd.DataFrame]:
+        try:
+            with span('parse_report', file=os.path.basename(file_path)):
+                return parse_report(file_path, self.report_cache)
+            
+        except Exception as e:
+            self.logger.error(f"Error reading file: {str(e)}")
+            return None
+            
     def _insert_to_database(self, df: pd.DataFrame) -> bool:
         try:
-            # Get existing data
-            query = f'SELECT {", ".join(self.columns)} FROM {self.table_name}'
-            df_existing = self.db_manager.execute_query(query)
-            
-            # Convert NaN to None
-            df = df.where(pd.notna(df), None)
-            
-            # Find new records
-            merge_cols = ['emissao', 'hora', 'documento']
-            df_new = pd.merge(df, df_existing, on=merge_cols, how='left', indicator=True)
-            df_new = df_new[df_new['_merge'] == 'left_only'].drop('_merge', axis=1)
-            df_new = df_new.rename(columns={f"{col}_x": col for col in self.columns})
-            
-            if not df_new.empty:
-                # Insert new records
-                self.db_manager.insert_dataframe(df_new, self.table_name)
-                self.logger.info(f"Inserted {len(df_new)} new records")
+            # Make sure the declared column types and the unique key used for deduplication exist
+            if not self._unique_key_ready:
+                self.db_manager.ensure_table(self.table_name, get_column_types(VENDAS_PDV_SCHEMA))
+                self.db_manager.ensure_unique_index(self.table_name, self.unique_key)
+                self._unique_key_ready = True
+            
+            # Keep only the columns that exist in the table
+            df = df[[col for col in self.columns if col in df.columns]]
+            
+            # Insert new records, existing emissao/hora/documento keys are skipped by the database
+            inserted = self.db_manager.upsert_dataframe(df, self.table_name, self.unique_key)
+            
+            if inserted:
+                self.logger.info(f"Inserted {inserted} new records")
             else:
                 self.logger.info("No new records to insert")
                 
@@ -180,47 +317,243 @@ class VendasPdvBot(UniplusInterface):
             self.logger.error(f"Error moving file: {str(e)}")
             return False
             
-    def run(self):
-        self.logger.info("Starting Vendas PDV bot")
-        self.is_running = True
+    def run_backlog(self, excel_files: List[str], workers: Optional[int] = None) -> Dict[str, int]:
+        """
+        Parse many report files in a process pool and load them with a single writer
         
-        try:
-            # Extract report from Uniplus
-            if not self._extract_report():
-                self.logger.error("Failed to extract report")
-                return
-                
-            # Get list of Excel files
-            excel_files = [f for f in os.listdir(self.input_dir) if f.endswith('.xlsx')]
+        Files are loaded in the order they were saved. A file is moved to
+        output_dir only after its rows are committed; files that fail to parse
+        or load stay in input_dir for the next run, as do the files left when
+        the user stops the bot.
+        
+        Args:
+            excel_files: Names of the files in input_dir
+            workers: Number of parser processes (default: VENDAS_BACKLOG_WORKERS)
             
-            if not excel_files:
-                self.logger.info("No files to process")
-                return
-                
-            for file in excel_files:
-                file_path = os.path.join(self.input_dir, file)
-                self.logger.info(f"Processing file: {file}")
-                
-                # Read and process file
-                df = read_excel_to_dataframe(file_path)
-                if df is None:
-                    continue
+        Returns:
+            Dict with the number of loaded and failed files
+        """
+        workers = workers or self.backlog_workers
+        file_paths = sorted(
+            (os.path.join(self.input_dir, f) for f in excel_files),
+            key=os.path.getmtime
+        )
+        self.logger.info(f"Processing backlog of {len(file_paths)} files with {workers} workers")
+        result = {'loaded': 0, 'failed': 0}
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (file_path, executor.submit(parse_report, file_path, self.report_cache))
+                for file_path in file_paths
+            ]
+            
+            for file_path, future in futures:
+                if self.stop_requested:
+                    self.logger.warning("Backlog interrupted, remaining files stay in the input folder")
+                    for _, pending in futures:
+                        pending.cancel()
+                    break
                     
-                processed_df = self._process_file(df)
-                if processed_df is None:
+                try:
+                    processed_df = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error parsing {os.path.basename(file_path)}: {str(e)}")
+                    result['failed'] += 1
                     continue
                     
-                # Insert to database
                 if not self._insert_to_database(processed_df):
+                    result['failed'] += 1
                     continue
                     
-                # Move processed file
                 self._move_processed_file(file_path)
+                result['loaded'] += 1
+                
+        # The parser processes stored entries without evicting any
+        self.report_cache.evict()
+        self.logger.info(f"Backlog finished: {result['loaded']} files loaded, {result['failed']} failed")
+        return result
+        
+    def _load_pending_files(self) -> None:
+        """Parse and load every report waiting in input_dir"""
+        file_paths = self._pending_files()
+        
+        if not file_paths:
+            self.logger.info("No files to process")
+            return
+            
+        # Several pending files (e.g. after an outage) are parsed in parallel
+        if len(file_paths) > 1 and self.backlog_workers > 1:
+            self.run_backlog([os.path.basename(file_path) for file_path in file_paths])
+            return
+            
+        for file_path in file_paths:
+            self.logger.info(f"Processing file: {os.path.basename(file_path)}")
+            
+            # Read and process file
+            processed_df = self._read_file(file_path)
+            if processed_df is None:
+                continue
+                
+            # Insert to database
+            if not self._insert_to_database(processed_df):
+                continue
+                
+            # Move processed file
+            self._move_processed_file(file_path)
+            
+    def _pending_files(self, exclude: Optional[Set[str]] = None) -> List[str]:
+        """
+        Paths of the reports waiting in input_dir, oldest first
+        
+        Files that are not complete xlsx packages yet (Uniplus or Google Drive
+        still writing them) are left for the next run.
+        """
+        exclude = exclude or set()
+        file_paths = []
+        for f in os.listdir(self.input_dir):
+            if not f.endswith('.xlsx') or f in exclude:
+                continue
+            file_path = os.path.join(self.input_dir, f)
+            if not is_valid_xlsx(file_path):
+                self.logger.warning(f"Skipping {f}: not a complete xlsx file yet")
+                continue
+            file_paths.append(file_path)
+        return sorted(file_paths, key=os.path.getmtime)
+        
+    def _export_stage(self, day_range: tuple) -> Optional[str]:
+        """Pipeline stage: export a date range, opening the report screen on first use"""
+        start, end = day_range
+        if self.stop_requested:
+            self.logger.warning(f"Run interrupted, skipping export of {start:%d/%m/%Y} to {end:%d/%m/%Y}")
+            return None
+        if self._report_screen is None:
+            self._report_screen = self._open_report_screen()
+            if not self._report_screen:
+                self.logger.error("Failed to open the sales report screen")
+        if not self._report_screen:
+            return None
+            
+        with span('export_report', start=str(start), end=str(end)):
+            filename = self._export_range(start, end)
+        # Reports already on disk are older, so they enter the parse stage first
+        self._pending_fed.wait()
+        return os.path.join(self.input_dir, filename) if filename else None
+        
+    def _feed_pending(self, files: List[str]) -> Iterator[str]:
+        """Source of the parse stage that flags when every file on disk is queued"""
+        try:
+            yield from files
+        finally:
+            self._pending_fed.set()
+        
+    def _parse_stage(self, file_path: str) -> tuple:
+        """
+        Pipeline stage: parse a report file, or submit it to the process pool when there is one
+        
+        With the pool the stage returns as soon as the file is submitted, so
+        several files are parsed at once while the load stage still gets
+        them in the order they entered the pipeline (oldest first).
+        """
+        self.logger.info(f"Processing file: {os.path.basename(file_path)}")
+        if self._parse_executor:
+            return file_path, self._parse_executor.submit(parse_report, file_path, self.report_cache)
+        with span('parse_report', file=os.path.basename(file_path)):
+            df = parse_report(file_path, self.report_cache)
+        return file_path, df
+        
+    def _load_stage(self, parsed: tuple) -> Optional[str]:
+        """Pipeline stage: insert the rows of a report and move its file to output_dir"""
+        file_path, df = parsed
+        if isinstance(df, Future):
+            with span('parse_report', file=os.path.basename(file_path)):
+                df = df.result()
+        if not self._insert_to_database(df):
+            return None
+        self._move_processed_file(file_path)
+        return file_path
+        
+    def _run_pipeline(self, ranges: List[tuple], files: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Export date ranges and load them together with files already on disk
+        
+        The stage graph is export (GUI, one thread) -> parse -> load (single
+        writer). Queues between the stages are bounded, so Uniplus exports the
+        next range while the previous report is parsed and inserted. Reports
+        are loaded in the order they reach the parse stage: the files on disk
+        first, then the exported ranges.
+        
+        Args:
+            ranges: (first day, last day) tuples to export
+            files: Report paths that skip the export stage, oldest first
+            
+        Returns:
+            Statistics of each stage (see Pipeline.run)
+        """
+        files = files or []
+        # Several files on disk (e.g. after an outage) are parsed in parallel processes;
+        # the load queue holds one submitted file per process
+        workers = self.backlog_workers if len(files) > 1 else 1
+        self._report_screen = None
+        self._parse_executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        self._pending_fed.clear()
+        try:
+            pipeline = Pipeline('vendas_pdv', [
+                Stage('export', self._export_stage),
+                Stage('parse', self._parse_stage),
+                Stage('load', self._load_stage, queue_size=max(2, workers))
+            ], logger=self.logger)
+            return pipeline.run(sources={'export': ranges, 'parse': self._feed_pending(files)})
+            
+        finally:
+            self._pending_fed.set()
+            if self._parse_executor:
+                self._parse_executor.shutdown()
+                self._parse_executor = None
+                # The parser processes stored entries without evicting any
+                self.report_cache.evict()
+                
+    def _finish_run(self, message: str) -> None:
+        """Release the database connection and write the trace of the run"""
+        self.db_manager.close()
+        if self.db_manager.pool:
+            self.logger.info(f"Database pool metrics: {self.db_manager.pool.get_metrics()}")
+        self._end_run()
+        self.logger.info(message)
+        
+    def load_pending(self):
+        """
+        Load the reports already saved in input_dir without opening Uniplus
+        
+        DB-only stage, safe to run while another bot uses the desktop.
+        """
+        self.logger.info("Loading pending Vendas PDV reports")
+        self._start_run()
+        
+        try:
+            self._load_pending_files()
+            
+        except Exception as e:
+            self.logger.error(f"Error loading pending reports: {str(e)}")
+            raise
+            
+        finally:
+            self._finish_run("Vendas PDV pending reports loaded")
+            
+    def run(self):
+        self.logger.info("Starting Vendas PDV bot")
+        self._start_run()
+        
+        try:
+            # Reports left by previous runs are loaded while today's one is exported
+            today = datetime.now().date()
+            pending = self._pending_files(exclude={self._report_filename(today, today)})
+            stats = self._run_pipeline([(today, today)], pending)
+            if not stats['export']['processed']:
+                self.logger.error("Failed to extract report")
                 
         except Exception as e:
             self.logger.error(f"Error in bot execution: {str(e)}")
             raise
             
         finally:
-            self.is_running = False
-            self.logger.info("Vendas PDV bot completed") 
\ No newline at end of file
+            self._finish_run("Vendas PDV bot completed")
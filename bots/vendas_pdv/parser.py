@@ -0,0 +1,110 @@
+"""
+Reading and cleaning of the sales by PDV report, with no GUI dependencies
+"""
+from __future__ import annotations
+from typing import Optional
+from core.lazy import lazy_import
+from core.utils import iter_excel_chunks
+from core.report_cache import ReportCache
+from core.schema import VENDAS_PDV_SCHEMA, apply_schema
+
+pd = lazy_import('pandas')
+
+# Bump whenever process_dataframe changes so cached reports are parsed again
+PARSER_VERSION = '2'
+
+COLUMN_MAPPING = {
+    'PDV': 'pdv',
+    'Filial': 'filial',
+    'Usuário': 'usuario',
+    'Vendedor': 'vendedor',
+    'Emissão': 'emissao',
+    'Hora': 'hora',
+    'Documento': 'documento',
+    'CCF': 'ccf',
+    'V.bruto': 'v_bruto',
+    'Desconto': 'desconto',
+    'Acréscimo': 'acrescimo',
+    'V.venda': 'v_venda',
+    'Devolução/Troca': 'devolucao_troca',
+    'V.líquido': 'v_liquido',
+    'Canc.': 'canc',
+    'Cliente': 'cliente',
+    'Cnpj/Cpf': 'cnpj_cpf',
+    'Finalizador': 'finalizador',
+    'Valor finalizador': 'valor_finalizador'
+}
+
+def process_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep the sales rows of PDVs 1-3 and rename the columns to the table names
+
+    Args:
+        df: Raw report rows, with or without the 'PDV' header applied
+
+    Returns:
+        Processed DataFrame
+    """
+    # Find the row with 'PDV' value, unless the reader already used it as header
+    if 'PDV' not in df.columns:
+        pdv_index = df[df.iloc[:, 0] == 'PDV'].index[0]
+
+        # Set the header
+        df.columns = df.iloc[pdv_index]
+
+    # Filter rows where PDV is 1, 2, or 3
+    df['PDV'] = df['PDV'].astype(str)
+    df = df[df['PDV'].isin(['1', '2', '3'])]
+    df.reset_index(drop=True, inplace=True)
+
+    # Remove rows with empty Documento
+    df = df.dropna(subset=['Documento'])
+
+    # Rename columns and convert values to the declared types
+    df = df.rename(columns=COLUMN_MAPPING)
+    df = apply_schema(df, VENDAS_PDV_SCHEMA)
+
+    return df
+
+def parse_report(file_path: str, report_cache: Optional[ReportCache] = None) -> pd.DataFrame:
+    """
+    Read and process a sales report file
+
+    Runs in worker processes during backlog ingestion, so it must stay free
+    of GUI dependencies and return picklable results.
+
+    Args:
+        file_path: Path to the xlsx report
+        report_cache: Cache of parsed reports (optional)
+
+    Returns:
+        Processed DataFrame
+    """
+    # Reports already parsed by a previous (failed) run come from the cache;
+    # the content is hashed once for the lookup and the store
+    content_hash = None
+    if report_cache is not None:
+        content_hash = report_cache.file_hash(file_path)
+        cached_df = report_cache.get(file_path, content_hash)
+        if cached_df is not None:
+            return cached_df
+
+    # Stream the sheet from the 'PDV' header row and filter each chunk as it arrives
+    processed_chunks = [
+        process_dataframe(chunk)
+        for chunk in iter_excel_chunks(file_path, header_marker='PDV')
+    ]
+    # A header without rows (no sales that day) still yields one empty chunk
+    if not processed_chunks:
+        raise ValueError(f"No 'PDV' header row found in {file_path}")
+
+    processed_df = pd.concat(processed_chunks, ignore_index=True)
+
+    # Each chunk has its own categories and concat falls back to object for them
+    for column in VENDAS_PDV_SCHEMA:
+        if column.kind == 'category' and column.name in processed_df.columns:
+            processed_df[column.name] = processed_df[column.name].astype('category')
+
+    if report_cache is not None:
+        report_cache.put(file_path, processed_df, content_hash)
+    return processed_df
@@ -1,26 +1,50 @@
 import os
+import time
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
 import pandas as pd
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
 from bots.vendas_pdv.bot import VendasPdvBot
+from bots.vendas_pdv.parser import parse_report
+from core.database_manager import close_pool
+from core.file_watch import folder_lock
+from core.navigation import NAVIGATION_MAP, get_route
 
 class TestVendasPdvBot(unittest.TestCase):
     def setUp(self):
+        # Reports, cache and traces of the runs stay out of the working directory
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            'VENDAS_INPUT_DIR': os.path.join(self.temp_dir.name, 'input'),
+            'VENDAS_OUTPUT_DIR': os.path.join(self.temp_dir.name, 'output'),
+            'VENDAS_CACHE_DIR': os.path.join(self.temp_dir.name, 'cache'),
+            'TRACE_ENABLED': '0'
+        })
+        self.env.start()
         self.bot = VendasPdvBot()
         
-    @patch('core.uniplus_interface.UniplusInterface._click_element')
+    def tearDown(self):
+        self.bot.db_manager.close()
+        close_pool()
+        self.env.stop()
+        self.temp_dir.cleanup()
+        
+    @patch('core.uniplus_interface.UniplusInterface._wait_for_screen_stable')
+    @patch('core.uniplus_interface.UniplusInterface._click_any_element')
     @patch('core.uniplus_interface.UniplusInterface._press_key')
     @patch('core.uniplus_interface.UniplusInterface._type_text')
     @patch('core.uniplus_interface.UniplusInterface.save_report')
     @patch('core.uniplus_interface.UniplusInterface.navigate_to_menu')
     @patch('core.uniplus_interface.UniplusInterface.open_uniplus')
     def test_extract_report(self, mock_open_uniplus, mock_navigate_menu, mock_save_report, 
-                          mock_type_text, mock_press_key, mock_click_element):
+                          mock_type_text, mock_press_key, mock_click_any_element, mock_wait_stable):
         # Configure mocks
         mock_open_uniplus.return_value = True
         mock_navigate_menu.return_value = True
-        mock_click_element.return_value = True
+        mock_click_any_element.return_value = 'botao_excel.png'
         mock_save_report.return_value = True
         
         # Test successful extraction
@@ -30,10 +54,20 @@ class TestVendasPdvBot(unittest.TestCase):
         # Verify method calls
         mock_open_uniplus.assert_called_once()
         mock_navigate_menu.assert_called_once_with(['vendas', 'relatorios', 'vendas_por_pdv'])
-        mock_click_element.assert_called_once()
+        mock_click_any_element.assert_called_once()
         self.assertEqual(mock_press_key.call_count, 4)  # 3 tabs + F10
         self.assertEqual(mock_type_text.call_count, 2)  # Start and end date
         
+    def test_navigation_images_exist(self):
+        # Every image declared in the navigation map is a checked-in template of the bot
+        screenshot_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'screenshots')
+        for menu_path, options in NAVIGATION_MAP.items():
+            route = get_route(list(menu_path))
+            declared = route.expect + [path for level in options.get('templates', []) for path in level]
+            self.assertTrue(declared)
+            for path in declared:
+                self.assertTrue(os.path.isfile(os.path.join(screenshot_dir, path)), f"{'/'.join(menu_path)}: {path}")
+        
     def test_process_file(self):
         # Create test DataFrame
         data = {
@@ -60,13 +94,29 @@ class TestVendasPdvBot(unittest.TestCase):
         self.assertIn('v_bruto', result.columns)
         self.assertIn('v_venda', result.columns)
         
+    def test_parse_report_without_sales(self):
+        with tempfile.TemporaryDirectory() as input_dir:
+            file_path = os.path.join(input_dir, 'vendas_pdv_01012024.xlsx')
+            
+            # A day without sales has the header and no rows
+            pd.DataFrame([['Vendas por PDV', None], ['PDV', 'Documento']]).to_excel(file_path, index=False, header=False)
+            result = parse_report(file_path)
+            self.assertTrue(result.empty)
+            self.assertEqual(str(result['pdv'].dtype), 'Int64')
+            
+            # Without the header the file is not a sales report
+            pd.DataFrame([['Vendas por PDV', None]]).to_excel(file_path, index=False, header=False)
+            with self.assertRaises(ValueError):
+                parse_report(file_path)
+        
     @patch('psycopg2.connect')
-    @patch('pandas.read_sql_query')
-    def test_insert_to_database(self, mock_read_sql, mock_connect):
+    def test_insert_to_database(self, mock_connect):
         # Create test DataFrame
         data = {
             'pdv': ['1', '2'],
             'filial': ['001', '001'],
+            'emissao': ['01/01/2024', '01/01/2024'],
+            'hora': ['10:00:00', '10:05:00'],
             'documento': ['123', '456'],
             'v_bruto': ['100', '200'],
             'v_venda': ['90', '180'],
@@ -77,19 +127,24 @@ class TestVendasPdvBot(unittest.TestCase):
         # Configure mocks
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
+        mock_cursor.rowcount = 2
+        mock_conn.closed = 0
         mock_connect.return_value = mock_conn
         mock_conn.cursor.return_value = mock_cursor
-        mock_read_sql.return_value = pd.DataFrame()  # No existing data
         
         # Test insertion
         result = self.bot._insert_to_database(df)
         self.assertTrue(result)
         
-        # Verify database operations
+        # Verify database operations: rows are copied into staging, never read back
         mock_connect.assert_called_once()
-        mock_read_sql.assert_called_once()
-        mock_cursor.close.assert_called_once()
-        mock_conn.close.assert_called_once()
+        mock_cursor.copy_expert.assert_called_once()
+        executed = [str(c.args[0]) for c in mock_cursor.execute.call_args_list]
+        self.assertTrue(any('ON CONFLICT' in q for q in executed))
+        # Only the schema and index checks may SELECT; table rows are never read
+        row_queries = [q for q in executed if 'information_schema' not in q and 'regtype' not in q
+                       and 'to_regclass' not in q]
+        self.assertFalse(any('SELECT' in q and 'INSERT' not in q for q in row_queries))
         
     @patch('shutil.move')
     def test_move_processed_file(self, mock_move):
@@ -104,25 +159,267 @@ class TestVendasPdvBot(unittest.TestCase):
             os.path.join(self.bot.output_dir, os.path.basename(test_file))
         )
         
-    @patch('bots.vendas_pdv.bot.VendasPdvBot._extract_report')
-    @patch('bots.vendas_pdv.bot.VendasPdvBot._process_file')
+    @patch('bots.vendas_pdv.bot.ProcessPoolExecutor', ThreadPoolExecutor)
+    @patch('bots.vendas_pdv.bot.parse_report')
     @patch('bots.vendas_pdv.bot.VendasPdvBot._insert_to_database')
     @patch('bots.vendas_pdv.bot.VendasPdvBot._move_processed_file')
-    def test_run(self, mock_move, mock_insert, mock_process, mock_extract):
-        # Configure mocks
-        mock_extract.return_value = True
-        mock_process.return_value = pd.DataFrame()
+    @patch('os.path.getmtime')
+    def test_run_backlog(self, mock_getmtime, mock_move, mock_insert, mock_parse):
+        # Configure mocks: the second file fails to parse
+        files = ['vendas_pdv_01012024.xlsx', 'vendas_pdv_02012024.xlsx', 'vendas_pdv_03012024.xlsx']
+        mock_getmtime.side_effect = lambda path: files.index(os.path.basename(path))
+        mock_parse.side_effect = [pd.DataFrame({'pdv': ['1']}), ValueError('corrupt'), pd.DataFrame({'pdv': ['2']})]
+        mock_insert.return_value = True
+        
+        # Test backlog processing
+        result = self.bot.run_backlog(files, workers=2)
+        
+        # Only the files whose rows were inserted are moved, in order
+        self.assertEqual(result, {'loaded': 2, 'failed': 1})
+        self.assertEqual(mock_insert.call_count, 2)
+        moved = [os.path.basename(c.args[0]) for c in mock_move.call_args_list]
+        self.assertEqual(moved, [files[0], files[2]])
+        
+    @patch('bots.vendas_pdv.bot.ProcessPoolExecutor', ThreadPoolExecutor)
+    @patch('bots.vendas_pdv.bot.parse_report')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._insert_to_database')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._move_processed_file')
+    @patch('os.path.getmtime')
+    def test_run_backlog_stops_on_user_stop(self, mock_getmtime, mock_move, mock_insert, mock_parse):
+        # Configure mocks: the bot sends ESC while loading the first file and the user presses it after
+        files = ['vendas_pdv_01012024.xlsx', 'vendas_pdv_02012024.xlsx', 'vendas_pdv_03012024.xlsx']
+        mock_getmtime.side_effect = lambda path: files.index(os.path.basename(path))
+        mock_parse.return_value = pd.DataFrame({'pdv': ['1']})
+        
+        def insert(df):
+            if mock_insert.call_count == 1:
+                with self.bot.own_keys():
+                    self.bot.emergency_stop()
+            else:
+                self.bot._own_keys_until = 0.0
+                self.bot.emergency_stop()
+            return True
+            
+        mock_insert.side_effect = insert
+        
+        # Test backlog processing
+        result = self.bot.run_backlog(files, workers=2)
+        
+        # The bot's own ESC is ignored; the user's stop leaves the last file in the input folder
+        self.assertTrue(self.bot.stop_requested)
+        self.assertEqual(result, {'loaded': 2, 'failed': 0})
+        moved = [os.path.basename(c.args[0]) for c in mock_move.call_args_list]
+        self.assertEqual(moved, files[:2])
+        
+    @patch('bots.vendas_pdv.bot.ProcessPoolExecutor', ThreadPoolExecutor)
+    @patch('bots.vendas_pdv.bot.parse_report')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._insert_to_database')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._move_processed_file')
+    def test_run_pipeline_loads_oldest_first(self, mock_move, mock_insert, mock_parse):
+        # Configure mocks: the oldest file takes the longest to parse
+        files = ['vendas_pdv_01012024.xlsx', 'vendas_pdv_02012024.xlsx', 'vendas_pdv_03012024.xlsx']
+        newer_parsed = threading.Event()
+        
+        def parse(file_path, cache):
+            if os.path.basename(file_path) == files[0]:
+                newer_parsed.wait(5)
+            else:
+                newer_parsed.set()
+            return pd.DataFrame({'pdv': ['1']})
+            
+        mock_parse.side_effect = parse
+        mock_insert.return_value = True
+        self.bot.backlog_workers = 3
+        
+        # Test loading files already on disk
+        stats = self.bot._run_pipeline([], files)
+        
+        # Files were parsed in parallel but loaded in the order they were given
+        self.assertTrue(newer_parsed.is_set())
+        self.assertEqual(stats['load']['processed'], 3)
+        moved = [os.path.basename(c.args[0]) for c in mock_move.call_args_list]
+        self.assertEqual(moved, files)
+        
+    @patch('bots.vendas_pdv.bot.parse_report')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._insert_to_database')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._move_processed_file')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._export_range')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._open_report_screen')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._loaded_dates')
+    def test_run_backfill(self, mock_loaded, mock_open_screen, mock_export, mock_move, mock_insert, mock_parse):
+        # Configure mocks: the 3rd of January is already in the table
+        mock_loaded.return_value = {date(2024, 1, 3)}
+        mock_open_screen.return_value = True
+        mock_export.side_effect = lambda start, end: f'vendas_pdv_{start:%d%m%Y}.xlsx'
+        mock_parse.return_value = pd.DataFrame({'pdv': ['1']})
+        mock_insert.return_value = True
+        
+        # Test backfill of five days in chunks of two days
+        result = self.bot.run_backfill(date(2024, 1, 1), date(2024, 1, 5), chunk_days=2)
+        
+        # The screen is opened once and loaded days are never exported again
+        mock_open_screen.assert_called_once()
+        ranges = [c.args for c in mock_export.call_args_list]
+        self.assertEqual(ranges, [
+            (date(2024, 1, 1), date(2024, 1, 2)),
+            (date(2024, 1, 4), date(2024, 1, 5))
+        ])
+        moved = [os.path.basename(c.args[0]) for c in mock_move.call_args_list]
+        self.assertEqual(moved, ['vendas_pdv_01012024.xlsx', 'vendas_pdv_04012024.xlsx'])
+        self.assertEqual(result, {'skipped_days': 1, 'exported': 2, 'failed': 0, 'loaded': 2})
+        
+    @patch('pyautogui.press')
+    @patch('core.uniplus_session.UniplusSession.start')
+    @patch('core.uniplus_interface.UniplusInterface._wait_for_screen_stable')
+    @patch('core.uniplus_interface.UniplusInterface.navigate_to_menu')
+    @patch('bots.vendas_pdv.bot.parse_report')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._insert_to_database')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._move_processed_file')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._export_range')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._loaded_dates')
+    def test_run_backfill_ignores_own_esc(self, mock_loaded, mock_export, mock_move, mock_insert, mock_parse,
+                                          mock_navigate_menu, mock_wait_stable, mock_start, mock_press):
+        # Configure mocks: the ESC hotkey also fires on the ESC presses the bot sends to go home
+        mock_press.side_effect = lambda key: self.bot.emergency_stop() if key == 'esc' else None
+        mock_start.return_value = 'reused'
+        mock_navigate_menu.return_value = True
+        mock_loaded.return_value = set()
+        mock_export.side_effect = lambda start, end: f'vendas_pdv_{start:%d%m%Y}.xlsx'
+        mock_parse.return_value = pd.DataFrame({'pdv': ['1']})
+        mock_insert.return_value = True
+        
+        # Test backfill of three days, one file per day
+        result = self.bot.run_backfill(date(2024, 1, 1), date(2024, 1, 3), chunk_days=1)
+        
+        # Closing the popups did not stop the run, so every range was exported
+        self.assertIn(('esc',), [c.args for c in mock_press.call_args_list])
+        self.assertEqual(mock_export.call_count, 3)
+        self.assertEqual(result, {'skipped_days': 0, 'exported': 3, 'failed': 0, 'loaded': 3})
+        
+        # A real ESC from the user still stops the bot
+        self.bot.is_running = True
+        self.bot._own_keys_until = 0.0
+        self.bot.emergency_stop()
+        self.assertFalse(self.bot.is_running)
+        
+    @patch('bots.vendas_pdv.bot.parse_report')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._insert_to_database')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._move_processed_file')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._export_range')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._open_report_screen')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._loaded_dates')
+    def test_run_backfill_overlaps_stages(self, mock_loaded, mock_open_screen, mock_export, mock_move, mock_insert, mock_parse):
+        # Configure mocks: the second export only finishes once the first report is inserted
+        first_loaded = threading.Event()
+        overlapped = []
+        
+        def export(start, end):
+            if start.day == 2:
+                overlapped.append(first_loaded.wait(timeout=5))
+            return f'vendas_pdv_{start:%d%m%Y}.xlsx'
+            
+        mock_loaded.return_value = set()
+        mock_open_screen.return_value = True
+        mock_export.side_effect = export
+        mock_parse.return_value = pd.DataFrame({'pdv': ['1']})
+        mock_insert.side_effect = lambda df: first_loaded.set() or True
+        
+        # Test backfill of two days
+        result = self.bot.run_backfill(date(2024, 1, 1), date(2024, 1, 2))
+        
+        # The first day was loaded while Uniplus was still exporting the second
+        self.assertEqual(overlapped, [True])
+        self.assertEqual(result, {'skipped_days': 0, 'exported': 2, 'failed': 0, 'loaded': 2})
+        
+    @patch('bots.vendas_pdv.bot.parse_report')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._insert_to_database')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._move_processed_file')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._export_range')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._open_report_screen')
+    def test_run(self, mock_open_screen, mock_export, mock_move, mock_insert, mock_parse):
+        # Configure mocks: a report from a previous run is waiting in the input folder
+        # next to one that is still being written
+        with tempfile.TemporaryDirectory() as input_dir:
+            self.bot.input_dir = input_dir
+            pd.DataFrame({'pdv': ['1']}).to_excel(os.path.join(input_dir, 'vendas_pdv_01012024.xlsx'))
+            with open(os.path.join(input_dir, 'vendas_pdv_02012024.xlsx'), 'wb') as f:
+                f.write(b'PK\x03\x04')
+            today = datetime.now().date()
+            mock_open_screen.return_value = True
+            mock_export.return_value = f'vendas_pdv_{today:%d%m%Y}.xlsx'
+            mock_parse.return_value = pd.DataFrame()
+            mock_insert.return_value = True
+            mock_move.return_value = True
+            
+            # Test run method
+            self.bot.run()
+            
+        # Today's report is exported and loaded together with the pending one
+        mock_export.assert_called_once_with(today, today)
+        parsed = sorted(os.path.basename(c.args[0]) for c in mock_parse.call_args_list)
+        self.assertEqual(parsed, sorted(['vendas_pdv_01012024.xlsx', f'vendas_pdv_{today:%d%m%Y}.xlsx']))
+        self.assertEqual(mock_insert.call_count, 2)
+        self.assertEqual(mock_move.call_count, 2)
+        
+    @patch('bots.vendas_pdv.bot.ProcessPoolExecutor')
+    @patch('bots.vendas_pdv.bot.parse_report')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._insert_to_database')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._move_processed_file')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._export_range')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._open_report_screen')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._pending_files')
+    def test_run_loads_pending_before_export(self, mock_pending, mock_open_screen, mock_export, mock_move,
+                                             mock_insert, mock_parse, mock_executor):
+        # Configure mocks: five reports wait on disk and submitting each one to the pool takes a while,
+        # so today's report is exported before the last pending one enters the pipeline
+        pending = [os.path.join(self.bot.input_dir, f'vendas_pdv_0{day}012024.xlsx') for day in range(1, 6)]
+        today = datetime.now().date()
+        first_submitted = threading.Event()
+        
+        class SlowSubmitExecutor(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                first_submitted.set()
+                time.sleep(0.05)
+                return super().submit(*args, **kwargs)
+                
+        mock_executor.side_effect = SlowSubmitExecutor
+        mock_pending.return_value = pending
+        mock_open_screen.return_value = True
+        mock_export.side_effect = lambda start, end: first_submitted.wait(5) and f'vendas_pdv_{start:%d%m%Y}.xlsx'
+        mock_parse.return_value = pd.DataFrame({'pdv': ['1']})
         mock_insert.return_value = True
-        mock_move.return_value = True
+        self.bot.backlog_workers = 2
         
         # Test run method
         self.bot.run()
         
-        # Verify method calls
-        mock_extract.assert_called_once()
-        mock_process.assert_called()
-        mock_insert.assert_called()
-        mock_move.assert_called()
+        # The reports on disk are loaded oldest first, and today's one after them
+        moved = [os.path.basename(c.args[0]) for c in mock_move.call_args_list]
+        self.assertEqual(moved, [os.path.basename(f) for f in pending] + [f'vendas_pdv_{today:%d%m%Y}.xlsx'])
+        
+    @patch('core.base_bot.keyboard')
+    @patch('bots.vendas_pdv.bot.VendasPdvBot._load_pending_files')
+    def test_load_pending_releases_hotkey_and_folder(self, mock_load_pending, mock_keyboard):
+        # Configure mocks: another job of the bot is using the input folder
+        lock = folder_lock(self.bot.input_dir)
+        lock.acquire()
+        started = threading.Event()
+        mock_load_pending.side_effect = lambda: started.set()
+        
+        # Test two runs of the same bot instance, as the scheduler makes them
+        thread = threading.Thread(target=self.bot.load_pending)
+        thread.start()
+        self.assertFalse(started.wait(0.3))
+        lock.release()
+        thread.join(5)
+        self.bot.load_pending()
+        
+        # The run waited for the folder, and each run removed the ESC hotkey it added
+        self.assertTrue(started.is_set())
+        self.assertEqual(mock_keyboard.add_hotkey.call_count, 2)
+        mock_keyboard.remove_hotkey.assert_called_with(mock_keyboard.add_hotkey.return_value)
+        self.assertEqual(mock_keyboard.remove_hotkey.call_count, 2)
+        self.assertFalse(lock.locked())
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
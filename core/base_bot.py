@@ -1,29 +1,91 @@
+import os
 import logging
 from abc import ABC, abstractmethod
-from typing import Optional
-import pyautogui
-import keyboard
+from typing import Optional, Tuple, List
 import time
+from contextlib import contextmanager
 from datetime import datetime
-from core.logger import setup_logger
+from core.lazy import lazy_import
+from core.logger import setup_logger, flush_logs
+from core.template_registry import TemplateRegistry
+from core.location_memory import LocationMemory
+from core.text_entry import TextEntry
+from core.text_locator import TextLocator, normalize_text
+from core.tracing import start_trace, end_trace, span
+
+pyautogui = lazy_import('pyautogui')
+keyboard = lazy_import('keyboard')
+
+# The ESC hotkey fires on the keyboard hook thread, a little after the key is
+# sent; ESC seen this long after one of the bot's own presses is not a stop
+OWN_KEYS_GRACE = 0.5
 
 class BaseBot(ABC):
     def __init__(self, bot_name: str):
         self.bot_name = bot_name
         self.logger = setup_logger(bot_name)
+        # Trace of the run in progress (see _start_run)
+        self.tracer = None
         self.is_running = False
+        # Set only by a stop from the user, never by the bot's own keys
+        self.stop_requested = False
+        self._own_keys = 0
+        self._own_keys_until = 0.0
+        # ESC hotkey of the run in progress; a resident process reuses bots, so it is removed when the run ends
+        self._stop_hotkey = None
+        self.templates = TemplateRegistry(
+            grayscale=os.getenv('TEMPLATE_GRAYSCALE', '1') == '1',
+            scale=float(os.getenv('TEMPLATE_SCALE', '1.0')),
+            logger=self.logger
+        )
+        self.location_memory = LocationMemory(
+            os.path.join('cache', bot_name, 'locations.json'),
+            margin=int(os.getenv('LOCATION_MEMORY_MARGIN', '60')),
+            logger=self.logger
+        )
+        self.text_locator = TextLocator(lang=os.getenv('OCR_LANG', 'por'), logger=self.logger)
+        strategies = os.getenv('TEXT_ENTRY_STRATEGIES')
+        self.text_entry = TextEntry(
+            os.path.join('cache', bot_name, 'text_entry.json'),
+            strategies=strategies.split(',') if strategies else None,
+            logger=self.logger
+        )
         self._setup_safety_features()
 
+    def _start_run(self) -> None:
+        """Mark the bot as running, bind ESC to the emergency stop and start the trace of the run"""
+        self.is_running = True
+        self.stop_requested = False
+        if self._stop_hotkey is None:
+            self._stop_hotkey = keyboard.add_hotkey('esc', self.emergency_stop)
+        self.tracer = start_trace(self.bot_name, logger=self.logger)
+
+    def _end_run(self) -> None:
+        """Mark the bot as stopped, release its ESC hotkey and write the trace of the run"""
+        self.is_running = False
+        hotkey, self._stop_hotkey = self._stop_hotkey, None
+        if hotkey is not None:
+            try:
+                keyboard.remove_hotkey(hotkey)
+            except (KeyError, ValueError) as e:
+                self.logger.warning(f"Error removing the emergency stop hotkey: {str(e)}")
+        tracer, self.tracer = self.tracer, None
+        end_trace(tracer)
+
     def _setup_safety_features(self):
-        """Setup safety features like emergency stop"""
-        keyboard.add_hotkey('esc', self.emergency_stop)
+        """Setup safety features; the ESC emergency stop is bound while a run is in progress"""
         pyautogui.FAILSAFE = True
 
     def emergency_stop(self):
         """Emergency stop function triggered by ESC key"""
+        if self._own_keys or time.monotonic() < self._own_keys_until:
+            # ESC sent by the bot itself (closing popups, leaving menus)
+            return
         self.logger.warning("Emergency stop triggered!")
+        self.stop_requested = True
         self.is_running = False
-        # Add any cleanup code here
+        # Make sure the lines explaining the stop reach the log file
+        flush_logs()
 
     def wait_and_click(self, image_path: str, confidence: float = 0.9, timeout: int = 10) -> bool:
         """
@@ -38,32 +100,134 @@ class BaseBot(ABC):
             bool: True if image was found and clicked, False otherwise
         """
         try:
-            location = pyautogui.locateCenterOnScreen(image_path, confidence=confidence, timeout=timeout)
-            if location:
-                pyautogui.click(location)
-                return True
-            return False
+            # The template is decoded once by the registry and reused on every poll
+            with span('wait_and_click', image=os.path.basename(image_path)) as step:
+                start_time = time.time()
+                while time.time() - start_time < timeout:
+                    step.incr('polls')
+                    found = self._find_on_screen([image_path], confidence=confidence)
+                    if found:
+                        step.set(score=round(found[2], 3))
+                        pyautogui.click(found[1])
+                        return True
+                    time.sleep(0.5)
+                return False
         except Exception as e:
             self.logger.error(f"Error in wait_and_click: {str(e)}")
             return False
 
-    def type_text(self, text: str, interval: float = 0.1):
+    def _find_on_screen(self,
+                        image_paths: List[str],
+                        confidence: float = 0.9) -> Optional[Tuple[str, Tuple[int, int], float]]:
+        """
+        Look for any of several images once, near their last known position first
+        
+        The region around the positions remembered from previous hits is
+        searched first; the full screen is only captured on a miss.
+        
+        Args:
+            image_paths: Paths to the candidate images
+            confidence: Confidence level for image matching (0-1)
+            
+        Returns:
+            Tuple of (image path, (x, y), score) of the best match, None if not found
         """
-        Type text with specified interval between keystrokes
+        keys = {os.path.normpath(path): path for path in image_paths}
+        sizes = {key: self.templates.size(path) for key, path in keys.items()}
+        sizes = {key: size for key, size in sizes.items() if size}
+        if not sizes:
+            return None
+            
+        with span('find_on_screen', candidates=len(sizes)) as step:
+            found = None
+            region = self.location_memory.region_for(sizes, tuple(pyautogui.size()))
+            if region:
+                found = self.templates.best_match(
+                    [keys[key] for key in sizes], self.templates.capture(region), confidence, offset=region[:2]
+                )
+                step.set(remembered_region=bool(found))
+            if not found:
+                found = self.templates.best_match([keys[key] for key in sizes], self.templates.capture(), confidence)
+            if not found:
+                return None
+                
+            image_path, x, y, score = found
+            step.set(image=os.path.basename(image_path), score=round(score, 3))
+            self.location_memory.remember(os.path.normpath(image_path), x, y)
+            return image_path, (x, y), score
+        
+    def _find_text_on_screen(self,
+                             text: str,
+                             region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int]]:
+        """
+        Look for a phrase once with OCR, near its last known position first
+        
+        Only the region around the remembered position is read first; the
+        given region is only read on a miss. Callers pass the region of the
+        dialog or report they expect the text in, so OCR runs on fewer pixels
+        and a clock or caret elsewhere on screen does not defeat the OCR cache.
+        
+        Args:
+            text: Phrase to find
+            region: (left, top, width, height) to read (default: full screen)
+            
+        Returns:
+            (x, y) of the center of the phrase, None if not found
+        """
+        key = f'text:{normalize_text(text)}'
+        found = None
+        # OCR boxes are not stored, so the remembered area is sized from the text length
+        remembered = self.location_memory.region_for(
+            {key: (max(len(text) * 10, 40), 24)}, tuple(pyautogui.size())
+        )
+        if remembered:
+            found = self.text_locator.locate(text, remembered)
+        if not found:
+            found = self.text_locator.locate(text, region)
+        if not found:
+            return None
+            
+        left, top, width, height = found
+        x, y = left + width // 2, top + height // 2
+        self.location_memory.remember(key, x, y)
+        return x, y
+        
+    def type_text(self,
+                  text: str,
+                  interval: float = 0.1,
+                  field: Optional[str] = None,
+                  strategy: Optional[str] = None):
+        """
+        Type text into the focused field (see TextEntry)
         
         Args:
             text: Text to type
-            interval: Time between keystrokes in seconds
+            interval: Time between keystrokes when typing key by key
+            field: Identifier of the field, to verify the text and remember
+                the fastest strategy that works for it
+            strategy: Strategy forced for this field ('paste', 'bulk', 'per_key')
         """
-        pyautogui.write(text, interval=interval)
+        self.text_entry.type(text, field=field, interval=interval, strategy=strategy)
+
+    @contextmanager
+    def own_keys(self):
+        """Mark the keys sent inside the block as the bot's own, so their ESC is no emergency stop"""
+        self._own_keys += 1
+        try:
+            yield
+        finally:
+            self._own_keys -= 1
+            self._own_keys_until = time.monotonic() + OWN_KEYS_GRACE
 
     def press_key(self, key: str):
         """Press a single key"""
-        pyautogui.press(key)
+        with self.own_keys():
+            pyautogui.press(key)
 
     def press_hotkey(self, *keys: str):
         """Press a combination of keys"""
-        pyautogui.hotkey(*keys)
+        with self.own_keys():
+            pyautogui.hotkey(*keys)
 
     def wait(self, seconds: float):
         """Wait for specified number of seconds"""
@@ -89,7 +253,8 @@ class BaseBot(ABC):
         """
         for attempt in range(max_retries):
             try:
-                return func(*args, **kwargs)
+                with span(f'retry:{getattr(func, "__name__", "call")}', attempt=attempt + 1):
+                    return func(*args, **kwargs)
             except Exception as e:
                 self.logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
                 if attempt == max_retries - 1:
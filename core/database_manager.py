@@ -1,37 +1,278 @@
+import io
 import os
-import psycopg2
-from psycopg2 import sql
-from psycopg2.extras import DictCursor
+import time
+import atexit
+import logging
+import threading
+from collections import deque
 from dotenv import load_dotenv
-from typing import Optional, List, Dict, Any, Tuple
-import pandas as pd
+from typing import Optional, List, Dict, Any, Tuple, Set
+from core.lazy import lazy_import
+from core.logger import get_logger
+from core.tracing import span
 
-class DatabaseManager:
-    def __init__(self):
-        load_dotenv()
-        self.connection = None
-        self.cursor = None
+psycopg2 = lazy_import('psycopg2')
+sql = lazy_import('psycopg2.sql')
+extensions = lazy_import('psycopg2.extensions')
+extras = lazy_import('psycopg2.extras')
+pd = lazy_import('pandas')
+
+class ConnectionPool:
+    """Thread-safe pool of PostgreSQL connections shared by all bots and steps"""
+    
+    def __init__(self,
+                 min_size: int = 1,
+                 max_size: int = 5,
+                 idle_timeout: float = 300.0,
+                 health_check_interval: float = 30.0,
+                 **connect_kwargs):
+        """
+        Args:
+            min_size: Connections opened upfront and never evicted for being idle
+            max_size: Maximum number of open connections
+            idle_timeout: Seconds an idle connection above min_size is kept open
+            health_check_interval: Idle seconds after which a connection is
+                checked with SELECT 1 before being handed out
+            **connect_kwargs: Arguments passed to psycopg2.connect
+        """
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_kwargs = connect_kwargs
+        self._condition = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, most recently used on the right
+        self._size = 0
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'created': 0,
+            'evicted': 0,
+            'discarded': 0
+        }
         
-    def connect(self) -> None:
-        """Establishes a connection to the PostgreSQL database using credentials from .env file"""
+        for _ in range(self.min_size):
+            connection = self._create_connection()
+            self._idle.append((connection, time.monotonic()))
+            self._size += 1
+            
+    def _create_connection(self):
+        """Open a new connection to the database"""
+        connection = psycopg2.connect(**self.connect_kwargs)
+        with self._condition:
+            self._metrics['created'] += 1
+        return connection
+        
+    def _is_healthy(self, connection, last_used: float) -> bool:
+        """Check that an idle connection is still usable"""
+        if connection.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+            
+    def _evict_idle(self) -> None:
+        """Close idle connections above min_size that exceeded idle_timeout (lock held)"""
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            self._metrics['evicted'] += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+                
+    def getconn(self, timeout: float = 30.0):
+        """
+        Check out a connection, waiting for one to be returned if the pool is full
+        
+        Args:
+            timeout: Maximum time to wait for a free connection in seconds
+            
+        Returns:
+            An open psycopg2 connection
+        """
+        start_time = time.monotonic()
+        waited = False
+        
+        while True:
+            with self._condition:
+                self._evict_idle()
+                
+                while not self._idle and self._size >= self.max_size:
+                    waited = True
+                    remaining = timeout - (time.monotonic() - start_time)
+                    if remaining <= 0:
+                        raise Exception(f"Timed out after {timeout}s waiting for a database connection")
+                    self._condition.wait(remaining)
+                    
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                else:
+                    connection, last_used = None, None
+                    self._size += 1
+                    
+            if connection is None:
+                try:
+                    connection = self._create_connection()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+            elif not self._is_healthy(connection, last_used):
+                self._discard(connection)
+                continue
+                
+            wait_seconds = time.monotonic() - start_time
+            with self._condition:
+                self._metrics['checkouts'] += 1
+                if waited:
+                    self._metrics['waits'] += 1
+                self._metrics['wait_seconds_total'] += wait_seconds
+                self._metrics['wait_seconds_max'] = max(self._metrics['wait_seconds_max'], wait_seconds)
+            return connection
+            
+    def putconn(self, connection) -> None:
+        """
+        Return a connection to the pool
+        
+        Args:
+            connection: Connection obtained from getconn
+        """
+        if connection.closed:
+            self._discard(connection)
+            return
         try:
-            self.connection = psycopg2.connect(
+            # Never hand out a connection with a pending transaction
+            if connection.status != extensions.STATUS_READY:
+                connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+            
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._evict_idle()
+            self._condition.notify()
+            
+    def _discard(self, connection) -> None:
+        """Close a broken connection and free its slot"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._metrics['discarded'] += 1
+            self._condition.notify()
+            
+    def closeall(self) -> None:
+        """Close every idle connection in the pool"""
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                self._size -= 1
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get pool usage metrics
+        
+        Returns:
+            Dict with checkouts, waits, wait times, created/evicted/discarded
+            connections and the current pool size
+        """
+        with self._condition:
+            metrics = dict(self._metrics)
+            metrics['size'] = self._size
+            metrics['idle'] = len(self._idle)
+            metrics['in_use'] = self._size - len(self._idle)
+            metrics['wait_seconds_avg'] = (
+                metrics['wait_seconds_total'] / metrics['checkouts'] if metrics['checkouts'] else 0.0
+            )
+        return metrics
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """
+    Get the process-wide connection pool, creating it from the .env settings on first use
+    
+    Returns:
+        The shared ConnectionPool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            load_dotenv()
+            _pool = ConnectionPool(
+                min_size=int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+                max_size=int(os.getenv('DB_POOL_MAX_SIZE', '5')),
+                idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')),
+                health_check_interval=float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30')),
                 dbname=os.getenv('DB_NAME'),
                 user=os.getenv('DB_USER'),
                 password=os.getenv('DB_PASSWORD'),
                 host=os.getenv('DB_HOST'),
                 port=os.getenv('DB_PORT')
             )
-            self.cursor = self.connection.cursor(cursor_factory=DictCursor)
+        return _pool
+
+def close_pool() -> None:
+    """Close the shared connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+atexit.register(close_pool)
+
+# Tables already reported as having other column types than declared
+_outdated_tables: Set[str] = set()
+
+class DatabaseManager:
+    def __init__(self, logger: Optional[logging.Logger] = None, pool: Optional[ConnectionPool] = None):
+        load_dotenv()
+        self.connection = None
+        self.cursor = None
+        self.logger = logger or get_logger('database_manager')
+        self.pool = pool
+        self.last_load_stats: Dict[str, Any] = {}
+        
+    def connect(self) -> None:
+        """Checks out a connection from the shared pool (credentials come from the .env file)"""
+        try:
+            if self.pool is None:
+                self.pool = get_pool()
+            with span('db.connect'):
+                self.connection = self.pool.getconn()
+            self.cursor = self.connection.cursor(cursor_factory=extras.DictCursor)
         except Exception as e:
             raise Exception(f"Error connecting to database: {str(e)}")
 
     def close(self) -> None:
-        """Closes the database connection"""
+        """Returns the database connection to the pool"""
         if self.cursor:
             self.cursor.close()
+            self.cursor = None
         if self.connection:
-            self.connection.close()
+            self.pool.putconn(self.connection)
+            self.connection = None
 
     def commit(self) -> None:
         """Commits the current transaction"""
@@ -106,13 +347,39 @@ class DatabaseManager:
             self.rollback()
             raise Exception(f"Error deleting data: {str(e)}")
 
-    def insert_dataframe(self, df, table_name: str) -> bool:
+    def execute_query(self, query: str, params: Optional[Tuple] = None) -> pd.DataFrame:
+        """
+        Run a SELECT query and return its rows as a DataFrame
+        
+        Args:
+            query: SQL query
+            params: Query parameters
+            
+        Returns:
+            pandas DataFrame with the result
+        """
+        if not self.connection:
+            self.connect()
+            
+        try:
+            return pd.read_sql_query(query, self.connection, params=params)
+            
+        except Exception as e:
+            self.rollback()
+            raise Exception(f"Error executing query: {str(e)}")
+
+    def insert_dataframe(self, df, table_name: str, method: str = 'copy', batch_size: int = 1000,
+                         commit: bool = True) -> bool:
         """
         Insert a pandas DataFrame into a database table
         
         Args:
             df: pandas DataFrame to insert
             table_name: Name of the table to insert into
+            method: 'copy' streams the rows with COPY FROM STDIN and falls back to
+                batched INSERTs if COPY is not allowed; 'insert' goes straight to batches
+            batch_size: Number of rows per multi-row INSERT statement
+            commit: Commit at the end; pass False to keep the insert in the current transaction
             
         Returns:
             bool: True if successful, False otherwise
@@ -121,29 +388,515 @@ class DatabaseManager:
             self.connect()
             
         try:
-            # Convert DataFrame to list of tuples
-            records = [tuple(x) for x in df.to_numpy()]
+            self._bulk_load(df, table_name, method=method, batch_size=batch_size)
+            if commit:
+                self.commit()
+            return True
+            
+        except Exception as e:
+            self.rollback()
+            raise Exception(f"Error inserting DataFrame: {str(e)}")
+
+    def upsert_dataframe(self, df, table_name: str, conflict_columns: List[str], method: str = 'copy') -> int:
+        """
+        Insert only the rows of a DataFrame whose key is not yet in the table
+
+        The rows are bulk-loaded into a temporary staging table and merged with
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING, so the cost depends on the
+        size of the DataFrame and not on the size of the target table. Rows with
+        an empty key column are skipped: NULLs never conflict, so they would be
+        inserted again by every load.
+
+        Args:
+            df: pandas DataFrame to load
+            table_name: Name of the target table
+            conflict_columns: Columns of the unique key used to detect existing rows
+            method: Load method for the staging table ('copy' or 'insert')
+
+        Returns:
+            int: Number of rows actually inserted into the target table
+        """
+        if not self.connection:
+            self.connect()
+
+        with span('db.upsert', table=table_name, rows=len(df)) as step:
+            try:
+                staging_table = f'_staging_{table_name}'
+                columns = sql.SQL(', ').join(map(sql.Identifier, df.columns.tolist()))
+
+                self.cursor.execute(sql.SQL(
+                    "CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP"
+                ).format(sql.Identifier(staging_table), sql.Identifier(table_name)))
+
+                self._bulk_load(df, staging_table, method=method)
+
+                null_keys = int(df.reindex(columns=conflict_columns).isna().any(axis=1).sum())
+                if null_keys:
+                    self.logger.warning(
+                        f"Skipping {null_keys} rows of {table_name} with an empty {'/'.join(conflict_columns)} key"
+                    )
+
+                self.cursor.execute(sql.SQL(
+                    "INSERT INTO {} ({}) SELECT {} FROM {} WHERE {} ON CONFLICT ({}) DO NOTHING"
+                ).format(
+                    sql.Identifier(table_name),
+                    columns,
+                    columns,
+                    sql.Identifier(staging_table),
+                    sql.SQL(' AND ').join(
+                        sql.SQL("{} IS NOT NULL").format(sql.Identifier(col)) for col in conflict_columns
+                    ),
+                    sql.SQL(', ').join(map(sql.Identifier, conflict_columns))
+                ))
+                inserted = self.cursor.rowcount
+                step.set(inserted=inserted)
+
+                self.commit()
+                return inserted
+
+            except Exception as e:
+                self.rollback()
+                raise Exception(f"Error upserting DataFrame: {str(e)}")
+
+    def apply_diff(self, table_name: str, key_column: str,
+                   inserts=None, updates=None, deletes: Optional[List[Any]] = None,
+                   method: str = 'copy', commit: bool = True) -> Dict[str, int]:
+        """
+        Apply row-level changes to a table in the current transaction
+
+        Args:
+            table_name: Name of the target table
+            key_column: Column identifying each row
+            inserts: DataFrame with rows to insert
+            updates: DataFrame with the new values of existing rows (must contain key_column)
+            deletes: Keys of the rows to delete
+            method: Load method for inserts and the updates staging table ('copy' or 'insert')
+            commit: Commit at the end; pass False to chain several diffs in one transaction
+
+        Returns:
+            Dict with the number of inserted, updated and deleted rows
+        """
+        if not self.connection:
+            self.connect()
+
+        table = sql.Identifier(table_name)
+        key = sql.Identifier(key_column)
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0}
+
+        with span('db.apply_diff', table=table_name) as step:
+            try:
+                if deletes:
+                    self.cursor.execute(
+                        sql.SQL("DELETE FROM {} WHERE {} = ANY(%s)").format(table, key),
+                        (list(deletes),)
+                    )
+                    counts['deleted'] = self.cursor.rowcount
+
+                if updates is not None and not updates.empty:
+                    staging_table = f'_staging_{table_name}'
+                    staging = sql.Identifier(staging_table)
+                    self.cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+                    self.cursor.execute(sql.SQL(
+                        "CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP"
+                    ).format(staging, table))
+                    self._bulk_load(updates, staging_table, method=method)
+
+                    assignments = sql.SQL(', ').join(
+                        sql.SQL("{} = s.{}").format(sql.Identifier(col), sql.Identifier(col))
+                        for col in updates.columns if col != key_column
+                    )
+                    self.cursor.execute(sql.SQL("UPDATE {} AS t SET {} FROM {} AS s WHERE t.{} = s.{}").format(
+                        table, assignments, staging, key, key
+                    ))
+                    counts['updated'] = self.cursor.rowcount
+
+                if inserts is not None and not inserts.empty:
+                    counts['inserted'] = self._bulk_load(inserts, table_name, method=method)
+
+                if commit:
+                    self.commit()
+                step.set(**counts)
+                return counts
+
+            except Exception as e:
+                self.rollback()
+                raise Exception(f"Error applying changes to {table_name}: {str(e)}")
+
+    def replace_table(self, df, table_name: str, method: str = 'copy',
+                      lock_timeout: str = '200ms', max_retries: int = 5, retry_delay: float = 0.1) -> int:
+        """
+        Replace the whole content of a table without readers ever seeing it empty
+
+        The rows are bulk-loaded into a shadow table with the same structure in
+        its own transaction. The shadow table is then swapped in with two
+        renames in a single short transaction and the previous table is dropped.
+        Views referencing the table must be recreated, since they follow the
+        renamed table.
+
+        The swap waits at most lock_timeout for its ACCESS EXCLUSIVE lock, so
+        queries arriving meanwhile queue behind it only briefly, and retries
+        with a growing pause. The indexes of the shadow table get the names of
+        the indexes they replace, so index names do not drift between loads.
+
+        Args:
+            df: pandas DataFrame with the new content
+            table_name: Name of the table to replace
+            method: Load method for the shadow table ('copy' or 'insert')
+            lock_timeout: Maximum time each swap attempt waits for the table lock
+            max_retries: Number of swap attempts if the lock cannot be acquired
+            retry_delay: Pause in seconds after the first failed attempt, doubled after each one
+
+        Returns:
+            int: Number of rows in the new table
+        """
+        if not self.connection:
+            self.connect()
+
+        shadow_table = sql.Identifier(f'{table_name}_shadow')
+        old_table = sql.Identifier(f'{table_name}_old')
+        table = sql.Identifier(table_name)
+
+        try:
+            # Build the shadow table while readers keep using the current one
+            self.cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(shadow_table))
+            self.cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING ALL)").format(shadow_table, table))
+            rows = self._bulk_load(df, f'{table_name}_shadow', method=method)
+            self.cursor.execute(sql.SQL("ANALYZE {}").format(shadow_table))
+            index_names = self._matching_index_names(f'{table_name}_shadow', table_name)
+            self.commit()
+
+        except Exception as e:
+            self.rollback()
+            raise Exception(f"Error loading shadow table: {str(e)}")
+
+        for attempt in range(max_retries):
+            try:
+                start_time = time.perf_counter()
+                self.cursor.execute(sql.SQL("SET LOCAL lock_timeout = {}").format(sql.Literal(lock_timeout)))
+                self.cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(table, old_table))
+                self.cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(shadow_table, table))
+                self.cursor.execute(sql.SQL("DROP TABLE {}").format(old_table))
+                # The dropped table took the original index names with it
+                for shadow_index, index_name in index_names.items():
+                    self.cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                        sql.Identifier(shadow_index), sql.Identifier(index_name)
+                    ))
+                self.commit()
+                self.logger.info(
+                    f"Swapped {rows} rows into {table_name} in {(time.perf_counter() - start_time) * 1000:.1f}ms"
+                )
+                return rows
+
+            except psycopg2.errors.LockNotAvailable as e:
+                self.rollback()
+                self.logger.warning(f"Attempt {attempt + 1} to swap {table_name} timed out waiting for lock: {str(e)}")
+                if attempt + 1 < max_retries:
+                    time.sleep(retry_delay * 2 ** attempt)
+
+            except Exception as e:
+                self.rollback()
+                raise Exception(f"Error swapping tables: {str(e)}")
+
+        raise Exception(f"Error swapping tables: could not lock {table_name} after {max_retries} attempts")
+
+    def _matching_index_names(self, source_table: str, target_table: str) -> Dict[str, str]:
+        """
+        Pair the indexes of two tables with the same structure
+
+        Indexes match when they cover the same columns or expressions with the
+        same operator classes, uniqueness and predicate.
+
+        Args:
+            source_table: Table whose indexes are renamed (e.g. a shadow table)
+            target_table: Table whose index names are kept
+
+        Returns:
+            Dict of source index name to target index name, for the names that differ
+        """
+        query = """
+            SELECT c.relname, i.indkey::text, i.indclass::text, i.indisunique, i.indisprimary,
+                   pg_get_expr(i.indexprs, i.indrelid), pg_get_expr(i.indpred, i.indrelid)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass
+            ORDER BY c.relname
+        """
+        indexes = {}
+        for table in (source_table, target_table):
+            self.cursor.execute(query, (sql.Identifier(table).as_string(self.connection),))
+            indexes[table] = [(row[0], tuple(row[1:])) for row in self.cursor.fetchall()]
+
+        names = {}
+        targets = list(indexes[target_table])
+        for source_name, definition in indexes[source_table]:
+            for target in targets:
+                if target[1] == definition:
+                    targets.remove(target)
+                    if source_name != target[0]:
+                        names[source_name] = target[0]
+                    break
+        return names
+
+    def ensure_unique_index(self, table_name: str, columns: List[str]) -> None:
+        """
+        Create the unique index required by ON CONFLICT if it does not exist yet
+
+        Rows loaded before the index existed may repeat a key, which would make
+        the index creation fail on every run. They are deleted first, keeping
+        one row per key, in the transaction that creates the index, so this
+        cleanup runs once per table (on the first load or 'main.py --migrate').
+
+        Args:
+            table_name: Name of the table
+            columns: Columns of the unique key
+        """
+        if not self.connection:
+            self.connect()
+
+        try:
+            index_name = f"{table_name}_{'_'.join(columns)}_key"
+            self.cursor.execute("SELECT to_regclass(%s)", (index_name,))
+            if self.cursor.fetchone()[0] is None:
+                removed = self._delete_duplicate_keys(table_name, columns)
+                if removed:
+                    self.logger.warning(f"Deleted {removed} duplicate rows of {table_name} before creating {index_name}")
+                self.cursor.execute(sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                    sql.Identifier(index_name),
+                    sql.Identifier(table_name),
+                    sql.SQL(', ').join(map(sql.Identifier, columns))
+                ))
+            self.commit()
+
+        except Exception as e:
+            self.rollback()
+            raise Exception(f"Error creating unique index: {str(e)}")
+
+    def _delete_duplicate_keys(self, table_name: str, columns: List[str]) -> int:
+        """
+        Delete the rows repeating the key of an earlier row, inside the current transaction
+
+        Returns:
+            int: Number of deleted rows
+        """
+        self.cursor.execute(sql.SQL(
+            "DELETE FROM {table} WHERE ctid IN ("
+            "SELECT ctid FROM (SELECT ctid, row_number() OVER (PARTITION BY {columns} ORDER BY ctid) AS copy "
+            "FROM {table}) AS numbered WHERE copy > 1)"
+        ).format(
+            table=sql.Identifier(table_name),
+            columns=sql.SQL(', ').join(map(sql.Identifier, columns))
+        ))
+        return self.cursor.rowcount
+
+    def _bulk_load(self, df, table_name: str, method: str = 'copy', batch_size: int = 1000) -> int:
+        """
+        Load a DataFrame into a table inside the current transaction (no commit)
+        
+        Args:
+            df: pandas DataFrame to load
+            table_name: Name of the target table
+            method: 'copy' or 'insert'
+            batch_size: Number of rows per multi-row INSERT statement
+            
+        Returns:
+            int: Number of rows loaded
+        """
+        with span('db.bulk_load', table=table_name, rows=len(df)) as step:
+            start_time = time.perf_counter()
+            used_method = 'insert'
             
-            # Get column names
-            columns = df.columns.tolist()
+            if method == 'copy':
+                # The savepoint keeps whatever the caller already did in this transaction
+                # if the server refuses COPY (permissions, proxies without COPY support)
+                self.cursor.execute("SAVEPOINT bulk_copy")
+                try:
+                    self._copy_dataframe(df, table_name)
+                    self.cursor.execute("RELEASE SAVEPOINT bulk_copy")
+                    used_method = 'copy'
+                except psycopg2.Error as e:
+                    self.cursor.execute("ROLLBACK TO SAVEPOINT bulk_copy")
+                    self.logger.warning(f"COPY into {table_name} failed, falling back to batched INSERT: {str(e)}")
             
-            # Create the INSERT query
-            query = sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+            if used_method == 'insert':
+                self._insert_batches(df, table_name, batch_size)
+            
+            elapsed = time.perf_counter() - start_time
+            rows = len(df)
+            rows_per_second = rows / elapsed if elapsed > 0 else float(rows)
+            step.set(method=used_method, rows_per_second=round(rows_per_second))
+            self.last_load_stats = {
+                'table': table_name,
+                'method': used_method,
+                'rows': rows,
+                'seconds': elapsed,
+                'rows_per_second': rows_per_second
+            }
+            self.logger.info(
+                f"Loaded {rows} rows into {table_name} via {used_method} "
+                f"in {elapsed:.2f}s ({rows_per_second:.0f} rows/s)"
+            )
+            return rows
+
+    def _copy_dataframe(self, df, table_name: str) -> None:
+        """
+        Stream a DataFrame into a table with COPY FROM STDIN using an in-memory CSV buffer
+        
+        Args:
+            df: pandas DataFrame to copy
+            table_name: Name of the target table
+        """
+        buffer = io.StringIO()
+        self._format_times(df).to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        
+        query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.Identifier(table_name),
+            sql.SQL(', ').join(map(sql.Identifier, df.columns.tolist()))
+        )
+        self.cursor.copy_expert(query, buffer)
+
+    def _insert_batches(self, df, table_name: str, batch_size: int) -> None:
+        """
+        Insert a DataFrame with multi-row INSERT statements of batch_size rows each
+        
+        Args:
+            df: pandas DataFrame to insert
+            table_name: Name of the target table
+            batch_size: Number of rows per statement
+        """
+        # Convert DataFrame to list of tuples with NaN as NULL
+        df = self._format_times(df)
+        records = list(df.astype(object).where(pd.notna(df), None).itertuples(index=False, name=None))
+        
+        query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(table_name),
+            sql.SQL(', ').join(map(sql.Identifier, df.columns.tolist()))
+        )
+        extras.execute_values(self.cursor, query, records, page_size=batch_size)
+
+    @staticmethod
+    def _format_times(df):
+        """Format timedelta columns (times of day) as HH:MM:SS strings PostgreSQL accepts"""
+        time_columns = [col for col in df.columns if pd.api.types.is_timedelta64_dtype(df[col])]
+        if not time_columns:
+            return df
+        df = df.copy()
+        for col in time_columns:
+            df[col] = (pd.Timestamp(0) + df[col]).dt.strftime('%H:%M:%S')
+        return df
+
+    def ensure_table(self, table_name: str, column_types: Dict[str, str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Create a table with the declared column types, or check the types of an existing one
+
+        Existing tables are never rewritten during a load: converting their
+        columns is an explicit migration (see migrate_column_types). Until it
+        runs, loads keep going with the current types and the difference is
+        logged once per process.
+
+        Args:
+            table_name: Name of the table
+            column_types: Dict of column name to PostgreSQL type
+
+        Returns:
+            Dict of column name to (current type, declared type) for the columns that differ
+        """
+        if not self.connection:
+            self.connect()
+
+        try:
+            self.cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} ({})").format(
                 sql.Identifier(table_name),
-                sql.SQL(', ').join(map(sql.Identifier, columns)),
-                sql.SQL(', ').join([sql.Placeholder()] * len(columns))
+                sql.SQL(', ').join(
+                    sql.SQL("{} {}").format(sql.Identifier(col), sql.SQL(col_type))
+                    for col, col_type in column_types.items()
+                )
+            ))
+            mismatched = self._mismatched_column_types(table_name, column_types)
+            self.commit()
+
+        except Exception as e:
+            self.rollback()
+            raise Exception(f"Error creating table {table_name}: {str(e)}")
+
+        if mismatched and table_name not in _outdated_tables:
+            _outdated_tables.add(table_name)
+            self.logger.warning(
+                f"Columns of {table_name} differ from their declared types "
+                f"({', '.join(f'{col}: {current} -> {declared}' for col, (current, declared) in mismatched.items())}); "
+                f"loading with the current types until 'python main.py --migrate' converts them"
             )
-            
-            # Execute the query for each record
-            for record in records:
-                self.cursor.execute(query, record)
-                
+        return mismatched
+
+    def migrate_column_types(self, table_name: str, column_types: Dict[str, str]) -> List[str]:
+        """
+        Convert the columns of an existing table to the declared types
+
+        The whole table is rewritten under an ACCESS EXCLUSIVE lock, so this
+        runs as a separate migration step and never inside a bot run. The
+        text 'nan'/'None' left by older loads becomes NULL and text dates are
+        read day first (dd/mm/yyyy), as Uniplus writes them.
+
+        Args:
+            table_name: Name of the table
+            column_types: Dict of column name to PostgreSQL type
+
+        Returns:
+            Names of the converted columns
+
+        Raises:
+            Exception: If a value cannot be converted; the table is left unchanged
+        """
+        if not self.connection:
+            self.connect()
+
+        try:
+            mismatched = self._mismatched_column_types(table_name, column_types)
+            if mismatched:
+                self.cursor.execute("SET LOCAL DateStyle = 'ISO, DMY'")
+                self.cursor.execute(sql.SQL("ALTER TABLE {} {}").format(
+                    sql.Identifier(table_name),
+                    sql.SQL(', ').join(
+                        sql.SQL("ALTER COLUMN {} TYPE {} USING NULLIF(NULLIF(TRIM({}::text), 'nan'), 'None')::{}").format(
+                            sql.Identifier(col), sql.SQL(column_types[col]), sql.Identifier(col), sql.SQL(column_types[col])
+                        )
+                        for col in mismatched
+                    )
+                ))
             self.commit()
-            return True
-            
+            _outdated_tables.discard(table_name)
+            return list(mismatched)
+
         except Exception as e:
             self.rollback()
-            raise Exception(f"Error inserting DataFrame: {str(e)}")
+            raise Exception(f"Error migrating the column types of {table_name}: {str(e)}")
+
+    def _mismatched_column_types(self, table_name: str, column_types: Dict[str, str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Compare the column types of an existing table with the declared ones
+
+        Declared columns missing in the table, or a missing table, are ignored.
+
+        Returns:
+            Dict of column name to (current type, declared type) for the columns that differ
+        """
+        self.cursor.execute(
+            "SELECT column_name, format_type(atttypid, atttypmod) FROM information_schema.columns "
+            "JOIN pg_attribute ON attrelid = to_regclass(%s) AND attname = column_name "
+            "WHERE table_schema = current_schema() AND table_name = %s",
+            (table_name, table_name)
+        )
+        current_types = {row[0]: row[1] for row in self.cursor.fetchall()}
+
+        # Normalize the declared names ('time' -> 'time without time zone')
+        self.cursor.execute("SELECT t, t::regtype::text FROM unnest(%s::text[]) AS t", (list(column_types.values()),))
+        declared_types = {row[0]: row[1] for row in self.cursor.fetchall()}
+
+        return {
+            col: (current_types[col], declared_types[col_type])
+            for col, col_type in column_types.items()
+            if col in current_types and current_types[col] != declared_types[col_type]
+        }
 
     def __enter__(self):
         """Context manager entry"""
@@ -0,0 +1,208 @@
+import os
+import time
+import zipfile
+import logging
+import threading
+from typing import Optional, Tuple, Dict
+from core.logger import get_logger
+
+try:
+    import msvcrt
+except ImportError:
+    # msvcrt only exists on Windows; elsewhere folders are locked with flock
+    msvcrt = None
+    import fcntl
+
+# Members every xlsx package has; a zip missing them is still being written or is not a workbook
+XLSX_REQUIRED_MEMBERS = ('[Content_Types].xml', 'xl/workbook.xml')
+
+def is_valid_xlsx(file_path: str) -> bool:
+    """
+    Check that a file is a complete xlsx package
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        True if the zip central directory is readable and holds a workbook
+    """
+    try:
+        with zipfile.ZipFile(file_path) as package:
+            names = set(package.namelist())
+        return all(member in names for member in XLSX_REQUIRED_MEMBERS)
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+# Held with an OS byte-range lock, so it is released even when a process dies
+FOLDER_LOCK_FILE = '.folder.lock'
+
+class FolderLock:
+    """Lock of a folder shared by the threads of this process and by other processes"""
+
+    def __init__(self, path: str, poll_interval: float = 0.5):
+        """
+        Args:
+            path: Folder path, created if missing
+            poll_interval: Seconds between attempts while another process holds the folder
+        """
+        self.file_path = os.path.join(path, FOLDER_LOCK_FILE)
+        self.poll_interval = poll_interval
+        self._thread_lock = threading.Lock()
+        self._handle = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Take the folder, waiting for the other holder unless blocking is False
+
+        Returns:
+            True if the folder was taken
+        """
+        if not self._thread_lock.acquire(blocking):
+            return False
+        try:
+            while not self._lock_file():
+                if not blocking:
+                    self._thread_lock.release()
+                    return False
+                time.sleep(self.poll_interval)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return True
+
+    def release(self) -> None:
+        """Give the folder back"""
+        handle, self._handle = self._handle, None
+        try:
+            if msvcrt is not None:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            handle.close()
+        finally:
+            self._thread_lock.release()
+
+    def locked(self) -> bool:
+        """Whether a thread of this process holds the folder"""
+        return self._thread_lock.locked()
+
+    def __enter__(self) -> 'FolderLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def _lock_file(self) -> bool:
+        """Try once to lock the lock file of the folder"""
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        handle = open(self.file_path, 'a+b')
+        try:
+            if msvcrt is not None:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._handle = handle
+        return True
+
+# One lock per folder, shared by every bot instance of the process
+_folder_locks: Dict[str, FolderLock] = {}
+_folder_locks_guard = threading.Lock()
+
+def folder_lock(path: str) -> FolderLock:
+    """
+    Get the lock of a folder whose files are parsed and moved by bots
+
+    Scheduler jobs sharing a folder (e.g. a run exporting reports into it and
+    a DB-only job loading the ones left there) each have their own bot
+    instance, and a manual run or a second scheduler may work on the same
+    folder from another process, so they all take this lock to never read or
+    move a file together.
+
+    Args:
+        path: Folder path
+
+    Returns:
+        The same lock for every spelling of the same folder
+    """
+    key = os.path.normcase(os.path.abspath(path))
+    with _folder_locks_guard:
+        if key not in _folder_locks:
+            _folder_locks[key] = FolderLock(key)
+        return _folder_locks[key]
+
+def _stat(file_path: str) -> Optional[Tuple[int, float]]:
+    """Get (size, mtime) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime
+    except OSError:
+        return None
+
+def wait_for_saved_file(file_path: str,
+                        started_at: Optional[float] = None,
+                        timeout: float = 60.0,
+                        stable_for: float = 1.0,
+                        poll_interval: float = 0.25,
+                        validate_xlsx: bool = True,
+                        logger: Optional[logging.Logger] = None) -> Optional[float]:
+    """
+    Wait until a file being saved by another program is complete
+
+    The file counts as saved once it exists, was written after started_at,
+    its size and mtime stayed the same for stable_for seconds and (for xlsx)
+    it opens as a valid package. Slow synced folders (Google Drive) write the
+    file in several steps, so a file that exists is not necessarily complete.
+
+    Args:
+        file_path: Path of the file being saved
+        started_at: time.time() when the save was triggered; older files with
+            the same name are ignored (default: accept any file)
+        timeout: Maximum time to wait in seconds
+        stable_for: Seconds the size must stay unchanged
+        poll_interval: Time between checks in seconds
+        validate_xlsx: Check that the file opens as an xlsx package
+        logger: Logger instance (default: 'file_watch' logger)
+
+    Returns:
+        Seconds from started_at (or from the call) until the file was ready,
+        None on timeout
+    """
+    logger = logger or get_logger('file_watch')
+    start_time = time.time()
+    started_at = started_at if started_at is not None else start_time
+    deadline = time.monotonic() + timeout
+    directory = os.path.dirname(file_path) or '.'
+    name = os.path.basename(file_path)
+
+    last_stat = None
+    stable_since = None
+    while True:
+        # Listing the directory refreshes the entry on network and synced drives
+        # that cache the attributes of a path checked directly
+        try:
+            present = name in os.listdir(directory)
+        except OSError:
+            present = False
+
+        stat = _stat(file_path) if present else None
+        now = time.monotonic()
+        if stat is None or stat[1] < started_at - 1 or stat[0] == 0:
+            last_stat, stable_since = None, None
+        elif stat != last_stat:
+            last_stat, stable_since = stat, now
+        elif now - stable_since >= stable_for:
+            if not validate_xlsx or is_valid_xlsx(file_path):
+                duration = time.time() - started_at
+                logger.info(f"File {file_path} saved in {duration:.2f}s ({stat[0]} bytes)")
+                return duration
+            # Size is stable but the package is not complete yet; keep watching
+            stable_since = now
+
+        if now >= deadline:
+            logger.error(f"Timed out after {timeout:.0f}s waiting for {file_path} to be saved")
+            return None
+        time.sleep(poll_interval)
@@ -0,0 +1,49 @@
+import sys
+import types
+import importlib
+from typing import Any, List
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) -> types.ModuleType:
+        """Import the real module (once)"""
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        # Attributes are not copied, so mock.patch on the real module still applies
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self) -> List[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Get a module that is only imported when first used
+
+    Heavy dependencies (pandas, psycopg2, OpenCV, pyautogui...) are bound with
+    this at module level, so the CLI and the bots import only what the steps
+    they actually run need.
+
+    Args:
+        name: Full module name ('pandas', 'psycopg2.sql'...)
+
+    Returns:
+        The module if it is already imported, otherwise a LazyModule
+    """
+    return sys.modules.get(name) or LazyModule(name)
@@ -0,0 +1,112 @@
+import os
+import json
+import logging
+from typing import Optional, Tuple, Dict, List
+from core.logger import get_logger
+
+class LocationMemory:
+    """Last screen position where each template was found, persisted between runs"""
+
+    def __init__(self, file_path: str, margin: int = 60, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            file_path: JSON file holding the remembered positions
+            margin: Pixels searched around the remembered template area
+            logger: Logger instance (default: 'location_memory' logger)
+        """
+        self.file_path = file_path
+        self.margin = margin
+        self.logger = logger or get_logger('location_memory')
+        self._locations: Dict[str, List[int]] = self._load()
+
+    def _load(self) -> Dict[str, List[int]]:
+        """Read the remembered positions from disk"""
+        try:
+            if os.path.exists(self.file_path):
+                with open(self.file_path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Error reading location memory {self.file_path}: {str(e)}")
+        return {}
+
+    def _save(self) -> None:
+        """Write the remembered positions to disk"""
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+            temp_path = f'{self.file_path}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(self._locations, f, indent=2)
+            os.replace(temp_path, self.file_path)
+        except Exception as e:
+            self.logger.warning(f"Error writing location memory {self.file_path}: {str(e)}")
+
+    def get(self, key: str) -> Optional[Tuple[int, int]]:
+        """
+        Get the last position where a template was found
+
+        Args:
+            key: Template identifier
+
+        Returns:
+            (x, y) of the last hit, or None
+        """
+        location = self._locations.get(key)
+        return (location[0], location[1]) if location else None
+
+    def remember(self, key: str, x: int, y: int) -> None:
+        """
+        Store the position where a template was found
+
+        Args:
+            key: Template identifier
+            x: X coordinate of the template center
+            y: Y coordinate of the template center
+        """
+        if self._locations.get(key) != [x, y]:
+            self._locations[key] = [x, y]
+            self._save()
+
+    def forget(self, key: str) -> None:
+        """
+        Drop the remembered position of a template
+
+        Args:
+            key: Template identifier
+        """
+        if self._locations.pop(key, None) is not None:
+            self._save()
+
+    def region_for(self,
+                   templates: Dict[str, Tuple[int, int]],
+                   screen_size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Get the screen region around the remembered positions of some templates
+
+        Args:
+            templates: Dict of template identifier to its (width, height)
+            screen_size: (width, height) of the screen
+
+        Returns:
+            (left, top, width, height) covering every remembered template plus
+            the margin, or None if none of the templates was seen before
+        """
+        boxes = []
+        for key, (width, height) in templates.items():
+            location = self.get(key)
+            if location:
+                boxes.append((
+                    location[0] - width // 2 - self.margin,
+                    location[1] - height // 2 - self.margin,
+                    location[0] + (width + 1) // 2 + self.margin,
+                    location[1] + (height + 1) // 2 + self.margin
+                ))
+        if not boxes:
+            return None
+
+        left = max(0, min(box[0] for box in boxes))
+        top = max(0, min(box[1] for box in boxes))
+        right = min(screen_size[0], max(box[2] for box in boxes))
+        bottom = min(screen_size[1], max(box[3] for box in boxes))
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right - left, bottom - top
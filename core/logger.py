@@ -1,9 +1,179 @@
 import logging
 import os
+import queue
+import atexit
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Tuple, TextIO
 import sys
 
+# Queued by close() to end the writer thread
+_STOP = object()
+
+class LogWriter(threading.Thread):
+    """Background thread that writes the log lines of every RpaLogHandler"""
+    
+    def __init__(self, batch_size: int = 500, log_queue: Optional[queue.Queue] = None):
+        """
+        Args:
+            batch_size: Maximum number of lines written per flush
+            log_queue: Queue to take the lines from, e.g. the queue of a writer
+                that died, so its pending lines are not lost (default: new queue)
+        """
+        super().__init__(name='rpa-log-writer', daemon=True)
+        self.batch_size = batch_size
+        self.queue: queue.Queue = log_queue if log_queue is not None else queue.Queue()
+        # (log dir, logger name) -> (day, open file); reopened when the day changes
+        self._files: Dict[Tuple[str, str], Tuple[str, TextIO]] = {}
+        
+    def _get_file(self, log_dir: str, name: str, day: str) -> TextIO:
+        """Get the open log file of a logger for a day, rotating at midnight"""
+        key = (log_dir, name)
+        current = self._files.get(key)
+        if current and current[0] == day:
+            return current[1]
+        if current:
+            current[1].close()
+        log_file = open(os.path.join(log_dir, f'{name}_{day}.log'), 'a', encoding='utf-8')
+        self._files[key] = (day, log_file)
+        return log_file
+        
+    def _write(self, batch) -> None:
+        """Write a batch of lines to their files and the console, flushing once"""
+        touched = set()
+        console = []
+        for log_dir, name, day, line in batch:
+            try:
+                log_file = self._get_file(log_dir, name, day)
+                log_file.write(line + '\n')
+                touched.add(log_file)
+            except Exception as e:
+                print(f"Error in logging handler: {str(e)}", file=sys.stderr)
+            console.append(line)
+        for log_file in touched:
+            log_file.flush()
+        if console:
+            text = '\n'.join(console)
+            try:
+                print(text, flush=True)
+            except UnicodeEncodeError:
+                # Consoles with a legacy code page (cp1252) cannot show every character
+                encoding = getattr(sys.stdout, 'encoding', None) or 'ascii'
+                print(text.encode(encoding, 'replace').decode(encoding), flush=True)
+            
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            batch = []
+            done = []
+            # Take whatever else is already waiting, up to the batch size
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    done.append(item)
+                elif item is not None:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            # A failing batch must not end the thread, or every later line would pile up
+            try:
+                self._write(batch)
+            except Exception as e:
+                try:
+                    print(f"Error writing {len(batch)} log lines: {str(e)}", file=sys.stderr)
+                except Exception:
+                    pass
+            finally:
+                for event in done:
+                    event.set()
+                
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until every line queued so far is written
+        
+        Args:
+            timeout: Maximum time to wait in seconds
+            
+        Returns:
+            True if the lines were written, False on timeout or if the
+            writer is not running and lines are still queued
+        """
+        if not self.is_alive():
+            return self.queue.empty()
+        event = threading.Event()
+        self.queue.put(event)
+        return event.wait(timeout)
+        
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Write the pending lines, stop the thread and close the log files
+        
+        Args:
+            timeout: Maximum time to wait for the pending lines in seconds
+        """
+        if self.is_alive():
+            self.queue.put(_STOP)
+            self.join(timeout)
+            if self.is_alive():
+                # Still writing; the files belong to the thread until it ends
+                return
+        for _, log_file in self._files.values():
+            try:
+                log_file.close()
+            except Exception:
+                pass
+        self._files.clear()
+
+_writer: Optional[LogWriter] = None
+_writer_lock = threading.Lock()
+
+def get_log_writer() -> LogWriter:
+    """
+    Get the log writer shared by all handlers
+    
+    The writer is started on first use and restarted if its thread ended;
+    the new thread takes over the lines still queued for the old one.
+    """
+    global _writer
+    writer = _writer
+    if writer is not None and writer.is_alive():
+        return writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            if _writer is None:
+                atexit.register(close_log_writer)
+            else:
+                print("Log writer thread was not running; restarting it", file=sys.stderr)
+            _writer = LogWriter(log_queue=_writer.queue if _writer is not None else None)
+            _writer.start()
+        return _writer
+
+def close_log_writer() -> None:
+    """Write the pending lines and close the log files (runs at exit)"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    """
+    Write every log line queued so far (call before stopping abruptly)
+    
+    Args:
+        timeout: Maximum time to wait in seconds
+        
+    Returns:
+        True if the lines were written, False on timeout
+    """
+    return get_log_writer().flush(timeout) if _writer is not None else True
+
 class RpaLogHandler(logging.Handler):
     """Custom logging handler for RPA bots"""
     
@@ -26,23 +196,16 @@ class RpaLogHandler(logging.Handler):
         self.setFormatter(formatter)
         
     def emit(self, record):
-        """Emit a record to both file and console"""
+        """Queue a record for the file and console; the writer thread does the I/O"""
         try:
-            # Create log file path with current date
-            log_file = os.path.join(
-                self.log_dir,
-                f'{record.name}_{datetime.now().strftime("%Y%m%d")}.log'
-            )
-            
-            # Write to file
-            with open(log_file, 'a') as f:
-                f.write(self.format(record) + '\n')
-                
-            # Write to console
-            print(self.format(record))
-            
+            day = datetime.fromtimestamp(record.created).strftime("%Y%m%d")
+            get_log_writer().queue.put((self.log_dir, record.name, day, self.format(record)))
         except Exception as e:
             print(f"Error in logging handler: {str(e)}", file=sys.stderr)
+            
+    def flush(self):
+        """Wait until the queued records are written"""
+        flush_logs()
 
 def setup_logger(name: str, log_level: int = logging.INFO) -> logging.Logger:
     """
@@ -0,0 +1,109 @@
+import os
+from typing import Optional, Tuple, List, Dict
+
+class MenuRoute:
+    """Ways to reach one Uniplus screen, declared once and tried fastest first"""
+
+    # Order in which the strategies are tried: key sequences need no screen
+    # search, coordinates one click per level, templates a search per level
+    STRATEGIES = ('keys', 'coordinates', 'templates')
+
+    def __init__(self,
+                 path: List[str],
+                 keys: Optional[List[str]] = None,
+                 coordinates: Optional[List[Tuple[int, int]]] = None,
+                 templates: Optional[List[List[str]]] = None,
+                 expect: Optional[List[str]] = None,
+                 expect_text: Optional[str] = None,
+                 text_region: Optional[Tuple[float, float, float, float]] = None,
+                 expect_timeout: float = 10.0,
+                 image_prefix: str = ''):
+        """
+        Args:
+            path: Menu items from the main screen to the destination
+            keys: Key sequence reaching the destination from the main screen;
+                'alt+v' entries are pressed together (default: MENU_KEYS_<PATH> env)
+            coordinates: Screen position to click for each level
+                (default: MENU_<ITEM>_X/Y env, only if every level has one)
+            templates: Candidate images for each level, relative to the bot's
+                screenshots dir (default: <image_prefix><item>_1.png and _2.png)
+            expect: Images that show the destination screen was reached, relative
+                to the bot's screenshots dir
+            expect_text: Text that shows the destination screen was reached
+            text_region: Part of the screen where expect_text shows, as
+                (left, top, width, height) fractions of the screen; OCR reads
+                only this part (default: full screen)
+            expect_timeout: Seconds to wait for the destination screen
+            image_prefix: Prefix of the default template paths
+        """
+        self.path = list(path)
+        self.keys = keys if keys is not None else self._keys_from_env()
+        self.coordinates = coordinates if coordinates is not None else self._coordinates_from_env()
+        self.templates = templates or [
+            [f'{image_prefix}{item}_1.png', f'{image_prefix}{item}_2.png'] for item in self.path
+        ]
+        self.expect = expect or []
+        self.expect_text = expect_text
+        self.text_region = text_region
+        self.expect_timeout = expect_timeout
+
+    @property
+    def env_name(self) -> str:
+        """Name of the path in environment variables (vendas/relatorios -> VENDAS_RELATORIOS)"""
+        return '_'.join(self.path).upper()
+
+    def _keys_from_env(self) -> Optional[List[str]]:
+        """Read the key sequence from MENU_KEYS_<PATH> ('alt+v,r,enter')"""
+        keys = os.getenv(f'MENU_KEYS_{self.env_name}')
+        return [key.strip() for key in keys.split(',') if key.strip()] if keys else None
+
+    def _coordinates_from_env(self) -> Optional[List[Tuple[int, int]]]:
+        """Read the MENU_<ITEM>_X/Y positions, None unless every level has valid ones"""
+        coordinates = []
+        for item in self.path:
+            x = os.getenv(f'MENU_{item.upper()}_X')
+            y = os.getenv(f'MENU_{item.upper()}_Y')
+            try:
+                coordinates.append((int(x), int(y)))
+            except (TypeError, ValueError):
+                return None
+        return coordinates
+
+    def available_strategies(self) -> List[str]:
+        """Strategies this route declares, fastest first"""
+        available = {
+            'keys': bool(self.keys),
+            'coordinates': bool(self.coordinates),
+            'templates': bool(self.templates)
+        }
+        return [strategy for strategy in self.STRATEGIES if available[strategy]]
+
+    @property
+    def verifiable(self) -> bool:
+        """Whether the destination screen can be checked"""
+        return bool(self.expect or self.expect_text)
+
+# Declared destinations; paths not listed get a route built from the defaults
+NAVIGATION_MAP: Dict[Tuple[str, ...], Dict] = {
+    ('vendas', 'relatorios', 'vendas_por_pdv'): {
+        # The report is loaded when its Excel export button shows up
+        'expect': ['botao_excel.png', 'botao_excel_text.png'],
+        'expect_text': 'Exportar para Excel',
+        # The export button sits in the toolbar above the report grid
+        'text_region': (0.0, 0.0, 1.0, 0.25),
+        'expect_timeout': 30.0
+    }
+}
+
+def get_route(menu_path: List[str], image_prefix: str = '') -> MenuRoute:
+    """
+    Get the declared route of a menu path
+
+    Args:
+        menu_path: Menu items from the main screen to the destination
+        image_prefix: Prefix of the default template paths
+
+    Returns:
+        MenuRoute with the declared options, or the defaults for undeclared paths
+    """
+    return MenuRoute(menu_path, image_prefix=image_prefix, **NAVIGATION_MAP.get(tuple(menu_path), {}))
@@ -0,0 +1,197 @@
+import time
+import queue
+import logging
+import threading
+import contextvars
+from typing import Optional, List, Dict, Any, Callable, Iterable
+from core.logger import get_logger
+from core.tracing import span
+
+# Marks the end of the input of a stage worker
+_DONE = object()
+
+class Stage:
+    """One step of a pipeline, run by its own worker threads"""
+
+    def __init__(self,
+                 name: str,
+                 func: Callable[[Any], Any],
+                 workers: int = 1,
+                 queue_size: int = 2):
+        """
+        Args:
+            name: Stage name, used in logs, traces and statistics
+            func: Called with each item; its result goes to the next stage
+                and None drops the item
+            workers: Threads running the stage; stages driving the desktop keep 1
+            queue_size: Items allowed to wait at the input of the stage; when it
+                is full the previous stage blocks instead of piling up work
+        """
+        if workers < 1 or queue_size < 1:
+            raise ValueError(f"Stage {name} needs at least one worker and one queue slot")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+
+class Pipeline:
+    """Chain of stages connected by bounded queues, so slow steps overlap
+
+    While a GUI stage exports the next report, the stages after it parse and
+    load the previous one. Items can also enter at any stage (e.g. reports
+    already on disk go straight to parsing).
+    """
+
+    def __init__(self, name: str, stages: List[Stage], logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            name: Pipeline name, used in logs and thread names
+            stages: Stages in the order items flow through them
+            logger: Logger instance (default: 'pipeline' logger)
+        """
+        names = [stage.name for stage in stages]
+        if not stages or len(set(names)) != len(names):
+            raise ValueError(f"Pipeline {name} needs stages with unique names: {names}")
+        self.name = name
+        self.stages = stages
+        self.logger = logger or get_logger('pipeline')
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stop feeding new items; items already inside are dropped as workers reach them"""
+        self._stop.set()
+
+    def run(self,
+            items: Optional[Iterable[Any]] = None,
+            sources: Optional[Dict[str, Iterable[Any]]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Run items through the stages and wait until every stage is done
+
+        Args:
+            items: Items for the first stage
+            sources: Items for other stages, by stage name
+
+        Returns:
+            Dict of stage name to its processed, dropped, failed and skipped
+            item counts and busy seconds
+        """
+        sources = dict(sources or {})
+        if items is not None:
+            sources[self.stages[0].name] = items
+        unknown = set(sources) - {stage.name for stage in self.stages}
+        if unknown:
+            raise ValueError(f"Pipeline {self.name} has no stages {sorted(unknown)}")
+
+        self._stop.clear()
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        stats = {
+            stage.name: {'processed': 0, 'dropped': 0, 'failed': 0, 'skipped': 0, 'busy_seconds': 0.0}
+            for stage in self.stages
+        }
+        # A stage input closes once every worker of the previous stage and its source are done
+        producers = [
+            (self.stages[index - 1].workers if index else 0) + (stage.name in sources)
+            for index, stage in enumerate(self.stages)
+        ]
+        lock = threading.Lock()
+
+        def producer_done(index: int) -> None:
+            with lock:
+                producers[index] -= 1
+                closed = producers[index] == 0
+            if closed:
+                for _ in range(self.stages[index].workers):
+                    queues[index].put(_DONE)
+
+        def feed(index: int, source: Iterable[Any]) -> None:
+            items = iter(source)
+            try:
+                for item in items:
+                    if self._stop.is_set():
+                        break
+                    queues[index].put(item)
+            except Exception as e:
+                self.logger.error(f"Pipeline {self.name}: error reading the items of {self.stages[index].name}: {str(e)}")
+            finally:
+                # A generator source left early still runs its cleanup
+                close = getattr(items, 'close', None)
+                if close:
+                    close()
+                producer_done(index)
+
+        def work(index: int) -> None:
+            stage = self.stages[index]
+            counters = stats[stage.name]
+            try:
+                while True:
+                    item = queues[index].get()
+                    if item is _DONE:
+                        break
+                    # Keep draining after a stop so upstream puts never block
+                    if self._stop.is_set():
+                        with lock:
+                            counters['skipped'] += 1
+                        continue
+
+                    start_time = time.perf_counter()
+                    try:
+                        with span(f'pipeline.{stage.name}', pipeline=self.name):
+                            result = stage.func(item)
+                        outcome = 'processed' if result is not None else 'dropped'
+                    except Exception as e:
+                        result, outcome = None, 'failed'
+                        self.logger.error(f"Pipeline {self.name}: stage {stage.name} failed: {str(e)}")
+                    with lock:
+                        counters[outcome] += 1
+                        counters['busy_seconds'] += time.perf_counter() - start_time
+
+                    if result is not None and index + 1 < len(self.stages):
+                        queues[index + 1].put(result)
+            finally:
+                if index + 1 < len(self.stages):
+                    producer_done(index + 1)
+
+        # Every thread runs in a copy of the caller's context, so its spans go to the trace of the run
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for number in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=contextvars.copy_context().run, args=(work, index),
+                    name=f'{self.name}-{stage.name}-{number + 1}', daemon=True
+                ))
+            if stage.name in sources:
+                threads.append(threading.Thread(
+                    target=contextvars.copy_context().run, args=(feed, index, sources[stage.name]),
+                    name=f'{self.name}-{stage.name}-feed', daemon=True
+                ))
+        # Stages without a source or a previous stage have nothing to wait for
+        idle = [index for index, count in enumerate(producers) if count == 0]
+
+        start_time = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for index in idle:
+            for _ in range(self.stages[index].workers):
+                queues[index].put(_DONE)
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.logger.warning(f"Pipeline {self.name} interrupted; finishing the items in progress")
+            self.stop()
+            for thread in threads:
+                thread.join()
+            raise
+
+        for counters in stats.values():
+            counters['busy_seconds'] = round(counters['busy_seconds'], 3)
+        self.logger.info(
+            f"Pipeline {self.name} finished in {time.perf_counter() - start_time:.1f}s: " +
+            ', '.join(
+                f"{name} {counters['processed']} ok/{counters['dropped'] + counters['failed']} failed "
+                f"(busy {counters['busy_seconds']:.1f}s)"
+                for name, counters in stats.items()
+            )
+        )
+        return stats
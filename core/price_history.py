@@ -0,0 +1,140 @@
+from __future__ import annotations
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from core.lazy import lazy_import
+from core.database_manager import DatabaseManager
+from core.logger import get_logger
+from core.schema import PRECOS_API_SCHEMA, get_column_types
+
+pd = lazy_import('pandas')
+sql = lazy_import('psycopg2.sql')
+
+class PriceHistory:
+    """Versioned price store: one row per SKU price version with valid_from/valid_to"""
+
+    def __init__(self,
+                 db_manager: DatabaseManager,
+                 table_name: str = 'precos_historico',
+                 value_columns: Optional[List[str]] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.db_manager = db_manager
+        self.table_name = table_name
+        self.value_columns = value_columns or ['ean', 'preco_ultima_compra', 'preco_venda']
+        self.logger = logger or get_logger('price_history')
+
+    def ensure_schema(self) -> None:
+        """Create the history table and its lookup indexes if they do not exist"""
+        if not self.db_manager.connection:
+            self.db_manager.connect()
+
+        table = sql.Identifier(self.table_name)
+        column_types = get_column_types(PRECOS_API_SCHEMA)
+        value_columns = sql.SQL(', ').join(
+            sql.SQL("{} {}").format(sql.Identifier(col), sql.SQL(column_types.get(col, 'text')))
+            for col in self.value_columns
+        )
+        statements = [
+            sql.SQL(
+                "CREATE TABLE IF NOT EXISTS {} ("
+                "id bigserial PRIMARY KEY, sku text NOT NULL, {}, "
+                "valid_from timestamp NOT NULL, valid_to timestamp)"
+            ).format(table, value_columns),
+            # Only one open version per SKU
+            sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} (sku) WHERE valid_to IS NULL").format(
+                sql.Identifier(f'{self.table_name}_sku_current_key'), table
+            ),
+            # Range scan of the versions of one SKU
+            sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (sku, valid_from)").format(
+                sql.Identifier(f'{self.table_name}_sku_valid_from_idx'), table
+            ),
+            # Point-in-time lookup by EAN: latest version starting before the date
+            sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (ean, valid_from DESC) INCLUDE (valid_to)").format(
+                sql.Identifier(f'{self.table_name}_ean_valid_from_idx'), table
+            )
+        ]
+        for statement in statements:
+            self.db_manager.cursor.execute(statement)
+        self.db_manager.commit()
+
+        # Tables created before the declared column types existed are reported until they are migrated
+        self.db_manager.ensure_table(
+            self.table_name, {col: column_types.get(col, 'text') for col in self.value_columns}
+        )
+
+    def record_changes(self, new_versions: pd.DataFrame, closed_skus: List[str],
+                       changed_at: Optional[datetime] = None, commit: bool = True) -> None:
+        """
+        Close the current version of changed SKUs and open their new versions
+
+        Args:
+            new_versions: DataFrame with sku and the value columns of inserted or changed SKUs
+            closed_skus: SKUs whose current version ends now (changed and removed SKUs)
+            changed_at: Timestamp of the change (default: now)
+            commit: Commit at the end; pass False to keep the changes in the current transaction
+        """
+        changed_at = changed_at or datetime.now()
+        table = sql.Identifier(self.table_name)
+
+        try:
+            # New versions also close any open version left behind for the same SKU
+            skus = list(set(closed_skus) | set(new_versions['sku'].astype(str)))
+            if skus:
+                self.db_manager.cursor.execute(
+                    sql.SQL("UPDATE {} SET valid_to = %s WHERE sku = ANY(%s) AND valid_to IS NULL").format(table),
+                    (changed_at, skus)
+                )
+
+            if not new_versions.empty:
+                versions = new_versions[['sku'] + self.value_columns].copy()
+                versions['valid_from'] = changed_at
+                self.db_manager.insert_dataframe(versions, self.table_name, commit=False)
+
+            if commit:
+                self.db_manager.commit()
+
+            self.logger.info(
+                f"Recorded {len(new_versions)} new price versions and closed {len(closed_skus)} in {self.table_name}"
+            )
+
+        except Exception as e:
+            self.db_manager.rollback()
+            raise Exception(f"Error recording price history: {str(e)}")
+
+    def price_at(self, ean: str, when: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Get the price version of an EAN that was valid at a given moment
+
+        Args:
+            ean: Barcode of the product
+            when: Moment of the lookup
+
+        Returns:
+            Dict with the version columns, or None if the EAN had no price then
+        """
+        self.db_manager.cursor.execute(sql.SQL(
+            "SELECT * FROM {} WHERE ean = %s AND valid_from <= %s "
+            "AND (valid_to IS NULL OR valid_to > %s) ORDER BY valid_from DESC LIMIT 1"
+        ).format(sql.Identifier(self.table_name)), (ean, when, when))
+        row = self.db_manager.cursor.fetchone()
+        return dict(row) if row else None
+
+    def get_history(self, sku: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Get the price versions of a SKU overlapping a period
+
+        Args:
+            sku: Product code
+            start: Beginning of the period (default: no lower bound)
+            end: End of the period (default: no upper bound)
+
+        Returns:
+            DataFrame with one row per version ordered by valid_from
+        """
+        self.db_manager.cursor.execute(sql.SQL(
+            "SELECT * FROM {} WHERE sku = %s AND valid_from < COALESCE(%s, 'infinity'::timestamp) "
+            "AND (valid_to IS NULL OR valid_to > COALESCE(%s, '-infinity'::timestamp)) ORDER BY valid_from"
+        ).format(sql.Identifier(self.table_name)), (sku, end, start))
+        rows = self.db_manager.cursor.fetchall()
+        columns = [column.name for column in self.db_manager.cursor.description]
+        return pd.DataFrame([list(row) for row in rows], columns=columns)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+import logging
+from typing import Optional, List, Dict
+from core.lazy import lazy_import
+from core.database_manager import DatabaseManager
+from core.price_history import PriceHistory
+from core.logger import get_logger
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+sql = lazy_import('psycopg2.sql')
+
+def compute_row_digests(df: pd.DataFrame, key_column: str, columns: List[str]) -> pd.Series:
+    """
+    Compute a 64-bit digest of the given columns for every row
+
+    Args:
+        df: DataFrame with the rows to hash
+        key_column: Column identifying each row, used as the index of the result
+        columns: Columns that take part in the digest
+
+    Returns:
+        Series of int64 digests indexed by key
+    """
+    hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    return pd.Series(hashes.to_numpy().view(np.int64), index=df[key_column].astype(str).to_numpy())
+
+def diff_digests(current: pd.Series, stored: pd.Series) -> Dict[str, pd.Index]:
+    """
+    Compare the digests of the current report with the stored digest index
+
+    Args:
+        current: Digests of the current report indexed by key
+        stored: Digests saved by the previous sync indexed by key
+
+    Returns:
+        Dict with the keys to insert, update and delete
+    """
+    common = current.index.intersection(stored.index)
+    changed = common[current.loc[common].to_numpy() != stored.loc[common].to_numpy()]
+    return {
+        'inserts': current.index.difference(stored.index),
+        'updates': changed,
+        'deletes': stored.index.difference(current.index)
+    }
+
+class PriceSync:
+    """Writes only the SKUs whose price data changed since the previous sync"""
+
+    def __init__(self,
+                 db_manager: DatabaseManager,
+                 table_name: str = 'precos_api',
+                 key_column: str = 'sku',
+                 digest_columns: Optional[List[str]] = None,
+                 immutable_columns: Optional[List[str]] = None,
+                 id_column: Optional[str] = None,
+                 history: Optional[PriceHistory] = None,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            db_manager: DatabaseManager used for the table, the digests and the history
+            table_name: Name of the synced table
+            key_column: Column identifying each row
+            digest_columns: Columns whose changes cause an update
+            immutable_columns: Columns written on insert but never updated
+            id_column: Surrogate key filled by a sequence for new rows; it is
+                never written by the sync, so existing ids are kept
+            history: PriceHistory that records every price version
+            logger: Logger instance (default: 'price_sync' logger)
+        """
+        self.db_manager = db_manager
+        self.table_name = table_name
+        self.digest_table = f'{table_name}_digests'
+        self.key_column = key_column
+        self.digest_columns = digest_columns or ['sku', 'ean', 'preco_ultima_compra', 'preco_venda']
+        self.immutable_columns = immutable_columns or []
+        self.id_column = id_column
+        self.history = history
+        self.logger = logger or get_logger('price_sync')
+
+    def ensure_schema(self) -> None:
+        """Create the digest index table if it does not exist"""
+        if not self.db_manager.connection:
+            self.db_manager.connect()
+
+        self.db_manager.cursor.execute(sql.SQL(
+            "CREATE TABLE IF NOT EXISTS {} ({} text PRIMARY KEY, digest bigint NOT NULL)"
+        ).format(sql.Identifier(self.digest_table), sql.Identifier(self.key_column)))
+        if self.id_column:
+            self._ensure_id_sequence()
+        self.db_manager.commit()
+
+        if self.history:
+            self.history.ensure_schema()
+
+    def _ensure_id_sequence(self) -> None:
+        """
+        Make new rows take their id from a sequence that continues after the highest id
+
+        The sequence is not owned by the table, so replace_table can drop the
+        previous table while the new one keeps using it.
+        """
+        table = sql.Identifier(self.table_name)
+        column = sql.Identifier(self.id_column)
+        sequence_name = f'{self.table_name}_{self.id_column}_seq'
+        self.db_manager.cursor.execute(sql.SQL("CREATE SEQUENCE IF NOT EXISTS {}").format(sql.Identifier(sequence_name)))
+        # Full refreshes write ids of their own, so the sequence is moved past them on every sync
+        self.db_manager.cursor.execute(sql.SQL(
+            "SELECT setval(%s, COALESCE(MAX({}), 0) + 1, false) FROM {}"
+        ).format(column, table), (sequence_name,))
+        self.db_manager.cursor.execute(sql.SQL("ALTER TABLE {} ALTER COLUMN {} SET DEFAULT nextval({})").format(
+            table, column, sql.Literal(sequence_name)
+        ))
+
+    def load_digests(self) -> pd.Series:
+        """
+        Read the digest index saved by the previous sync
+
+        Returns:
+            Series of int64 digests indexed by key
+        """
+        self.db_manager.cursor.execute(sql.SQL("SELECT {}, digest FROM {}").format(
+            sql.Identifier(self.key_column), sql.Identifier(self.digest_table)
+        ))
+        rows = self.db_manager.cursor.fetchall()
+        return pd.Series(
+            [row[1] for row in rows],
+            index=pd.Index([row[0] for row in rows], dtype=object),
+            dtype=np.int64
+        )
+
+    def sync(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Synchronize the table with the current price report
+
+        Args:
+            df: DataFrame with the table columns, one row per SKU
+
+        Returns:
+            Dict with the number of inserted, updated and deleted rows
+        """
+        self.ensure_schema()
+
+        duplicated = df[self.key_column].duplicated(keep='last')
+        if duplicated.any():
+            self.logger.warning(f"Ignoring {int(duplicated.sum())} duplicated {self.key_column} rows")
+            df = df[~duplicated]
+        if self.id_column:
+            df = df.drop(columns=[self.id_column], errors='ignore')
+        df = df.set_index(df[self.key_column].astype(str).to_numpy(), drop=False)
+
+        current = compute_row_digests(df, self.key_column, self.digest_columns)
+        stored = self.load_digests()
+
+        if stored.empty:
+            # No digest index yet: load everything once and start tracking from here
+            self.logger.info(f"No digest index for {self.table_name}, running a full refresh")
+            rows = self.db_manager.replace_table(df.reset_index(drop=True), self.table_name)
+            self.db_manager.replace_table(self._digest_frame(current), self.digest_table)
+            if self.history:
+                self.history.record_changes(df, [])
+            return {'inserted': rows, 'updated': 0, 'deleted': 0}
+
+        diff = diff_digests(current, stored)
+        counts = self.db_manager.apply_diff(
+            self.table_name,
+            self.key_column,
+            inserts=df.loc[diff['inserts']].reset_index(drop=True),
+            updates=df.loc[diff['updates']].drop(columns=self.immutable_columns).reset_index(drop=True),
+            deletes=diff['deletes'].tolist(),
+            commit=False
+        )
+        if self.history:
+            self.history.record_changes(
+                df.loc[diff['inserts'].append(diff['updates'])],
+                diff['updates'].append(diff['deletes']).tolist(),
+                commit=False
+            )
+        # Same transaction: the digest index never drifts from the table content
+        self.db_manager.apply_diff(
+            self.digest_table,
+            self.key_column,
+            inserts=self._digest_frame(current.loc[diff['inserts']]),
+            updates=self._digest_frame(current.loc[diff['updates']]),
+            deletes=diff['deletes'].tolist()
+        )
+
+        self.logger.info(
+            f"Synced {self.table_name}: {counts['inserted']} inserted, "
+            f"{counts['updated']} updated, {counts['deleted']} deleted, "
+            f"{len(current) - len(diff['inserts']) - len(diff['updates'])} unchanged"
+        )
+        return counts
+
+    def _digest_frame(self, digests: pd.Series) -> pd.DataFrame:
+        """Build a DataFrame in the digest table layout"""
+        return pd.DataFrame({self.key_column: digests.index.to_numpy(), 'digest': digests.to_numpy()})
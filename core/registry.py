@@ -0,0 +1,134 @@
+import os
+import importlib
+from typing import Optional, List, Dict, Any
+
+# Installed packages can add bots by declaring entry points in this group,
+# e.g. in setup.cfg: [options.entry_points] erp_automation.bots = estoque = estoque_bot.bot:EstoqueBot
+ENTRY_POINT_GROUP = 'erp_automation.bots'
+
+class BotSpec:
+    """Where a bot lives and how it is run, known without importing it"""
+
+    def __init__(self,
+                 name: str,
+                 target: str,
+                 description: str = '',
+                 method: str = 'run',
+                 backfill: bool = False,
+                 gui: bool = True):
+        """
+        Args:
+            name: Name used on the command line and in schedule files
+            target: 'module:ClassName' of the bot class
+            description: One line shown by --list
+            method: Method that runs the bot
+            backfill: Whether the bot has run_backfill (--start/--end)
+            gui: Whether the bot drives the desktop
+        """
+        self.name = name
+        self.target = target
+        self.description = description
+        self.method = method
+        self.backfill = backfill
+        self.gui = gui
+
+    def load(self) -> Any:
+        """
+        Import the bot module and get its class
+
+        Raises:
+            ImportError: If the module or the class does not exist
+        """
+        module_name, _, class_name = self.target.partition(':')
+        module = importlib.import_module(module_name)
+        try:
+            return getattr(module, class_name)
+        except AttributeError:
+            raise ImportError(f"Module {module_name} has no bot class {class_name}") from None
+
+# Bots shipped with the project; bots/<name>/bot.py packages not listed here
+# are found by convention (vendas_pdv -> VendasPdvBot)
+BUILTIN_BOTS: List[BotSpec] = [
+    BotSpec(
+        'vendas_pdv', 'bots.vendas_pdv.bot:VendasPdvBot',
+        description='Uniplus sales by PDV report loaded into PostgreSQL',
+        backfill=True
+    ),
+    # DesktopBot.main() only reads BotMaestro credentials from sys.argv (which
+    # holds this program's own arguments) and then calls action(execution); run
+    # locally it passes execution=None, exactly like calling action() here
+    BotSpec(
+        'precos', 'bot_uniplus_report_precos.bot_report_uniplus_prices:Bot',
+        description='Uniplus price report synced to PostgreSQL',
+        method='action'
+    )
+]
+
+def _class_name(bot_name: str) -> str:
+    """Conventional class name of a bot package (vendas_pdv -> VendasPdvBot)"""
+    return ''.join(part.capitalize() for part in bot_name.split('_')) + 'Bot'
+
+def _entry_point_bots() -> List[BotSpec]:
+    """Bots declared by installed packages; their modules are not imported here"""
+    try:
+        from importlib.metadata import entry_points
+        found = entry_points()
+        if hasattr(found, 'select'):
+            found = found.select(group=ENTRY_POINT_GROUP)
+        else:
+            found = found.get(ENTRY_POINT_GROUP, [])
+    except Exception:
+        return []
+    return [BotSpec(entry.name, entry.value, description=f'plugin ({entry.value})') for entry in found]
+
+def _package_bots(bots_dir: str) -> List[BotSpec]:
+    """Bots found as bots/<name>/bot.py"""
+    if not os.path.isdir(bots_dir):
+        return []
+    return [
+        BotSpec(name, f'bots.{name}.bot:{_class_name(name)}')
+        for name in sorted(os.listdir(bots_dir))
+        if os.path.isfile(os.path.join(bots_dir, name, 'bot.py'))
+    ]
+
+_registry: Optional[Dict[str, BotSpec]] = None
+
+def discover_bots(bots_dir: Optional[str] = None) -> Dict[str, BotSpec]:
+    """
+    Get every known bot, by name
+
+    Built-in declarations win over bots/ packages, and installed entry
+    points over both. Nothing is imported, so listing bots is instantaneous.
+
+    Args:
+        bots_dir: Directory scanned for bot packages (default: bots/ of the project)
+
+    Returns:
+        Dict of bot name to BotSpec
+    """
+    global _registry
+    if _registry is not None and bots_dir is None:
+        return _registry
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    registry: Dict[str, BotSpec] = {}
+    for spec in _package_bots(bots_dir or os.path.join(project_dir, 'bots')):
+        registry[spec.name] = spec
+    for spec in BUILTIN_BOTS + _entry_point_bots():
+        registry[spec.name] = spec
+
+    if bots_dir is None:
+        _registry = registry
+    return registry
+
+def get_bot(name: str) -> BotSpec:
+    """
+    Get the spec of a bot
+
+    Raises:
+        KeyError: If no bot has that name
+    """
+    registry = discover_bots()
+    if name not in registry:
+        raise KeyError(f"Unknown bot: {name} (available: {', '.join(sorted(registry))})")
+    return registry[name]
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import os
+import time
+import hashlib
+import logging
+from typing import Optional, List, Tuple
+from core.lazy import lazy_import
+from core.logger import get_logger
+
+pd = lazy_import('pandas')
+pa = lazy_import('pyarrow')
+
+class ReportCache:
+    """Local Arrow IPC cache of parsed reports, keyed by file content hash and parser version"""
+
+    def __init__(self,
+                 cache_dir: str,
+                 parser_version: str,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            cache_dir: Directory holding the cached reports
+            parser_version: Version of the parser; bump it whenever parsing changes
+            max_bytes: Total cache size above which least recently used entries are evicted
+            logger: Logger instance (default: 'report_cache' logger)
+        """
+        self.cache_dir = cache_dir
+        self.parser_version = parser_version
+        self.max_bytes = max_bytes
+        self.logger = logger or get_logger('report_cache')
+        # Copies pickled into parser worker processes keep this pid and never evict,
+        # so only the process that created the cache removes entries
+        self._owner_pid = os.getpid()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+        """
+        Compute the SHA-256 of a file's content
+
+        Args:
+            file_path: Path to the file
+            block_size: Bytes read at a time
+
+        Returns:
+            Hex digest of the content
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _entry_path(self, file_path: str, content_hash: Optional[str] = None) -> str:
+        """Path of the cache entry for a report file"""
+        content_hash = content_hash or self.file_hash(file_path)
+        return os.path.join(self.cache_dir, f'{content_hash}_v{self.parser_version}.arrow')
+
+    def get(self, file_path: str, content_hash: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """
+        Load the parsed DataFrame of a report file if it is cached
+
+        Args:
+            file_path: Path to the original report file
+            content_hash: file_hash of the report, if already computed
+
+        Returns:
+            DataFrame if cached, None otherwise
+        """
+        try:
+            entry_path = self._entry_path(file_path, content_hash)
+            if not os.path.exists(entry_path):
+                return None
+
+            start_time = time.perf_counter()
+            with pa.memory_map(entry_path, 'r') as source:
+                df = pa.ipc.open_file(source).read_all().to_pandas()
+            # Touch the entry so eviction treats it as recently used
+            os.utime(entry_path)
+
+            self.logger.info(
+                f"Loaded {os.path.basename(file_path)} from cache in {(time.perf_counter() - start_time) * 1000:.1f}ms"
+            )
+            return df
+
+        except Exception as e:
+            self.logger.warning(f"Error reading cache entry for {file_path}: {str(e)}")
+            return None
+
+    def put(self, file_path: str, df: pd.DataFrame, content_hash: Optional[str] = None) -> bool:
+        """
+        Store the parsed DataFrame of a report file
+
+        Entries are evicted afterwards only in the process that created the
+        cache; workers leave it to that process's evict() call.
+
+        Args:
+            file_path: Path to the original report file
+            df: Parsed DataFrame
+            content_hash: file_hash of the report, if already computed
+
+        Returns:
+            bool: True if stored, False otherwise
+        """
+        try:
+            entry_path = self._entry_path(file_path, content_hash)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+
+            # Write to a temporary file first so a crash never leaves a truncated entry
+            temp_path = f'{entry_path}.tmp'
+            with pa.OSFile(temp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(temp_path, entry_path)
+
+            if os.getpid() == self._owner_pid:
+                self.evict()
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"Error writing cache entry for {file_path}: {str(e)}")
+            return False
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries: List[Tuple[float, int, str]] = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.arrow'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already removed by another bot process sharing the cache
+                pass
+            total_bytes -= size
+            self.logger.info(f"Evicted cache entry {os.path.basename(path)}")
@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Callable, Set
+from core.logger import get_logger
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day month weekday) with *, lists, ranges and steps"""
+
+    # (minimum, maximum) of each field; weekday 0 is Sunday and 7 is accepted as Sunday too
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        """
+        Args:
+            expression: Cron expression, e.g. '0 7-19 * * 1-6' (hourly 7h-19h, Monday to Saturday)
+        """
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression (expected 5 fields): {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(part, *limits) for part, limits in zip(parts, self.FIELDS)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        # Like cron, a restricted day and weekday match when either of them matches
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse_field(field: str, minimum: int, maximum: int) -> Set[int]:
+        """Expand one cron field into the set of values it matches"""
+        values = set()
+        for item in field.split(','):
+            value_range, _, step = item.partition('/')
+            if value_range == '*':
+                start, end = minimum, maximum
+            elif '-' in value_range:
+                start, end = (int(value) for value in value_range.split('-', 1))
+            else:
+                start = int(value_range)
+                end = maximum if step else start
+            if start < minimum or end > maximum or start > end:
+                raise ValueError(f"Invalid cron field: {field}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        """Whether the day of month and weekday fields match a date"""
+        day_matches = moment.day in self.days
+        weekday_matches = (moment.isoweekday() % 7) in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_matches and weekday_matches
+        return day_matches or weekday_matches
+
+    def matches(self, moment: datetime) -> bool:
+        """Whether the schedule fires at the minute of a datetime"""
+        return (moment.minute in self.minutes and moment.hour in self.hours
+                and moment.month in self.months and self._day_matches(moment))
+
+    def previous(self, moment: datetime, max_days: int = 366) -> Optional[datetime]:
+        """
+        Get the last time the schedule fired at or before a moment
+
+        Args:
+            moment: Reference moment
+            max_days: How far back to look
+
+        Returns:
+            Fire time (seconds zeroed), or None if it did not fire in max_days
+        """
+        candidate = moment.replace(second=0, microsecond=0)
+        limit = candidate - timedelta(days=max_days)
+        while candidate > limit:
+            # Skip whole days and hours that cannot match
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = candidate.replace(hour=23, minute=59) - timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=59) - timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate -= timedelta(minutes=1)
+            else:
+                return candidate
+        return None
+
+    def next(self, moment: datetime, max_days: int = 366) -> Optional[datetime]:
+        """
+        Get the next time the schedule fires after a moment
+
+        Args:
+            moment: Reference moment
+            max_days: How far ahead to look
+
+        Returns:
+            Fire time, or None if it does not fire in max_days
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=max_days)
+        while candidate < limit:
+            # Skip whole days and hours that cannot match
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        return None
+
+class Job:
+    """Scheduled unit of work: a bot run or a DB-only stage"""
+
+    def __init__(self,
+                 name: str,
+                 cron: str,
+                 target: Callable[[], Any],
+                 gui: bool = True,
+                 catch_up: bool = True):
+        """
+        Args:
+            name: Unique job name (used in the status file)
+            cron: Cron expression of the job
+            target: Callable doing the work
+            gui: Whether the job drives the desktop; GUI jobs never overlap
+            catch_up: Run once at start-up if a fire time was missed while the daemon was down
+        """
+        self.name = name
+        self.schedule = CronSchedule(cron)
+        self.target = target
+        self.gui = gui
+        self.catch_up = catch_up
+
+class Scheduler:
+    """Resident runner of cron jobs sharing one process, one DB pool and one desktop"""
+
+    def __init__(self,
+                 jobs: List[Job],
+                 status_file: str = os.path.join('status', 'scheduler.json'),
+                 max_workers: int = 4,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            jobs: Jobs to run
+            status_file: JSON file with the latest state of the daemon and its jobs
+            max_workers: Maximum number of jobs running at the same time
+            logger: Logger instance (default: 'scheduler' logger)
+        """
+        names = [job.name for job in jobs]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate job names: {names}")
+        self.jobs = {job.name: job for job in jobs}
+        self.status_file = status_file
+        self.logger = logger or get_logger('scheduler')
+        self.desktop_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._stop = threading.Event()
+        self._status_lock = threading.Lock()
+        self._running: Set[str] = set()
+        self._status = self._load_status()
+        self._status['started_at'] = datetime.now().isoformat(timespec='seconds')
+        self._status['pid'] = os.getpid()
+
+    def _load_status(self) -> Dict[str, Any]:
+        """Read the previous status file, used to detect missed runs"""
+        try:
+            if os.path.exists(self.status_file):
+                with open(self.status_file, 'r') as f:
+                    status = json.load(f)
+                status.setdefault('jobs', {})
+                return status
+        except Exception as e:
+            self.logger.warning(f"Error reading scheduler status {self.status_file}: {str(e)}")
+        return {'jobs': {}}
+
+    def _save_status(self) -> None:
+        """Write the status file (called with the status lock held)"""
+        now = datetime.now()
+        self._status['updated_at'] = now.isoformat(timespec='seconds')
+        for name, job in self.jobs.items():
+            next_run = job.schedule.next(now)
+            entry = self._status['jobs'].setdefault(name, {})
+            entry.update({
+                'cron': job.schedule.expression,
+                'gui': job.gui,
+                'running': name in self._running,
+                'next_run': next_run.isoformat(timespec='seconds') if next_run else None
+            })
+        try:
+            os.makedirs(os.path.dirname(self.status_file) or '.', exist_ok=True)
+            temp_path = f'{self.status_file}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(self._status, f, indent=2)
+            os.replace(temp_path, self.status_file)
+        except Exception as e:
+            self.logger.warning(f"Error writing scheduler status {self.status_file}: {str(e)}")
+
+    def _update_job(self, name: str, **fields: Any) -> None:
+        """Update the status entry of a job and write the status file"""
+        with self._status_lock:
+            self._status['jobs'].setdefault(name, {}).update(fields)
+            self._save_status()
+
+    def _run_job(self, job: Job, fire_time: datetime) -> None:
+        """Run a job, holding the desktop lock for GUI jobs"""
+        try:
+            if job.gui:
+                if not self.desktop_lock.acquire(blocking=False):
+                    self.logger.info(f"Job {job.name} waiting for the desktop")
+                    self.desktop_lock.acquire()
+            try:
+                start_time = time.perf_counter()
+                self._update_job(job.name, last_start=datetime.now().isoformat(timespec='seconds'),
+                                 last_fire=fire_time.isoformat(timespec='seconds'))
+                self.logger.info(f"Starting job {job.name} (scheduled {fire_time:%Y-%m-%d %H:%M})")
+                job.target()
+                status, error = 'success', None
+            except Exception as e:
+                status, error = 'failed', f"{type(e).__name__}: {str(e)}"
+                self.logger.error(f"Job {job.name} failed: {error}\n{traceback.format_exc()}")
+            finally:
+                if job.gui:
+                    self.desktop_lock.release()
+
+            elapsed = time.perf_counter() - start_time
+            with self._status_lock:
+                entry = self._status['jobs'].setdefault(job.name, {})
+                entry['runs'] = entry.get('runs', 0) + 1
+                entry['failures'] = entry.get('failures', 0) + (status == 'failed')
+            self.logger.info(f"Job {job.name} finished with {status} in {elapsed:.1f}s")
+            self._update_job(job.name, last_end=datetime.now().isoformat(timespec='seconds'),
+                             last_status=status, last_error=error, last_seconds=round(elapsed, 1))
+        finally:
+            with self._status_lock:
+                self._running.discard(job.name)
+                self._save_status()
+
+    def trigger(self, name: str, fire_time: Optional[datetime] = None) -> bool:
+        """
+        Submit a job now unless it is still running (runs are coalesced, never stacked)
+
+        Args:
+            name: Job name
+            fire_time: Scheduled time being served (default: now)
+
+        Returns:
+            True if the job was submitted, False if it was already running
+        """
+        job = self.jobs[name]
+        with self._status_lock:
+            if name in self._running:
+                self.logger.warning(f"Job {name} is still running; skipping the {fire_time or 'manual'} run")
+                return False
+            self._running.add(name)
+        self._executor.submit(self._run_job, job, fire_time or datetime.now().replace(second=0, microsecond=0))
+        return True
+
+    def _catch_up(self, now: datetime) -> None:
+        """Run once the jobs whose last fire time passed while the daemon was down"""
+        for name, job in self.jobs.items():
+            if not job.catch_up:
+                continue
+            missed = job.schedule.previous(now - timedelta(minutes=1))
+            last_fire = self._status['jobs'].get(name, {}).get('last_fire')
+            # Jobs that never ran have no history to catch up with
+            if missed and last_fire and datetime.fromisoformat(last_fire) < missed:
+                self.logger.info(f"Catching up missed run of {name} scheduled for {missed:%Y-%m-%d %H:%M}")
+                self.trigger(name, missed)
+
+    def run_forever(self) -> None:
+        """Fire the jobs on their schedules until stop() is called"""
+        now = datetime.now().replace(second=0, microsecond=0)
+        self._catch_up(now)
+        with self._status_lock:
+            self._save_status()
+        self.logger.info(f"Scheduler started with {len(self.jobs)} jobs: {', '.join(self.jobs)}")
+
+        last_tick = now - timedelta(minutes=1)
+        try:
+            while not self._stop.is_set():
+                now = datetime.now().replace(second=0, microsecond=0)
+                # Every minute since the last tick is checked, so a stalled loop
+                # (sleep, long GC, clock jump) still fires each job once
+                minute = last_tick + timedelta(minutes=1)
+                if now - minute > timedelta(days=1):
+                    minute = now
+                due = {}
+                while minute <= now:
+                    for name, job in self.jobs.items():
+                        if job.schedule.matches(minute):
+                            due[name] = minute
+                    minute += timedelta(minutes=1)
+                last_tick = now
+                for name, fire_time in due.items():
+                    self.trigger(name, fire_time)
+
+                # Wake up right after the next minute starts
+                self._stop.wait(60.5 - datetime.now().second - datetime.now().microsecond / 1e6)
+        finally:
+            self.logger.info("Scheduler stopping; waiting for running jobs")
+            self._executor.shutdown(wait=True)
+            with self._status_lock:
+                self._status['stopped_at'] = datetime.now().isoformat(timespec='seconds')
+                self._save_status()
+
+    def stop(self) -> None:
+        """Ask run_forever to return after the running jobs finish"""
+        self._stop.set()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+from typing import List, Dict, Optional
+from core.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+class Column:
+    """Declared type of a table column, used both by the ETL and the table DDL"""
+
+    # Column kind -> (pandas dtype after parsing, PostgreSQL type)
+    KINDS = {
+        'text': ('string', 'text'),
+        'category': ('category', 'text'),
+        'integer': ('Int64', 'integer'),
+        'decimal': ('float64', 'numeric'),
+        'date': ('datetime64[ns]', 'date'),
+        'time': ('timedelta64[ns]', 'time'),
+        'timestamp': ('datetime64[ns]', 'timestamp')
+    }
+
+    def __init__(self, name: str, kind: str, sql_type: Optional[str] = None):
+        """
+        Args:
+            name: Column name in the DataFrame and in the table
+            kind: One of Column.KINDS
+            sql_type: PostgreSQL type overriding the default of the kind
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown column kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.sql_type = sql_type or self.KINDS[kind][1]
+
+VENDAS_PDV_SCHEMA = [
+    Column('pdv', 'integer', 'smallint'),
+    Column('filial', 'category'),
+    Column('usuario', 'category'),
+    Column('vendedor', 'category'),
+    Column('emissao', 'date'),
+    Column('hora', 'time'),
+    Column('documento', 'text'),
+    Column('ccf', 'text'),
+    Column('v_bruto', 'decimal'),
+    Column('desconto', 'decimal'),
+    Column('acrescimo', 'decimal'),
+    Column('v_venda', 'decimal'),
+    Column('devolucao_troca', 'decimal'),
+    Column('v_liquido', 'decimal'),
+    Column('canc', 'category'),
+    Column('cliente', 'text'),
+    Column('cnpj_cpf', 'text'),
+    Column('finalizador', 'category'),
+    Column('valor_finalizador', 'decimal')
+]
+
+PRECOS_API_SCHEMA = [
+    Column('id', 'integer'),
+    Column('date_insert', 'timestamp'),
+    Column('sku', 'text'),
+    Column('ean', 'text'),
+    Column('preco_ultima_compra', 'decimal'),
+    Column('preco_venda', 'decimal')
+]
+
+# Tables whose columns follow a declared schema, converted by 'main.py --migrate'
+TABLE_SCHEMAS = {
+    'uniplus_vendas_pdvs': VENDAS_PDV_SCHEMA,
+    'precos_api': PRECOS_API_SCHEMA,
+    'precos_historico': [
+        column for column in PRECOS_API_SCHEMA if column.name in ('ean', 'preco_ultima_compra', 'preco_venda')
+    ]
+}
+
+# Unique keys of the tables deduplicated by the database (see DatabaseManager.upsert_dataframe)
+TABLE_UNIQUE_KEYS = {
+    'uniplus_vendas_pdvs': ['emissao', 'hora', 'documento']
+}
+
+def parse_br_number(series: pd.Series) -> pd.Series:
+    """
+    Parse numbers in Brazilian format ('1.234,56', 'R$ 10,00') into float64
+
+    Values that are already numeric are kept. Dots are thousands separators
+    when the string has a comma or only dot-separated groups of three digits
+    ('1.234', '1.234.567'); other strings are read as plain numbers ('12.5').
+
+    Args:
+        series: Series with numbers and/or strings
+
+    Returns:
+        float64 Series, NaN where the value cannot be parsed
+    """
+    is_text = series.map(lambda value: isinstance(value, str))
+    numbers = pd.to_numeric(series.where(~is_text), errors='coerce')
+    if is_text.any():
+        text = series[is_text].str.replace('R$', '', regex=False).str.strip()
+        brazilian = text.str.contains(',', regex=False) | text.str.fullmatch(r'-?\d{1,3}(\.\d{3})+')
+        text = text.where(~brazilian, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+        numbers[is_text] = pd.to_numeric(text, errors='coerce')
+    return numbers.astype('float64')
+
+def parse_br_date(series: pd.Series) -> pd.Series:
+    """
+    Parse dates in 'dd/mm/yyyy' format, keeping values that are already dates
+
+    Args:
+        series: Series with dates and/or strings
+
+    Returns:
+        datetime64 Series, NaT where the value cannot be parsed
+    """
+    is_text = series.map(lambda value: isinstance(value, str))
+    dates = pd.to_datetime(series.where(~is_text), errors='coerce')
+    if is_text.any():
+        dates[is_text] = pd.to_datetime(series[is_text].str.strip(), format='%d/%m/%Y', errors='coerce')
+    return dates.astype('datetime64[ns]')
+
+def parse_time(series: pd.Series) -> pd.Series:
+    """
+    Parse times of day ('HH:MM:SS' strings or datetime.time values) into timedelta64
+
+    Args:
+        series: Series with times and/or strings
+
+    Returns:
+        timedelta64 Series, NaT where the value cannot be parsed
+    """
+    text = series.map(lambda value: value if value is None or isinstance(value, (str, float)) else str(value))
+    return pd.to_timedelta(text, errors='coerce')
+
+def apply_schema(df: pd.DataFrame, schema: List[Column]) -> pd.DataFrame:
+    """
+    Convert the columns of a DataFrame to the declared types
+
+    Columns of the schema missing in the DataFrame are ignored and columns
+    not declared in the schema are left untouched.
+
+    Args:
+        df: DataFrame to convert
+        schema: Declared columns
+
+    Returns:
+        Converted DataFrame
+    """
+    df = df.copy()
+    for column in schema:
+        if column.name not in df.columns:
+            continue
+        values = df[column.name]
+        if column.kind == 'decimal':
+            df[column.name] = parse_br_number(values)
+        elif column.kind == 'integer':
+            df[column.name] = parse_br_number(values).round().astype('Int64')
+        elif column.kind == 'date':
+            df[column.name] = parse_br_date(values).dt.normalize()
+        elif column.kind == 'timestamp':
+            df[column.name] = parse_br_date(values)
+        elif column.kind == 'time':
+            df[column.name] = parse_time(values)
+        else:
+            # Missing values stay missing instead of becoming the text 'nan'
+            text = values.astype(object).map(lambda value: None if pd.isna(value) else str(value).strip())
+            df[column.name] = text.astype(Column.KINDS[column.kind][0])
+    return df
+
+def get_column_types(schema: List[Column]) -> Dict[str, str]:
+    """
+    Get the PostgreSQL type of each declared column
+
+    Args:
+        schema: Declared columns
+
+    Returns:
+        Dict of column name to PostgreSQL type
+    """
+    return {column.name: column.sql_type for column in schema}
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import os
+import time
+import logging
+from typing import Optional, Tuple, Dict, List
+from core.lazy import lazy_import
+from core.logger import get_logger
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pyautogui = lazy_import('pyautogui')
+
+class TemplateRegistry:
+    """Screenshots decoded once per session and matched against the screen with OpenCV"""
+
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, grayscale: bool = True, scale: float = 1.0, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            grayscale: Match in grayscale (faster, insensitive to small color changes)
+            scale: Factor applied to templates and screenshots before matching;
+                values below 1 trade precision for speed
+            logger: Logger instance (default: 'template_registry' logger)
+        """
+        self.grayscale = grayscale
+        self.scale = scale
+        self.logger = logger or get_logger('template_registry')
+        self._templates: Dict[str, Optional[np.ndarray]] = {}
+
+    def _preprocess(self, image: np.ndarray) -> np.ndarray:
+        """Apply the registry scale to a decoded image"""
+        if self.scale != 1.0:
+            image = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return image
+
+    def load(self, image_path: str) -> Optional[np.ndarray]:
+        """
+        Get the decoded template of an image, reading it from disk only the first time
+
+        Args:
+            image_path: Path to the image file
+
+        Returns:
+            Preprocessed template, or None if the file does not exist or cannot be decoded
+        """
+        key = os.path.abspath(image_path)
+        if key not in self._templates:
+            flags = cv2.IMREAD_GRAYSCALE if self.grayscale else cv2.IMREAD_COLOR
+            image = cv2.imread(key, flags) if os.path.exists(key) else None
+            if image is None:
+                self.logger.debug(f"Template not found or invalid: {image_path}")
+            self._templates[key] = self._preprocess(image) if image is not None else None
+        return self._templates[key]
+
+    def size(self, image_path: str) -> Optional[Tuple[int, int]]:
+        """
+        Get the on-screen size of a template
+
+        Args:
+            image_path: Path to the image file
+
+        Returns:
+            (width, height) in screen pixels, or None if the template is not available
+        """
+        template = self.load(image_path)
+        if template is None:
+            return None
+        return int(template.shape[1] / self.scale), int(template.shape[0] / self.scale)
+
+    def warm_up(self, directory: str) -> Dict[str, float]:
+        """
+        Load every image of a directory (recursively) into the registry
+
+        Args:
+            directory: Directory with the template images
+
+        Returns:
+            Dict of image path to load time in milliseconds
+        """
+        report = {}
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if not name.lower().endswith(self.IMAGE_EXTENSIONS):
+                    continue
+                image_path = os.path.join(root, name)
+                start_time = time.perf_counter()
+                self.load(image_path)
+                report[image_path] = (time.perf_counter() - start_time) * 1000
+
+        if report:
+            slowest = max(report, key=report.get)
+            self.logger.info(
+                f"Loaded {len(report)} templates from {directory} in {sum(report.values()):.1f}ms "
+                f"(slowest: {os.path.basename(slowest)} {report[slowest]:.1f}ms)"
+            )
+        return report
+
+    def capture(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Take a screenshot preprocessed like the templates
+
+        Args:
+            region: (left, top, width, height) to capture (default: full screen)
+
+        Returns:
+            Screenshot as an array ready for matching
+        """
+        screenshot = np.array(pyautogui.screenshot(region=region))
+        code = cv2.COLOR_RGB2GRAY if self.grayscale else cv2.COLOR_RGB2BGR
+        return self._preprocess(cv2.cvtColor(screenshot, code))
+
+    def match(self,
+              image_path: str,
+              screenshot: np.ndarray,
+              confidence: float = 0.9,
+              offset: Tuple[int, int] = (0, 0)) -> Optional[Tuple[int, int, float]]:
+        """
+        Find a template in a screenshot taken with capture()
+
+        Args:
+            image_path: Path to the template image
+            screenshot: Preprocessed screenshot
+            confidence: Minimum match score (0-1)
+            offset: Screen position of the screenshot's top-left corner
+
+        Returns:
+            (x, y, score) of the template center in screen coordinates, or None
+        """
+        template = self.load(image_path)
+        if template is None:
+            return None
+        if template.shape[0] > screenshot.shape[0] or template.shape[1] > screenshot.shape[1]:
+            return None
+
+        scores = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (left, top) = cv2.minMaxLoc(scores)
+        if score < confidence:
+            return None
+
+        height, width = template.shape[:2]
+        x = int((left + width / 2) / self.scale) + offset[0]
+        y = int((top + height / 2) / self.scale) + offset[1]
+        return x, y, float(score)
+
+    def best_match(self,
+                   image_paths: List[str],
+                   screenshot: np.ndarray,
+                   confidence: float = 0.9,
+                   offset: Tuple[int, int] = (0, 0)) -> Optional[Tuple[str, int, int, float]]:
+        """
+        Test several candidate templates against the same screenshot
+
+        Args:
+            image_paths: Paths to the candidate template images
+            screenshot: Preprocessed screenshot
+            confidence: Minimum match score (0-1)
+            offset: Screen position of the screenshot's top-left corner
+
+        Returns:
+            (image_path, x, y, score) of the best match above confidence, or None
+        """
+        best = None
+        for image_path in image_paths:
+            found = self.match(image_path, screenshot, confidence, offset)
+            if found and (best is None or found[2] > best[3]):
+                best = (image_path, found[0], found[1], found[2])
+        return best
+
+    def locate(self,
+               image_path: str,
+               confidence: float = 0.9,
+               region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int]]:
+        """
+        Capture the screen once and find a template on it
+
+        Args:
+            image_path: Path to the template image
+            confidence: Minimum match score (0-1)
+            region: (left, top, width, height) to search (default: full screen)
+
+        Returns:
+            (x, y) of the template center, or None
+        """
+        offset = (region[0], region[1]) if region else (0, 0)
+        found = self.match(image_path, self.capture(region), confidence, offset)
+        return (found[0], found[1]) if found else None
@@ -0,0 +1,154 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+import psycopg2
+from core import database_manager
+from core.database_manager import DatabaseManager
+
+class TestDatabaseManager(unittest.TestCase):
+    def setUp(self):
+        self.connection = MagicMock()
+        self.cursor = MagicMock()
+        self.connection.cursor.return_value = self.cursor
+        self.pool = MagicMock()
+        self.pool.getconn.return_value = self.connection
+        self.db = DatabaseManager(MagicMock(), pool=self.pool)
+        self.df = pd.DataFrame({
+            'documento': ['123', '456'],
+            'hora': pd.to_timedelta(['10:00:00', '10:05:30']),
+            'v_bruto': [100.5, None]
+        })
+
+    def _executed(self):
+        return [str(c.args[0]) for c in self.cursor.execute.call_args_list]
+
+    def test_insert_dataframe_copy(self):
+        copied = []
+        self.cursor.copy_expert.side_effect = lambda query, buffer: copied.append(buffer.getvalue())
+
+        self.assertTrue(self.db.insert_dataframe(self.df, 'vendas'))
+
+        # Rows are streamed as CSV with times of day as HH:MM:SS and missing values empty
+        self.assertEqual(copied, ['123,10:00:00,100.5\n456,10:05:30,\n'])
+        self.assertEqual(self._executed(), ['SAVEPOINT bulk_copy', 'RELEASE SAVEPOINT bulk_copy'])
+        self.assertEqual(self.db.last_load_stats['method'], 'copy')
+        self.connection.commit.assert_called_once()
+
+    @patch('psycopg2.extras.execute_values')
+    def test_insert_dataframe_copy_refused(self, mock_execute_values):
+        # Configure mocks: the server refuses COPY
+        self.cursor.copy_expert.side_effect = psycopg2.ProgrammingError('permission denied for COPY')
+
+        self.assertTrue(self.db.insert_dataframe(self.df, 'vendas', batch_size=500))
+
+        # Only the COPY is rolled back, then the same rows go in as batched INSERTs
+        self.assertEqual(self._executed(), ['SAVEPOINT bulk_copy', 'ROLLBACK TO SAVEPOINT bulk_copy'])
+        mock_execute_values.assert_called_once()
+        args, kwargs = mock_execute_values.call_args
+        self.assertIs(args[0], self.cursor)
+        self.assertEqual(args[2], [('123', '10:00:00', 100.5), ('456', '10:05:30', None)])
+        self.assertEqual(kwargs['page_size'], 500)
+        self.assertEqual(self.db.last_load_stats['method'], 'insert')
+        self.connection.commit.assert_called_once()
+        self.connection.rollback.assert_not_called()
+
+    @patch('psycopg2.extras.execute_values')
+    def test_insert_dataframe_failure(self, mock_execute_values):
+        # Configure mocks: the INSERT fallback fails too
+        self.cursor.copy_expert.side_effect = psycopg2.ProgrammingError('permission denied for COPY')
+        mock_execute_values.side_effect = psycopg2.DataError('invalid input syntax')
+
+        with self.assertRaises(Exception):
+            self.db.insert_dataframe(self.df, 'vendas')
+
+        # The whole transaction is rolled back and nothing is committed
+        self.connection.rollback.assert_called_once()
+        self.connection.commit.assert_not_called()
+
+    def test_ensure_unique_index_deletes_duplicates(self):
+        # Configure mocks: the index does not exist yet and three rows repeat a key
+        self.cursor.fetchone.return_value = [None]
+        self.cursor.rowcount = 3
+
+        self.db.ensure_unique_index('vendas', ['emissao', 'hora', 'documento'])
+
+        # Duplicates are deleted in the transaction that creates the index
+        executed = self._executed()
+        self.assertIn('DELETE', executed[1])
+        self.assertIn('PARTITION BY', executed[1])
+        self.assertIn("Identifier('documento')", executed[1])
+        self.assertIn('CREATE UNIQUE INDEX', executed[2])
+        self.db.logger.warning.assert_called_once()
+        self.connection.commit.assert_called_once()
+
+    def test_ensure_unique_index_existing(self):
+        # Configure mocks: the index already exists
+        self.cursor.fetchone.return_value = ['vendas_emissao_hora_documento_key']
+
+        self.db.ensure_unique_index('vendas', ['emissao', 'hora', 'documento'])
+
+        # The table is neither scanned for duplicates nor indexed again
+        self.assertEqual(len(self._executed()), 1)
+
+    def test_upsert_dataframe_skips_null_keys(self):
+        self.cursor.rowcount = 1
+        df = pd.DataFrame({'emissao': ['2024-01-01', '2024-01-01'], 'hora': ['10:00:00', '10:05:00'],
+                           'documento': ['123', None]})
+
+        self.db.upsert_dataframe(df, 'vendas', ['emissao', 'hora', 'documento'])
+
+        # Rows with an empty key never reach the table, where they would never conflict
+        merge = [q for q in self._executed() if 'ON CONFLICT' in q][0]
+        self.assertEqual(merge.count('IS NOT NULL'), 3)
+        self.db.logger.warning.assert_called_once()
+
+    @patch('core.database_manager._outdated_tables', set())
+    def test_ensure_table_with_outdated_types(self):
+        # Configure mocks: emissao is still text, as loaded before the schema existed
+        self.cursor.fetchall.side_effect = [
+            [('emissao', 'text'), ('v_bruto', 'numeric')], [('date', 'date'), ('numeric', 'numeric')]
+        ] * 2
+        column_types = {'emissao': 'date', 'v_bruto': 'numeric'}
+
+        first = self.db.ensure_table('vendas', column_types)
+        second = self.db.ensure_table('vendas', column_types)
+
+        # Loads keep going with the current types and the difference is logged once
+        self.assertEqual(first, {'emissao': ('text', 'date')})
+        self.assertEqual(second, first)
+        self.db.logger.warning.assert_called_once()
+        self.assertIn('--migrate', self.db.logger.warning.call_args.args[0])
+
+    @patch('core.database_manager._outdated_tables', {'vendas'})
+    def test_migrate_column_types(self):
+        # Configure mocks: emissao is text and v_bruto already numeric
+        self.cursor.fetchall.side_effect = [
+            [('emissao', 'text'), ('v_bruto', 'numeric')], [('date', 'date'), ('numeric', 'numeric')]
+        ]
+
+        converted = self.db.migrate_column_types('vendas', {'emissao': 'date', 'v_bruto': 'numeric'})
+
+        # Only the differing column is rewritten, reading text dates day first and 'nan' as NULL
+        self.assertEqual(converted, ['emissao'])
+        executed = self._executed()
+        self.assertIn("DateStyle = 'ISO, DMY'", executed[2])
+        self.assertIn("Identifier('emissao')", executed[3])
+        self.assertIn("'nan'", executed[3])
+        self.assertNotIn("Identifier('v_bruto')", executed[3])
+        self.connection.commit.assert_called_once()
+        self.assertNotIn('vendas', database_manager._outdated_tables)
+
+    def test_migrate_column_types_failure(self):
+        # Configure mocks: a value cannot be converted
+        self.cursor.fetchall.side_effect = [[('emissao', 'text')], [('date', 'date')]]
+        self.cursor.execute.side_effect = [None, None, None, psycopg2.DataError('invalid input syntax for type date')]
+
+        with self.assertRaises(Exception):
+            self.db.migrate_column_types('vendas', {'emissao': 'date'})
+
+        # The table is left unchanged
+        self.connection.rollback.assert_called_once()
+        self.connection.commit.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import subprocess
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+from core.file_watch import folder_lock, is_valid_xlsx, wait_for_saved_file
+
+class TestFileWatch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, 'vendas.xlsx')
+        self.logger = MagicMock()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_is_valid_xlsx(self):
+        with open(self.file_path, 'wb') as f:
+            f.write(b'PK\x03\x04partial')
+        self.assertFalse(is_valid_xlsx(self.file_path))
+
+        pd.DataFrame({'pdv': [1]}).to_excel(self.file_path)
+        self.assertTrue(is_valid_xlsx(self.file_path))
+        self.assertFalse(is_valid_xlsx(os.path.join(self.temp_dir.name, 'missing.xlsx')))
+
+    def test_wait_for_saved_file(self):
+        # The file appears half written and is only completed a little later
+        def save():
+            time.sleep(0.2)
+            with open(self.file_path, 'wb') as f:
+                f.write(b'PK\x03\x04partial')
+            time.sleep(0.3)
+            pd.DataFrame({'pdv': [1]}).to_excel(self.file_path)
+
+        writer = threading.Thread(target=save)
+        started_at = time.time()
+        writer.start()
+        duration = wait_for_saved_file(self.file_path, started_at, timeout=5, stable_for=0.2,
+                                       poll_interval=0.05, logger=self.logger)
+        writer.join()
+
+        # The partial file was stable for a while but only the complete package counts
+        self.assertIsNotNone(duration)
+        self.assertGreaterEqual(duration, 0.5)
+        self.assertTrue(is_valid_xlsx(self.file_path))
+
+    def test_wait_ignores_older_file(self):
+        # A complete file with the same name was left by a previous export
+        pd.DataFrame({'pdv': [1]}).to_excel(self.file_path)
+        os.utime(self.file_path, (time.time() - 60, time.time() - 60))
+
+        duration = wait_for_saved_file(self.file_path, time.time(), timeout=0.5, stable_for=0.1,
+                                       poll_interval=0.05, logger=self.logger)
+
+        self.assertIsNone(duration)
+        self.logger.error.assert_called_once()
+
+    def test_folder_lock(self):
+        # Every spelling of a folder shares one lock
+        same = folder_lock(os.path.join(self.temp_dir.name, 'sub', '..'))
+        self.assertIs(folder_lock(self.temp_dir.name), same)
+        self.assertIsNot(folder_lock(os.path.join(self.temp_dir.name, 'sub')), same)
+
+    def test_folder_lock_across_processes(self):
+        # Another process, e.g. a manual run next to the scheduler, holds the folder
+        holder = subprocess.Popen(
+            [sys.executable, '-c', 'import sys; from core.file_watch import folder_lock; '
+             'folder_lock(sys.argv[1]).acquire(); print("locked", flush=True); sys.stdin.read()',
+             self.temp_dir.name],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        try:
+            self.assertEqual(holder.stdout.readline().strip(), 'locked')
+            lock = folder_lock(self.temp_dir.name)
+            self.assertFalse(lock.acquire(blocking=False))
+            self.assertFalse(lock.locked())
+        finally:
+            holder.stdin.close()
+            holder.wait(10)
+            holder.stdout.close()
+
+        # The folder is free once that process is gone
+        self.assertTrue(lock.acquire(blocking=False))
+        lock.release()
+
+if __name__ == '__main__':
+    unittest.main()
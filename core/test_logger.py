@@ -0,0 +1,86 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from core import logger as logger_module
+from core.logger import LogWriter
+
+class TestLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.writer = LogWriter()
+        self.writer.start()
+        
+    def tearDown(self):
+        self.writer.close()
+        self.temp_dir.cleanup()
+        
+    def _log_lines(self, name='bot'):
+        with open(os.path.join(self.temp_dir.name, f'{name}_20240101.log'), encoding='utf-8') as f:
+            return f.read().splitlines()
+        
+    def test_console_without_utf8(self):
+        # A cp1252 console cannot show every character, but the line still reaches the file
+        console = io.TextIOWrapper(io.BytesIO(), encoding='cp1252')
+        with patch.object(sys, 'stdout', console):
+            self.writer.queue.put((self.temp_dir.name, 'bot', '20240101', 'Exportação ✓'))
+            self.assertTrue(self.writer.flush())
+            
+        self.assertEqual(self._log_lines(), ['Exportação ✓'])
+        console.seek(0)
+        self.assertEqual(console.read(), 'Exportação ?\n')
+        
+    def test_failed_batch_keeps_the_thread(self):
+        # Configure mocks: the first batch fails
+        write = self.writer._write
+        calls = []
+        
+        def failing_write(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError('console gone')
+            write(batch)
+            
+        with patch.object(self.writer, '_write', failing_write), patch.object(sys, 'stderr', io.StringIO()) as stderr:
+            self.writer.queue.put((self.temp_dir.name, 'bot', '20240101', 'lost'))
+            self.assertTrue(self.writer.flush())
+            self.writer.queue.put((self.temp_dir.name, 'bot', '20240101', 'written'))
+            self.assertTrue(self.writer.flush())
+            
+        # The failure is reported and the next lines are still written
+        self.assertTrue(self.writer.is_alive())
+        self.assertIn('console gone', stderr.getvalue())
+        self.assertEqual(self._log_lines(), ['written'])
+        
+    def test_close_writes_pending_lines(self):
+        for number in range(1000):
+            self.writer.queue.put((self.temp_dir.name, 'bot', '20240101', f'line {number}'))
+            
+        self.writer.close()
+        
+        # The thread ends before its files are closed, so no line is lost
+        self.assertFalse(self.writer.is_alive())
+        self.assertEqual(len(self._log_lines()), 1000)
+        self.assertEqual(self.writer._files, {})
+        
+    def test_get_log_writer_restarts_dead_writer(self):
+        # Configure mocks: the shared writer died with a line still queued
+        dead = LogWriter()
+        dead.queue.put((self.temp_dir.name, 'bot', '20240101', 'pending'))
+        self.assertFalse(dead.flush())
+        
+        with patch.object(logger_module, '_writer', dead), patch.object(sys, 'stderr', io.StringIO()):
+            writer = logger_module.get_log_writer()
+            try:
+                self.assertTrue(writer.is_alive())
+                self.assertIs(writer.queue, dead.queue)
+                self.assertTrue(logger_module.flush_logs())
+            finally:
+                writer.close()
+                
+        self.assertEqual(self._log_lines(), ['pending'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from core.pipeline import Pipeline, Stage
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.logger = MagicMock()
+
+    def test_run(self):
+        # Odd numbers are dropped by the first stage and 4 fails in the second
+        def check(item):
+            if item == 4:
+                raise ValueError('bad item')
+            return item * 10
+
+        loaded = []
+        pipeline = Pipeline('numbers', [
+            Stage('keep_even', lambda item: item if item % 2 == 0 else None),
+            Stage('check', check, workers=2),
+            Stage('load', lambda item: loaded.append(item) or item)
+        ], logger=self.logger)
+
+        stats = pipeline.run(range(7), sources={'load': [100]})
+
+        # Items entering at a later stage skip the stages before it
+        self.assertEqual(sorted(loaded), [0, 20, 60, 100])
+        self.assertEqual(stats['keep_even']['processed'], 4)
+        self.assertEqual(stats['keep_even']['dropped'], 3)
+        self.assertEqual(stats['check']['processed'], 3)
+        self.assertEqual(stats['check']['failed'], 1)
+        self.assertEqual(stats['load']['processed'], 4)
+
+    def test_stop_drains_queued_items(self):
+        # The first item stops the pipeline while the next ones are queued behind it
+        started = threading.Event()
+        release = threading.Event()
+        loaded = []
+
+        def export(item):
+            if item == 0:
+                started.set()
+                release.wait(5)
+            return item
+
+        pipeline = Pipeline('stop', [
+            Stage('export', export),
+            Stage('load', lambda item: loaded.append(item) or item)
+        ], logger=self.logger)
+
+        def stop():
+            started.wait(5)
+            pipeline.stop()
+            release.set()
+
+        stopper = threading.Thread(target=stop)
+        stopper.start()
+        stats = pipeline.run(range(10))
+        stopper.join()
+
+        # The item in progress finishes but is not loaded, queued items are skipped,
+        # no more items are fed and run() returns instead of blocking on a full queue
+        self.assertEqual(loaded, [])
+        self.assertEqual(stats['export']['processed'], 1)
+        self.assertEqual(stats['load']['skipped'], 1)
+        self.assertGreater(stats['export']['skipped'], 0)
+        self.assertLessEqual(stats['export']['skipped'], 3)
+
+    def test_stop_closes_generator_sources(self):
+        # The generator source is left early when the pipeline stops
+        closed = threading.Event()
+
+        def source():
+            try:
+                yield from range(100)
+            finally:
+                closed.set()
+
+        pipeline = Pipeline('close', [Stage('first', lambda item: pipeline.stop() or item)], logger=self.logger)
+        items = source()
+        pipeline.run(items)
+
+        # Its cleanup ran although the generator is still referenced
+        self.assertTrue(closed.is_set())
+
+    def test_invalid_stages(self):
+        with self.assertRaises(ValueError):
+            Pipeline('empty', [])
+        with self.assertRaises(ValueError):
+            Pipeline('duplicate', [Stage('a', print), Stage('a', print)])
+        with self.assertRaises(ValueError):
+            Stage('no_workers', print, workers=0)
+        with self.assertRaises(ValueError):
+            Pipeline('unknown', [Stage('a', print)], logger=self.logger).run(sources={'b': [1]})
+
+if __name__ == '__main__':
+    unittest.main()
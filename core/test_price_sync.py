@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import numpy as np
+import pandas as pd
+from core.price_sync import PriceSync, compute_row_digests, diff_digests
+
+class TestPriceSync(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'id': [1, 2, 3],
+            'sku': ['A', 'B', 'C'],
+            'ean': ['789', '790', '791'],
+            'preco_ultima_compra': [1.0, 2.0, 3.0],
+            'preco_venda': [1.5, 2.5, 3.5]
+        })
+        self.columns = ['sku', 'ean', 'preco_ultima_compra', 'preco_venda']
+        self.db = MagicMock()
+        self.db.apply_diff.return_value = {'inserted': 0, 'updated': 0, 'deleted': 0}
+
+    def test_compute_row_digests(self):
+        digests = compute_row_digests(self.df, 'sku', self.columns)
+
+        # One digest per key, stable across calls and independent of the id column
+        self.assertEqual(list(digests.index), ['A', 'B', 'C'])
+        self.assertEqual(digests.dtype, np.int64)
+        renumbered = self.df.assign(id=[10, 20, 30])
+        pd.testing.assert_series_equal(digests, compute_row_digests(renumbered, 'sku', self.columns))
+
+    def test_diff_digests(self):
+        stored = compute_row_digests(self.df, 'sku', self.columns)
+        current_df = pd.concat([
+            self.df[self.df['sku'] != 'A'],
+            pd.DataFrame({'id': [4], 'sku': ['D'], 'ean': ['792'], 'preco_ultima_compra': [4.0], 'preco_venda': [4.5]})
+        ])
+        current_df.loc[current_df['sku'] == 'B', 'preco_venda'] = 9.9
+
+        diff = diff_digests(compute_row_digests(current_df, 'sku', self.columns), stored)
+
+        self.assertEqual(list(diff['inserts']), ['D'])
+        self.assertEqual(list(diff['updates']), ['B'])
+        self.assertEqual(list(diff['deletes']), ['A'])
+
+    @patch('core.price_sync.PriceSync.load_digests')
+    def test_sync_full_refresh(self, mock_load):
+        # Configure mocks: no digest index yet
+        mock_load.return_value = pd.Series([], dtype=np.int64)
+        self.db.replace_table.return_value = 3
+
+        result = PriceSync(self.db, id_column='id').sync(self.df)
+
+        # Everything is loaded once, with ids left to the database sequence
+        self.assertEqual(result, {'inserted': 3, 'updated': 0, 'deleted': 0})
+        table_df = self.db.replace_table.call_args_list[0].args[0]
+        self.assertNotIn('id', table_df.columns)
+        self.db.apply_diff.assert_not_called()
+
+    @patch('core.price_sync.PriceSync.load_digests')
+    def test_sync_incremental(self, mock_load):
+        # Configure mocks: the stored index has A and B, B with another price
+        previous = self.df.copy()
+        previous.loc[previous['sku'] == 'B', 'preco_venda'] = 0.5
+        mock_load.return_value = compute_row_digests(previous[previous['sku'] != 'C'], 'sku', self.columns)
+
+        PriceSync(self.db, id_column='id').sync(self.df)
+
+        # Only the new and changed SKUs are written, keyed on sku and without the report's row ids
+        table_call = self.db.apply_diff.call_args_list[0]
+        self.assertEqual(table_call.args[:2], ('precos_api', 'sku'))
+        self.assertEqual(list(table_call.kwargs['inserts']['sku']), ['C'])
+        self.assertEqual(list(table_call.kwargs['updates']['sku']), ['B'])
+        self.assertEqual(table_call.kwargs['deletes'], [])
+        self.assertNotIn('id', table_call.kwargs['inserts'].columns)
+        self.assertNotIn('id', table_call.kwargs['updates'].columns)
+
+        # New rows take their id from a sequence moved past the highest id
+        executed = [str(c.args[0]) for c in self.db.cursor.execute.call_args_list]
+        self.assertTrue(any('setval' in q for q in executed))
+        self.assertTrue(any('SET DEFAULT nextval' in q for q in executed))
+
+if __name__ == '__main__':
+    unittest.main()
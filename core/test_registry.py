@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from core import registry
+from core.registry import BotSpec, discover_bots, get_bot
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for name, files in (('estoque_diario', ['bot.py']), ('vendas_pdv', ['bot.py']), ('rascunho', ['notes.md'])):
+            os.makedirs(os.path.join(self.temp_dir.name, name))
+            for file_name in files:
+                open(os.path.join(self.temp_dir.name, name, file_name), 'w').close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @patch('core.registry._entry_point_bots')
+    def test_discover_bots(self, mock_entry_points):
+        # Configure mocks: an installed plugin overrides the price bot
+        mock_entry_points.return_value = [BotSpec('precos', 'precos_plugin.bot:PrecosBot')]
+
+        bots = discover_bots(self.temp_dir.name)
+
+        # Packages are found by convention; folders without bot.py are not bots
+        self.assertEqual(sorted(bots), ['estoque_diario', 'precos', 'vendas_pdv'])
+        self.assertEqual(bots['estoque_diario'].target, 'bots.estoque_diario.bot:EstoqueDiarioBot')
+        # Built-in declarations win over packages, and entry points over both
+        self.assertTrue(bots['vendas_pdv'].backfill)
+        self.assertEqual(bots['precos'].target, 'precos_plugin.bot:PrecosBot')
+
+    @patch('core.registry._registry', None)
+    def test_get_bot(self):
+        self.assertEqual(get_bot('vendas_pdv').target, 'bots.vendas_pdv.bot:VendasPdvBot')
+        # The default registry is built once
+        self.assertIs(discover_bots(), registry._registry)
+        with self.assertRaises(KeyError):
+            get_bot('missing')
+
+    def test_load(self):
+        self.assertEqual(BotSpec('base', 'core.base_bot:BaseBot').load().__name__, 'BaseBot')
+        with self.assertRaises(ImportError):
+            BotSpec('missing', 'core.base_bot:MissingBot').load()
+        with self.assertRaises(ImportError):
+            BotSpec('missing', 'core.missing_module:MissingBot').load()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+from core.report_cache import ReportCache
+
+class TestReportCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.logger = MagicMock()
+        self.df = pd.DataFrame({'pdv': [1, 2], 'documento': ['10', '11'], 'v_bruto': [1.5, 2.5]})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _report(self, name: str, content: bytes) -> str:
+        file_path = os.path.join(self.temp_dir.name, name)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return file_path
+
+    def test_put_and_get(self):
+        cache = ReportCache(self.cache_dir, '1', logger=self.logger)
+        report = self._report('vendas.xlsx', b'report')
+
+        self.assertIsNone(cache.get(report))
+        self.assertTrue(cache.put(report, self.df))
+
+        # Entries are keyed by content, so a copy under another name hits the cache
+        pd.testing.assert_frame_equal(cache.get(report), self.df)
+        pd.testing.assert_frame_equal(cache.get(self._report('copia.xlsx', b'report')), self.df)
+
+        # A changed file or a new parser version misses it
+        self.assertIsNone(cache.get(self._report('vendas.xlsx', b'changed')))
+        self.assertIsNone(ReportCache(self.cache_dir, '2', logger=self.logger).get(report))
+
+    def test_corrupt_entry(self):
+        cache = ReportCache(self.cache_dir, '1', logger=self.logger)
+        report = self._report('vendas.xlsx', b'report')
+        with open(cache._entry_path(report), 'wb') as f:
+            f.write(b'not arrow')
+
+        # A broken entry is a miss, not an error
+        self.assertIsNone(cache.get(report))
+        self.logger.warning.assert_called_once()
+
+    def test_evicts_least_recently_used(self):
+        cache = ReportCache(self.cache_dir, '1', logger=self.logger)
+        reports = [self._report(f'vendas_{number}.xlsx', str(number).encode()) for number in range(3)]
+        for number, report in enumerate(reports[:2]):
+            cache.put(report, self.df)
+            os.utime(cache._entry_path(report), (number, number))
+        entry_size = os.path.getsize(cache._entry_path(reports[0]))
+
+        # Reading the oldest entry makes the other one the least recently used
+        cache.get(reports[0])
+        cache.max_bytes = entry_size * 2
+        cache.put(reports[2], self.df)
+
+        self.assertTrue(os.path.exists(cache._entry_path(reports[0])))
+        self.assertFalse(os.path.exists(cache._entry_path(reports[1])))
+        self.assertTrue(os.path.exists(cache._entry_path(reports[2])))
+
+    def test_hash_computed_once(self):
+        cache = ReportCache(self.cache_dir, '1', logger=self.logger)
+        report = self._report('vendas.xlsx', b'report')
+        content_hash = ReportCache.file_hash(report)
+
+        # A hash passed from get to put is not computed again
+        with patch.object(ReportCache, 'file_hash', side_effect=ReportCache.file_hash) as mock_file_hash:
+            self.assertIsNone(cache.get(report, content_hash))
+            cache.put(report, self.df, content_hash)
+            mock_file_hash.assert_not_called()
+
+        pd.testing.assert_frame_equal(cache.get(report), self.df)
+
+    def test_workers_do_not_evict(self):
+        cache = ReportCache(self.cache_dir, '1', max_bytes=0, logger=self.logger)
+        reports = [self._report(f'vendas_{number}.xlsx', str(number).encode()) for number in range(2)]
+
+        # The cache used from a parser process stores entries but keeps them all
+        with patch('core.report_cache.os.getpid', return_value=-1):
+            for report in reports:
+                self.assertTrue(cache.put(report, self.df))
+        self.assertTrue(all(os.path.exists(cache._entry_path(report)) for report in reports))
+
+        # The process that created the cache evicts once the workers are done
+        cache.evict()
+        self.assertFalse(any(os.path.exists(cache._entry_path(report)) for report in reports))
+
+if __name__ == '__main__':
+    unittest.main()
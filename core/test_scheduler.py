@@ -0,0 +1,110 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+from core.scheduler import CronSchedule, Job, Scheduler
+
+class TestCronSchedule(unittest.TestCase):
+    def test_parse(self):
+        schedule = CronSchedule('*/15 7-9,18 1 * 1-5,7')
+
+        # Steps, ranges and lists expand to their values; weekday 7 is Sunday
+        self.assertEqual(schedule.minutes, {0, 15, 30, 45})
+        self.assertEqual(schedule.hours, {7, 8, 9, 18})
+        self.assertEqual(schedule.days, {1})
+        self.assertEqual(schedule.months, set(range(1, 13)))
+        self.assertEqual(schedule.weekdays, {0, 1, 2, 3, 4, 5})
+
+        for expression in ('* * * *', '60 * * * *', '0 5-3 * * *', '0 * 0 * *', 'a * * * *'):
+            with self.assertRaises(ValueError):
+                CronSchedule(expression)
+
+    def test_matches(self):
+        # 2024-01-06 is a Saturday
+        schedule = CronSchedule('0 8 * * 1-5')
+        self.assertTrue(schedule.matches(datetime(2024, 1, 5, 8, 0, 30)))
+        self.assertFalse(schedule.matches(datetime(2024, 1, 6, 8, 0)))
+
+        # A restricted day and weekday match when either of them matches
+        schedule = CronSchedule('0 8 15 * 6')
+        self.assertTrue(schedule.matches(datetime(2024, 1, 6, 8, 0)))
+        self.assertTrue(schedule.matches(datetime(2024, 1, 15, 8, 0)))
+        self.assertFalse(schedule.matches(datetime(2024, 1, 16, 8, 0)))
+
+    def test_next(self):
+        schedule = CronSchedule('0 8-22 * * *')
+
+        # The next fire is strictly after the moment, on the following day after the last hour
+        self.assertEqual(schedule.next(datetime(2024, 1, 1, 8, 0)), datetime(2024, 1, 1, 9, 0))
+        self.assertEqual(schedule.next(datetime(2024, 1, 1, 8, 59, 59)), datetime(2024, 1, 1, 9, 0))
+        self.assertEqual(schedule.next(datetime(2024, 1, 1, 22, 30)), datetime(2024, 1, 2, 8, 0))
+        self.assertEqual(schedule.next(datetime(2024, 12, 31, 23, 0)), datetime(2025, 1, 1, 8, 0))
+        self.assertEqual(CronSchedule('0 0 29 2 *').next(datetime(2023, 3, 1)), datetime(2024, 2, 29, 0, 0))
+        self.assertIsNone(CronSchedule('0 0 31 2 *').next(datetime(2024, 1, 1)))
+
+    def test_previous(self):
+        schedule = CronSchedule('*/15 * * * *')
+
+        # The previous fire includes the moment itself
+        self.assertEqual(schedule.previous(datetime(2024, 1, 1, 10, 15, 40)), datetime(2024, 1, 1, 10, 15))
+        self.assertEqual(schedule.previous(datetime(2024, 1, 1, 10, 14)), datetime(2024, 1, 1, 10, 0))
+        self.assertEqual(CronSchedule('0 8-22 * * *').previous(datetime(2024, 1, 2, 7, 59)),
+                         datetime(2024, 1, 1, 22, 0))
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.status_file = os.path.join(self.temp_dir.name, 'scheduler.json')
+        self.logger = MagicMock()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _scheduler(self, jobs, last_fires):
+        with open(self.status_file, 'w') as f:
+            json.dump({'jobs': {name: {'last_fire': fire} for name, fire in last_fires.items()}}, f)
+        return Scheduler(jobs, status_file=self.status_file, max_workers=1, logger=self.logger)
+
+    @patch('core.scheduler.Scheduler.trigger')
+    def test_catch_up(self, mock_trigger):
+        # Configure mocks: the daemon was down from 10:30 to 13:05
+        jobs = [
+            Job('hourly', '0 * * * *', MagicMock()),
+            Job('on_time', '0 * * * *', MagicMock()),
+            Job('new', '0 * * * *', MagicMock()),
+            Job('no_catch_up', '0 * * * *', MagicMock(), catch_up=False)
+        ]
+        scheduler = self._scheduler(jobs, {
+            'hourly': '2024-01-01T10:00:00',
+            'on_time': '2024-01-01T13:00:00',
+            'no_catch_up': '2024-01-01T10:00:00'
+        })
+
+        scheduler._catch_up(datetime(2024, 1, 1, 13, 5))
+
+        # Only the latest missed fire runs, once, and only for jobs with history and catch_up
+        mock_trigger.assert_called_once_with('hourly', datetime(2024, 1, 1, 13, 0))
+
+    @patch('core.scheduler.Scheduler.trigger')
+    def test_catch_up_leaves_the_current_minute_to_the_loop(self, mock_trigger):
+        # Configure mocks: the daemon starts exactly at a fire time
+        scheduler = self._scheduler([Job('hourly', '0 * * * *', MagicMock())], {'hourly': '2024-01-01T12:00:00'})
+
+        scheduler._catch_up(datetime(2024, 1, 1, 13, 0))
+
+        # The 13:00 run is fired by run_forever, not as a catch-up
+        mock_trigger.assert_not_called()
+
+    def test_trigger_coalesces_runs(self):
+        job = Job('load', '* * * * *', MagicMock(), gui=False)
+        scheduler = Scheduler([job], status_file=self.status_file, max_workers=1, logger=self.logger)
+        scheduler._running.add('load')
+
+        # A job still running is not submitted again
+        self.assertFalse(scheduler.trigger('load', datetime(2024, 1, 1, 10, 0)))
+        job.target.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from datetime import time
+import numpy as np
+import pandas as pd
+from core.schema import Column, apply_schema, get_column_types, parse_br_number
+
+class TestSchema(unittest.TestCase):
+    def test_parse_br_number(self):
+        values = pd.Series(['1.234,56', 'R$ 10,00', '1.234', '1.234.567', '-2.500', '12.5', '7', 3.25, 'abc', None])
+
+        result = parse_br_number(values)
+
+        # Dots only group thousands in Brazilian numbers; '12.5' is not one
+        expected = [1234.56, 10.0, 1234.0, 1234567.0, -2500.0, 12.5, 7.0, 3.25, np.nan, np.nan]
+        np.testing.assert_array_equal(result.to_numpy(), np.array(expected))
+        self.assertEqual(result.dtype, np.float64)
+
+    def test_apply_schema(self):
+        schema = [
+            Column('pdv', 'integer', 'smallint'),
+            Column('filial', 'category'),
+            Column('emissao', 'date'),
+            Column('hora', 'time'),
+            Column('documento', 'text'),
+            Column('v_bruto', 'decimal')
+        ]
+        df = pd.DataFrame({
+            'pdv': ['1', 2],
+            'filial': ['001', '002'],
+            'emissao': ['01/02/2024', 'invalid'],
+            'hora': ['10:05:00', time(11, 30)],
+            'documento': [' 123 ', np.nan],
+            'v_bruto': ['1.234,50', None],
+            'extra': ['x', 'y']
+        })
+
+        result = apply_schema(df, schema)
+
+        # Every declared column gets its dtype; missing values stay missing
+        self.assertEqual(list(result['pdv']), [1, 2])
+        self.assertEqual(str(result['filial'].dtype), 'category')
+        self.assertEqual(result['emissao'].iloc[0], pd.Timestamp(2024, 2, 1))
+        self.assertTrue(pd.isna(result['emissao'].iloc[1]))
+        self.assertEqual(list(result['hora']), [pd.Timedelta(hours=10, minutes=5), pd.Timedelta(hours=11, minutes=30)])
+        self.assertEqual(result['documento'].iloc[0], '123')
+        self.assertTrue(pd.isna(result['documento'].iloc[1]))
+        self.assertEqual(result['v_bruto'].iloc[0], 1234.5)
+        self.assertTrue(np.isnan(result['v_bruto'].iloc[1]))
+        self.assertEqual(list(result['extra']), ['x', 'y'])
+
+        # The table DDL uses the same declarations
+        self.assertEqual(get_column_types(schema)['pdv'], 'smallint')
+        self.assertEqual(get_column_types(schema)['filial'], 'text')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from core.text_entry import TextEntry
+
+class TestTextEntry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.entry = TextEntry(os.path.join(self.temp_dir.name, 'text_entry.json'))
+        
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        
+    @patch('core.text_entry.pyautogui')
+    def test_type_without_field(self, mock_pyautogui):
+        # Nothing can verify the text, so it is typed key by key
+        strategy = self.entry.type('01/01/2024', interval=0.05)
+        
+        self.assertEqual(strategy, 'per_key')
+        mock_pyautogui.write.assert_called_once_with('01/01/2024', interval=0.05)
+        mock_pyautogui.hotkey.assert_not_called()
+        
+    @patch('core.text_entry.pyperclip')
+    @patch('core.text_entry._screen_frame')
+    @patch('core.text_entry.pyautogui')
+    def test_type_unreadable_field(self, mock_pyautogui, mock_frame, mock_pyperclip):
+        # Configure mocks: the field never copies, so the clipboard keeps what was put there
+        clipboard = {'text': 'user data'}
+        mock_pyperclip.paste.side_effect = lambda: clipboard['text']
+        mock_pyperclip.copy.side_effect = lambda text: clipboard.update(text=text)
+        mock_frame.side_effect = [np.zeros((2, 2)), np.ones((2, 2)) * 255]
+        
+        strategy = self.entry.type('01/01/2024', field='data_inicial')
+        
+        # The paste cannot be checked, so the field is retyped key by key and remembered
+        self.assertEqual(strategy, 'per_key')
+        mock_pyautogui.write.assert_called_once_with('01/01/2024', interval=0.1)
+        self.assertEqual(TextEntry(self.entry.file_path)._choices, {'data_inicial': 'per_key'})
+        self.assertEqual(clipboard['text'], 'user data')
+        
+    @patch('core.text_entry.pyperclip')
+    @patch('core.text_entry._screen_frame')
+    @patch('core.text_entry.pyautogui')
+    def test_paste_waits_for_screen(self, mock_pyautogui, mock_frame, mock_pyperclip):
+        # Configure mocks: the pasted text shows up on the third capture after ctrl+v
+        events = []
+        mock_pyperclip.paste.return_value = 'user data'
+        mock_pyperclip.copy.side_effect = lambda text: events.append(('copy', text))
+        frames = [np.zeros((2, 2))] * 3 + [np.ones((2, 2)) * 255]
+        mock_frame.side_effect = lambda: events.append(('frame',)) or frames.pop(0)
+        mock_pyautogui.hotkey.side_effect = lambda *keys: events.append(keys)
+        
+        self.entry._paste('01/01/2024', 0.1)
+        
+        # The clipboard is restored only after the screen changed
+        self.assertEqual(events, [
+            ('copy', '01/01/2024'), ('frame',), ('ctrl', 'v'), ('frame',), ('frame',), ('frame',), ('copy', 'user data')
+        ])
+
+    @patch('core.text_entry.win32clipboard', create=True)
+    @patch('core.text_entry.pyperclip')
+    @patch('core.text_entry.pyautogui')
+    def test_type_keeps_non_text_clipboard(self, mock_pyautogui, mock_pyperclip, mock_win32clipboard):
+        # Configure mocks: the user copied an image, along with the text formats Windows adds
+        formats = {0: 1, 1: 2, 2: 0}
+        mock_win32clipboard.CF_TEXT, mock_win32clipboard.CF_OEMTEXT = 1, 7
+        mock_win32clipboard.CF_UNICODETEXT, mock_win32clipboard.CF_LOCALE = 13, 16
+        mock_win32clipboard.EnumClipboardFormats.side_effect = formats.get
+        self.entry._choices['data_inicial'] = 'paste'
+
+        strategy = self.entry.type('01/01/2024', field='data_inicial')
+
+        # The clipboard is neither pasted from nor read back, and the remembered strategy stays
+        self.assertEqual(strategy, 'per_key')
+        mock_pyautogui.write.assert_called_once_with('01/01/2024', interval=0.1)
+        mock_pyautogui.hotkey.assert_not_called()
+        mock_pyperclip.copy.assert_not_called()
+        mock_win32clipboard.CloseClipboard.assert_called_once()
+        self.assertEqual(self.entry._choices, {'data_inicial': 'paste'})
+
+if __name__ == '__main__':
+    unittest.main()
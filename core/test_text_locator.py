@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+from PIL import Image
+from core.text_locator import TextLocator, normalize_text
+
+class TestTextLocator(unittest.TestCase):
+    def setUp(self):
+        self.locator = TextLocator()
+        # Two lines: 'Exportar para Excel' and 'Imprimir relatório'
+        self.words = [
+            ('exportar', 10, 5, 60, 12, (1, 1, 1)),
+            ('para', 75, 5, 30, 12, (1, 1, 1)),
+            ('excel', 110, 5, 40, 12, (1, 1, 1)),
+            ('imprimir', 10, 30, 60, 12, (1, 1, 2)),
+            ('relatorio', 75, 30, 70, 12, (1, 1, 2))
+        ]
+        
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text(' Exportação '), 'exportacao')
+        
+    def test_match(self):
+        # A phrase is found as consecutive words of one line, ignoring case and accents
+        self.assertEqual(TextLocator.match(self.words, 'Exportar para Excel'), (10, 5, 140, 12))
+        self.assertEqual(TextLocator.match(self.words, 'Relatório'), (75, 30, 70, 12))
+        
+        # Words split across lines or out of order do not match
+        self.assertIsNone(TextLocator.match(self.words, 'Excel Imprimir'))
+        self.assertIsNone(TextLocator.match(self.words, 'para Exportar'))
+        self.assertIsNone(TextLocator.match(self.words, ''))
+        
+    @patch('core.text_locator.TextLocator._recognize')
+    @patch('pyautogui.screenshot')
+    def test_locate_reads_only_the_region(self, mock_screenshot, mock_recognize):
+        # Configure mocks: the toolbar region looks the same on both polls
+        region = (100, 200, 160, 40)
+        mock_screenshot.side_effect = lambda region=None: Image.fromarray(np.zeros((region[3], region[2], 3), dtype=np.uint8))
+        mock_recognize.return_value = self.words[:3]
+        
+        first = self.locator.locate('Exportar para Excel', region)
+        second = self.locator.locate('Exportar para Excel', region)
+        
+        # Only the region is captured, results are in screen coordinates and OCR runs once
+        self.assertEqual(mock_screenshot.call_args.kwargs['region'], region)
+        self.assertEqual(first, (110, 205, 140, 12))
+        self.assertEqual(second, first)
+        mock_recognize.assert_called_once()
+        self.assertEqual((self.locator.hits, self.locator.misses), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from core.pipeline import Pipeline, Stage
+from core.tracing import start_trace, end_trace, get_tracer, span
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {'TRACE_ENABLED': '1', 'TRACE_DIR': self.temp_dir.name})
+        self.env.start()
+        
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+        
+    def test_runs_in_parallel_keep_their_spans(self):
+        # Two runs at the same time, as scheduler jobs, each with pipeline worker threads
+        both_started = threading.Barrier(2)
+        results = {}
+        
+        def run(name):
+            tracer = start_trace(name)
+            both_started.wait(timeout=5)
+            with span('run', job=name):
+                Pipeline(name, [Stage('double', lambda item: item * 2, workers=2)]).run([1, 2, 3])
+            results[name] = (tracer, end_trace(tracer), get_tracer())
+            
+        threads = [threading.Thread(target=run, args=(name,)) for name in ('first', 'second')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        # Every span, including those of the stage threads, is in the trace of its own run
+        for name, (tracer, path, current) in results.items():
+            self.assertIsNone(current)
+            with open(path, encoding='utf-8') as f:
+                spans = [json.loads(line) for line in f]
+            self.assertEqual(sorted(entry['name'] for entry in spans), ['pipeline.double'] * 3 + ['run'])
+            self.assertTrue(all(entry['attrs'].get('pipeline', name) == name for entry in spans))
+            self.assertTrue(os.path.basename(path).startswith(f'{name}_'))
+            
+    def test_span_without_trace(self):
+        # Outside a run, spans are no-ops
+        self.assertIsNone(get_tracer())
+        with span('step') as current:
+            current.set(polls=1)
+        self.assertIsNone(end_trace(None))
+
+if __name__ == '__main__':
+    unittest.main()
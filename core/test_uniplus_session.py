@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from core.uniplus_session import UniplusSession
+
+class TestUniplusSession(unittest.TestCase):
+    def setUp(self):
+        self.session = UniplusSession('Uniplus.lnk', window_title='Uniplus', logger=MagicMock())
+        self.login = MagicMock(title='Uniplus - Login')
+        self.main = MagicMock(title='Uniplus - Supermercado', isMinimized=False, isMaximized=True)
+
+    @patch('core.uniplus_session.pygetwindow')
+    def test_find_window(self, mock_pygetwindow):
+        # Configure mocks: a login window is listed before the main one
+        mock_pygetwindow.getWindowsWithTitle.return_value = [self.login, MagicMock(title=''), self.main]
+        self.assertIs(self.session.find_window(), self.main)
+
+        # A session stuck at the login screen is not a running Uniplus
+        mock_pygetwindow.getWindowsWithTitle.return_value = [self.login]
+        self.assertIsNone(self.session.find_window())
+
+    @patch('core.uniplus_session.pygetwindow', None)
+    def test_find_window_without_window_support(self):
+        self.assertIsNone(self.session.find_window())
+
+    @patch('time.sleep')
+    @patch('os.startfile', create=True)
+    @patch('core.uniplus_session.pygetwindow')
+    def test_start_reuses_window(self, mock_pygetwindow, mock_startfile, mock_sleep):
+        # Configure mocks: the first activation is refused by Windows
+        mock_pygetwindow.getWindowsWithTitle.return_value = [self.main]
+        self.main.maximize.side_effect = [OSError('access denied'), None]
+        self.main.isMaximized = False
+
+        self.assertEqual(self.session.start(), 'reused')
+        mock_startfile.assert_not_called()
+
+    @patch('time.sleep')
+    @patch('os.startfile', create=True)
+    @patch('core.uniplus_session.pygetwindow')
+    def test_start_never_launches_a_second_instance(self, mock_pygetwindow, mock_startfile, mock_sleep):
+        # Configure mocks: the running window can never be activated
+        mock_pygetwindow.getWindowsWithTitle.return_value = [self.main]
+        self.main.isMaximized = False
+        self.main.maximize.side_effect = OSError('access denied')
+
+        with self.assertRaises(RuntimeError):
+            self.session.start(activate_attempts=3)
+
+        self.assertEqual(self.main.maximize.call_count, 3)
+        mock_startfile.assert_not_called()
+
+    @patch('time.sleep')
+    @patch('os.startfile', create=True)
+    @patch('core.uniplus_session.pygetwindow')
+    def test_start_launches_when_not_running(self, mock_pygetwindow, mock_startfile, mock_sleep):
+        # Configure mocks: only a login window is open until the launched Uniplus shows up
+        mock_pygetwindow.getWindowsWithTitle.side_effect = [[self.login], [], [self.main]]
+
+        self.assertEqual(self.session.start(), 'launched')
+
+        mock_startfile.assert_called_once_with('Uniplus.lnk')
+        self.main.activate.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import time
+import logging
+from typing import Optional, Dict, List, Callable
+from core.lazy import lazy_import
+from core.logger import get_logger
+
+np = lazy_import('numpy')
+pyautogui = lazy_import('pyautogui')
+pyperclip = lazy_import('pyperclip')
+
+try:
+    import win32clipboard
+except ImportError:
+    # Clipboard formats can only be inspected on Windows (pywin32)
+    win32clipboard = None
+
+def _clipboard_is_text() -> bool:
+    """
+    Check that the clipboard is empty or holds only text, the one content
+    pyperclip can save and restore
+
+    Returns:
+        False for images, files copied in Explorer, rich content, or a
+        clipboard another program keeps open; True where formats cannot be
+        inspected (outside Windows)
+    """
+    if win32clipboard is None:
+        return True
+    text_formats = {win32clipboard.CF_TEXT, win32clipboard.CF_OEMTEXT,
+                    win32clipboard.CF_UNICODETEXT, win32clipboard.CF_LOCALE}
+    try:
+        win32clipboard.OpenClipboard()
+        try:
+            clipboard_format = win32clipboard.EnumClipboardFormats(0)
+            while clipboard_format:
+                if clipboard_format not in text_formats:
+                    return False
+                clipboard_format = win32clipboard.EnumClipboardFormats(clipboard_format)
+        finally:
+            win32clipboard.CloseClipboard()
+    except Exception:
+        return False
+    return True
+
+def _screen_frame() -> np.ndarray:
+    """Downsampled grayscale capture of the screen, to notice when a paste lands"""
+    return np.asarray(pyautogui.screenshot().convert('L'), dtype=np.int16)[::4, ::4]
+
+class TextEntry:
+    """Types text into the focused field with the fastest strategy that works for it"""
+
+    # Fastest first; per_key is the original behavior and always the last resort
+    STRATEGIES = ('paste', 'bulk', 'per_key')
+
+    # Longest wait for the ERP to take the pasted text before the clipboard is restored
+    PASTE_TIMEOUT = 1.0
+
+    def __init__(self,
+                 file_path: str,
+                 strategies: Optional[List[str]] = None,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            file_path: JSON file holding the strategy that worked for each field
+            strategies: Strategies to try, in order (default: STRATEGIES)
+            logger: Logger instance (default: 'text_entry' logger)
+        """
+        self.file_path = file_path
+        self.strategies = [name for name in (strategies or self.STRATEGIES) if name in self.STRATEGIES]
+        if not self.strategies:
+            raise ValueError(f"No valid text entry strategy in {strategies}")
+        self.logger = logger or get_logger('text_entry')
+        self._methods: Dict[str, Callable[[str, float], None]] = {
+            'paste': self._paste,
+            'bulk': self._bulk,
+            'per_key': self._per_key
+        }
+        self._choices: Dict[str, str] = self._load()
+
+    def _load(self) -> Dict[str, str]:
+        """Read the strategy chosen for each field from disk"""
+        try:
+            if os.path.exists(self.file_path):
+                with open(self.file_path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Error reading text entry choices {self.file_path}: {str(e)}")
+        return {}
+
+    def _save(self) -> None:
+        """Write the strategy chosen for each field to disk"""
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+            temp_path = f'{self.file_path}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(self._choices, f, indent=2)
+            os.replace(temp_path, self.file_path)
+        except Exception as e:
+            self.logger.warning(f"Error writing text entry choices {self.file_path}: {str(e)}")
+
+    def _paste(self, text: str, interval: float) -> None:
+        """
+        Put the text on the clipboard and paste it, restoring the clipboard afterwards
+
+        The ERP reads the clipboard when it handles ctrl+v, not when the keys
+        are sent, so the clipboard is only restored once the screen changes
+        (or after PASTE_TIMEOUT). Only text is saved and restored: type()
+        never pastes while the clipboard holds anything else, and outside
+        Windows, where that cannot be checked, other content is lost.
+        """
+        previous = pyperclip.paste()
+        pyperclip.copy(text)
+        try:
+            before = _screen_frame()
+            pyautogui.hotkey('ctrl', 'v')
+            deadline = time.monotonic() + self.PASTE_TIMEOUT
+            while time.monotonic() < deadline:
+                if np.any(np.abs(_screen_frame() - before) > 16):
+                    break
+                time.sleep(0.02)
+            else:
+                self.logger.debug(f"No screen change within {self.PASTE_TIMEOUT}s of pasting")
+        finally:
+            pyperclip.copy(previous)
+
+    def _bulk(self, text: str, interval: float) -> None:
+        """Send every character without waiting between keystrokes"""
+        pyautogui.write(text, interval=0)
+
+    def _per_key(self, text: str, interval: float) -> None:
+        """Send one character at a time with the given interval"""
+        pyautogui.write(text, interval=interval)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Drop separators the ERP input masks add or remove (dates, paths)"""
+        return re.sub(r'[\W_]', '', text).lower()
+
+    def read_field(self) -> Optional[str]:
+        """
+        Read back the content of the focused field through the clipboard
+
+        Returns:
+            Field content, or None if the field does not support copying
+        """
+        previous = pyperclip.paste()
+        marker = f'__text_entry_{time.time()}__'
+        pyperclip.copy(marker)
+        try:
+            pyautogui.hotkey('ctrl', 'a')
+            pyautogui.hotkey('ctrl', 'c')
+            time.sleep(0.05)
+            content = pyperclip.paste()
+            # Leave the caret after the text instead of keeping it selected
+            pyautogui.press('end')
+        finally:
+            pyperclip.copy(previous)
+        return None if content == marker else content
+
+    def _clear_field(self) -> None:
+        """Remove whatever a failed attempt left in the focused field"""
+        pyautogui.hotkey('ctrl', 'a')
+        pyautogui.press('backspace')
+
+    def type(self,
+             text: str,
+             field: Optional[str] = None,
+             interval: float = 0.1,
+             strategy: Optional[str] = None) -> str:
+        """
+        Type text into the focused field
+
+        Without a field name the text is typed key by key, since nothing
+        checks it. With a field name the strategy remembered for it is tried
+        first, the result is verified by reading the field back, and on a
+        mismatch the field is cleared and the next (slower) strategy is tried.
+        Fields that cannot be read back are typed key by key too, and so is
+        every field while the clipboard holds something other than text (an
+        image, copied files), since pasting and reading back would replace it.
+
+        Args:
+            text: Text to type
+            field: Identifier of the field, used to remember its strategy
+            interval: Time between keystrokes for the per-key strategy
+            strategy: Strategy to use without verification, for fields that
+                cannot be read back (masked inputs that move the focus when full)
+
+        Returns:
+            Name of the strategy that typed the text
+        """
+        if strategy == 'paste' or (strategy is None and field is not None):
+            if not _clipboard_is_text():
+                self.logger.debug(f"The clipboard holds non-text content; typing {field} key by key")
+                self._per_key(text, interval)
+                return 'per_key'
+
+        if strategy is not None or field is None:
+            strategy = strategy or 'per_key'
+            self._methods[strategy](text, interval)
+            return strategy
+
+        remembered = self._choices.get(field)
+        order = self.strategies
+        if remembered in order:
+            order = order[order.index(remembered):]
+
+        for strategy in order:
+            start_time = time.perf_counter()
+            try:
+                self._methods[strategy](text, interval)
+            except Exception as e:
+                self.logger.warning(f"Text entry strategy {strategy} failed for {field}: {str(e)}")
+                continue
+
+            content = self.read_field()
+            if content is None and strategy != 'per_key':
+                # Nothing proves the faster strategy worked, so retype the original way
+                self.logger.debug(f"Field {field} cannot be read back; typing it key by key")
+                self._clear_field()
+                self._per_key(text, interval)
+                strategy = 'per_key'
+            elapsed = (time.perf_counter() - start_time) * 1000
+            if content is None or self._normalize(content) == self._normalize(text):
+                self.logger.debug(f"Typed {len(text)} chars into {field} with {strategy} in {elapsed:.0f}ms")
+                if self._choices.get(field) != strategy:
+                    self._choices[field] = strategy
+                    self._save()
+                return strategy
+
+            self.logger.warning(f"Field {field} reads {content!r} after {strategy}; trying a slower strategy")
+            if strategy != order[-1]:
+                self._clear_field()
+
+        # Every strategy failed verification; the last attempt stays in the field
+        self.logger.error(f"Could not verify the text typed into {field}")
+        return order[-1]
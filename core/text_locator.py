@@ -0,0 +1,157 @@
+from __future__ import annotations
+import os
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple, List, Dict
+from core.lazy import lazy_import
+from core.logger import get_logger
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pyautogui = lazy_import('pyautogui')
+pytesseract = lazy_import('pytesseract')
+
+# (text, left, top, width, height, line id) of one recognized word, in capture coordinates
+WordBox = Tuple[str, int, int, int, int, Tuple[int, int, int]]
+
+def normalize_text(text: str) -> str:
+    """Lowercase text without accents, so 'Exportação' matches an OCR read of 'Exportacao'"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower().strip()
+
+class TextLocator:
+    """OCR text finder that keeps the word boxes of each screen it has already read"""
+
+    def __init__(self,
+                 lang: str = 'por',
+                 upscale: float = 2.0,
+                 min_confidence: float = 60.0,
+                 max_entries: int = 16,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            lang: Tesseract language
+            upscale: Factor applied before OCR; small UI fonts read better enlarged
+            min_confidence: Minimum Tesseract word confidence (0-100)
+            max_entries: Number of screen layouts kept in the cache
+            logger: Logger instance (default: 'text_locator' logger)
+        """
+        self.lang = lang
+        self.upscale = upscale
+        self.min_confidence = min_confidence
+        self.max_entries = max_entries
+        self.logger = logger or get_logger('text_locator')
+        self._layouts: 'OrderedDict[str, List[WordBox]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        tesseract_cmd = os.getenv('TESSERACT_CMD')
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    @staticmethod
+    def fingerprint(image: np.ndarray) -> str:
+        """Hash of the captured pixels; equal screens share their OCR result"""
+        return hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest()
+
+    def _preprocess(self, image: np.ndarray) -> np.ndarray:
+        """Grayscale image to black text on white, enlarged for Tesseract"""
+        if self.upscale != 1.0:
+            image = cv2.resize(image, None, fx=self.upscale, fy=self.upscale, interpolation=cv2.INTER_CUBIC)
+        _, binary = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        # Tesseract expects dark text; flip screens with light text on dark backgrounds
+        if np.mean(binary) < 127:
+            binary = cv2.bitwise_not(binary)
+        return binary
+
+    def _recognize(self, image: np.ndarray) -> List[WordBox]:
+        """Run OCR and return the word boxes in capture coordinates"""
+        data = pytesseract.image_to_data(
+            self._preprocess(image), lang=self.lang, config='--psm 11', output_type=pytesseract.Output.DICT
+        )
+        words = []
+        for i, word in enumerate(data['text']):
+            if not word.strip() or float(data['conf'][i]) < self.min_confidence:
+                continue
+            words.append((
+                normalize_text(word),
+                int(data['left'][i] / self.upscale),
+                int(data['top'][i] / self.upscale),
+                int(data['width'][i] / self.upscale),
+                int(data['height'][i] / self.upscale),
+                (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            ))
+        return words
+
+    def read(self, image: np.ndarray) -> List[WordBox]:
+        """
+        Get the word boxes of a grayscale capture, running OCR only for unseen screens
+
+        Args:
+            image: Grayscale capture
+
+        Returns:
+            List of recognized word boxes
+        """
+        key = self.fingerprint(image)
+        if key in self._layouts:
+            self.hits += 1
+            self._layouts.move_to_end(key)
+            return self._layouts[key]
+
+        self.misses += 1
+        words = self._recognize(image)
+        self._layouts[key] = words
+        if len(self._layouts) > self.max_entries:
+            self._layouts.popitem(last=False)
+        return words
+
+    @staticmethod
+    def match(words: List[WordBox], text: str) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Find a phrase as consecutive words of the same line
+
+        Args:
+            words: Word boxes returned by read()
+            text: Phrase to find
+
+        Returns:
+            (left, top, width, height) of the phrase in capture coordinates, or None
+        """
+        target = normalize_text(text).split()
+        if not target:
+            return None
+
+        for start in range(len(words) - len(target) + 1):
+            candidate = words[start:start + len(target)]
+            if any(word[5] != candidate[0][5] for word in candidate):
+                continue
+            if all(word[0] == expected for word, expected in zip(candidate, target)):
+                left = min(word[1] for word in candidate)
+                top = min(word[2] for word in candidate)
+                right = max(word[1] + word[3] for word in candidate)
+                bottom = max(word[2] + word[4] for word in candidate)
+                return left, top, right - left, bottom - top
+        return None
+
+    def locate(self,
+               text: str,
+               region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Capture the screen once and find a phrase on it
+
+        Args:
+            text: Phrase to find
+            region: (left, top, width, height) to read (default: full screen)
+
+        Returns:
+            (left, top, width, height) of the phrase in screen coordinates, or None
+        """
+        image = cv2.cvtColor(np.array(pyautogui.screenshot(region=region)), cv2.COLOR_RGB2GRAY)
+        found = self.match(self.read(image), text)
+        if not found:
+            return None
+        offset = region[:2] if region else (0, 0)
+        return found[0] + offset[0], found[1] + offset[1], found[2], found[3]
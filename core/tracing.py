@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import logging
+import threading
+import itertools
+from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, List, Any, Iterator
+from core.logger import get_logger
+
+class Span:
+    """One timed step of a run, with its attributes (poll counts, match scores...)"""
+
+    def __init__(self, span_id: int, name: str, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.name = name
+        self.parent_id = parent_id
+        self.attrs = dict(attrs)
+        self.thread = threading.current_thread().name
+        self.thread_id = threading.get_ident()
+        self.start = time.time()
+        self._start_counter = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attrs: Any) -> None:
+        """Set attributes of the span"""
+        self.attrs.update(attrs)
+
+    def incr(self, key: str, amount: int = 1) -> None:
+        """Increment a counter attribute of the span (e.g. polls)"""
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Span as a JSON serializable dict"""
+        return {
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'thread': self.thread,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'error': self.error,
+            'attrs': {key: value if isinstance(value, (int, float, str, bool, type(None))) else str(value)
+                      for key, value in self.attrs.items()}
+        }
+
+class _NoopSpan:
+    """Span returned when no trace is active"""
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def incr(self, key: str, amount: int = 1) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """Collects the spans of one run and writes them to a trace file"""
+
+    def __init__(self,
+                 run_name: str,
+                 trace_dir: str = 'traces',
+                 chrome: bool = False,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            run_name: Name used in the trace file names (usually the bot name)
+            trace_dir: Directory of the trace files
+            chrome: Also write a Chrome trace (chrome://tracing, Perfetto)
+            logger: Logger instance (default: 'tracing' logger)
+        """
+        self.run_name = run_name
+        self.trace_dir = trace_dir
+        self.chrome = chrome
+        self.logger = logger or get_logger('tracing')
+        self.started_at = datetime.now()
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[Span]:
+        """Open spans of the current thread"""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span]:
+        """
+        Time a step; spans opened inside it on the same thread become its children
+
+        Args:
+            name: Step name ('navigate_to_menu', 'db.bulk_load'...)
+            **attrs: Initial attributes of the span
+
+        Yields:
+            The span, to set attributes while the step runs
+        """
+        stack = self._stack()
+        current = Span(next(self._ids), name, stack[-1].span_id if stack else None, attrs)
+        stack.append(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            current.duration = time.perf_counter() - current._start_counter
+            stack.pop()
+            with self._lock:
+                self.spans.append(current)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Aggregate the finished spans by name
+
+        Returns:
+            Dict of span name to count, total and max duration in milliseconds
+        """
+        summary: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for finished in spans:
+            entry = summary.setdefault(finished.name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            duration_ms = finished.duration * 1000
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+        return summary
+
+    def export(self) -> Optional[str]:
+        """
+        Write the spans of the run as JSON lines (and a Chrome trace if enabled)
+
+        Returns:
+            Path of the JSON lines file, or None if there was nothing to write
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda finished: finished.start)
+        if not spans:
+            return None
+
+        os.makedirs(self.trace_dir, exist_ok=True)
+        base_path = os.path.join(self.trace_dir, f"{self.run_name}_{self.started_at.strftime('%Y%m%d_%H%M%S_%f')}")
+        with open(f'{base_path}.jsonl', 'w', encoding='utf-8') as f:
+            for finished in spans:
+                f.write(json.dumps(finished.to_dict(), ensure_ascii=False) + '\n')
+
+        if self.chrome:
+            pid = os.getpid()
+            events = [{
+                'name': finished.name,
+                'cat': self.run_name,
+                'ph': 'X',
+                'ts': finished.start * 1e6,
+                'dur': finished.duration * 1e6,
+                'pid': pid,
+                'tid': finished.thread_id,
+                'args': finished.to_dict()['attrs']
+            } for finished in spans]
+            with open(f'{base_path}.trace.json', 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+        slowest = sorted(self.summary().items(), key=lambda item: item[1]['total_ms'], reverse=True)[:5]
+        self.logger.info(
+            f"Trace written to {base_path}.jsonl ({len(spans)} spans); slowest steps: " +
+            ', '.join(f"{name} {entry['total_ms'] / 1000:.2f}s x{entry['count']}" for name, entry in slowest)
+        )
+        return f'{base_path}.jsonl'
+
+# Tracer of the run in progress in this context; each run (and each scheduler
+# job thread) has its own, and Pipeline hands it to its worker threads
+_current: ContextVar[Optional[Tracer]] = ContextVar('tracer', default=None)
+
+def start_trace(run_name: str, logger: Optional[logging.Logger] = None) -> Optional[Tracer]:
+    """
+    Start the trace of a run in the current context
+
+    The caller exports it with end_trace when the run finishes. Configured
+    by TRACE_ENABLED (default 1), TRACE_DIR (default 'traces') and
+    TRACE_CHROME (default 0).
+
+    Args:
+        run_name: Name used in the trace file names
+        logger: Logger instance
+
+    Returns:
+        The tracer of the run, or None if tracing is disabled
+    """
+    if os.getenv('TRACE_ENABLED', '1') != '1':
+        return None
+    tracer = Tracer(
+        run_name,
+        trace_dir=os.getenv('TRACE_DIR', 'traces'),
+        chrome=os.getenv('TRACE_CHROME', '0') == '1',
+        logger=logger
+    )
+    _current.set(tracer)
+    return tracer
+
+def end_trace(tracer: Optional[Tracer]) -> Optional[str]:
+    """
+    Stop tracing a run in the current context and write its trace
+
+    Args:
+        tracer: Tracer returned by start_trace (None is ignored)
+
+    Returns:
+        Path of the JSON lines file, or None if nothing was written
+    """
+    if tracer is None:
+        return None
+    if _current.get() is tracer:
+        _current.set(None)
+    return tracer.export()
+
+def get_tracer() -> Optional[Tracer]:
+    """Get the tracer of the run in progress in the current context, if any"""
+    return _current.get()
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Any]:
+    """
+    Time a step in the trace of the current run (no-op without an active trace)
+
+    Args:
+        name: Step name
+        **attrs: Initial attributes of the span
+
+    Yields:
+        The span (or a no-op stand-in), to set attributes while the step runs
+    """
+    tracer = _current.get()
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+    with tracer.span(name, **attrs) as current:
+        yield current
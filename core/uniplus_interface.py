@@ -1,10 +1,84 @@
+from __future__ import annotations
 import os
 import time
-import pyautogui
-import keyboard
-from typing import Optional, Tuple, Union, List
+from typing import Optional, Tuple, Union, List, Callable, Any
+from core.lazy import lazy_import
 from core.base_bot import BaseBot
 from core.logger import setup_logger
+from core.file_watch import wait_for_saved_file
+from core.navigation import MenuRoute, get_route
+from core.uniplus_session import UniplusSession
+from core.tracing import span
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pyautogui = lazy_import('pyautogui')
+keyboard = lazy_import('keyboard')
+
+def wait_until(condition: Callable[[], Any], timeout: float = 10.0, poll_interval: float = 0.25) -> Any:
+    """
+    Poll a condition until it returns a truthy value or the timeout expires
+    
+    Args:
+        condition: Callable checked on every poll
+        timeout: Maximum time to wait in seconds
+        poll_interval: Time between polls in seconds
+        
+    Returns:
+        The first truthy value returned by the condition, None on timeout
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if result:
+            return result
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(min(poll_interval, max(0.0, deadline - time.monotonic())))
+        
+def _grab_frame(region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+    """Capture a small grayscale frame of the screen for change detection"""
+    frame = cv2.cvtColor(np.array(pyautogui.screenshot(region=region)), cv2.COLOR_RGB2GRAY)
+    return cv2.resize(frame, None, fx=0.25, fy=0.25, interpolation=cv2.INTER_AREA)
+
+def screen_stable(region: Optional[Tuple[int, int, int, int]] = None,
+                  stable_for: float = 0.5,
+                  threshold: float = 1.0) -> Callable[[], bool]:
+    """
+    Condition that holds once the screen stops changing
+    
+    Args:
+        region: (left, top, width, height) to watch (default: full screen)
+        stable_for: Seconds the frame must stay unchanged
+        threshold: Mean absolute pixel difference below which two frames are equal
+        
+    Returns:
+        Condition for wait_until
+    """
+    state = {'frame': None, 'since': None}
+    
+    def condition() -> bool:
+        frame = _grab_frame(region)
+        now = time.monotonic()
+        if state['frame'] is None or float(np.mean(cv2.absdiff(frame, state['frame']))) > threshold:
+            state['frame'] = frame
+            state['since'] = now
+            return False
+        return now - state['since'] >= stable_for
+        
+    return condition
+
+def file_appears(file_path: str) -> Callable[[], bool]:
+    """
+    Condition that holds once a non-empty file exists
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        Condition for wait_until
+    """
+    return lambda: os.path.exists(file_path) and os.path.getsize(file_path) > 0
 
 class UniplusInterface(BaseBot):
     def __init__(self, bot_name: str):
@@ -12,12 +86,15 @@ class UniplusInterface(BaseBot):
         self.uniplus_path = os.getenv('UNIPLUS_PATH', r'C:\ProgramData\Microsoft\Windows\Start Menu\Programs\Uniplus\Uniplus.lnk')
         self.screenshot_dir = os.path.join('bots', bot_name, 'screenshots')
         os.makedirs(self.screenshot_dir, exist_ok=True)
+        self.templates.warm_up(self.screenshot_dir)
+        self.session = UniplusSession(self.uniplus_path, press_key=self.press_key, logger=self.logger)
         
     def _wait_for_element(self, 
                          image_path: Optional[str] = None, 
                          text: Optional[str] = None,
                          confidence: float = 0.9,
-                         timeout: int = 10) -> Optional[Tuple[int, int]]:
+                         timeout: int = 10,
+                         text_region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int]]:
         """
         Wait for an element to appear on screen
         
@@ -26,36 +103,144 @@ class UniplusInterface(BaseBot):
             text: Text to find
             confidence: Confidence level for image matching
             timeout: Maximum time to wait in seconds
+            text_region: (left, top, width, height) read with OCR for the text
+                (default: full screen)
             
         Returns:
             Tuple of (x, y) coordinates if found, None otherwise
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if image_path:
-                try:
-                    location = pyautogui.locateCenterOnScreen(
-                        os.path.join(self.screenshot_dir, image_path),
-                        confidence=confidence
-                    )
-                    if location:
-                        return location
-                except Exception as e:
-                    self.logger.debug(f"Error finding image: {str(e)}")
+        found = self._wait_for_any([image_path] if image_path else [], text, confidence, timeout, text_region)
+        return found[1] if found else None
+        
+    def _wait_for_any(self,
+                      image_paths: List[str],
+                      text: Optional[str] = None,
+                      confidence: float = 0.9,
+                      timeout: int = 10,
+                      text_region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[str, Tuple[int, int]]]:
+        """
+        Wait for any of several candidate images (or a text) to appear on screen
+        
+        Each poll takes a single screenshot and tests every candidate against it,
+        so a missing primary image costs nothing when a fallback image is visible.
+        The region around the last known positions is tried before the full screen.
+        The text is only looked up with OCR when no image matched, and only in
+        text_region when one is given.
+        
+        Args:
+            image_paths: Paths to the candidate images, relative to the screenshot dir
+            text: Text to find
+            confidence: Confidence level for image matching
+            timeout: Maximum time to wait in seconds
+            text_region: (left, top, width, height) read with OCR for the text
+                (default: full screen)
+            
+        Returns:
+            Tuple of (matched image path or text, (x, y)) if found, None otherwise
+        """
+        candidates = {os.path.join(self.screenshot_dir, path): path for path in image_paths}
+        with span('wait_for_element', images=len(candidates), text=text) as step:
+            start_time = time.time()
+            while time.time() - start_time < timeout:
+                step.incr('polls')
+                if candidates:
+                    try:
+                        found = self._find_on_screen(list(candidates), confidence)
+                        if found:
+                            step.set(matched=os.path.basename(found[0]), score=round(found[2], 3))
+                            return candidates[found[0]], found[1]
+                    except Exception as e:
+                        self.logger.debug(f"Error finding image: {str(e)}")
+                        
+                if text:
+                    try:
+                        location = self._find_text_on_screen(text, text_region)
+                        if location:
+                            step.set(matched='text')
+                            return text, location
+                    except Exception as e:
+                        self.logger.debug(f"Error finding text: {str(e)}")
                     
-            if text:
-                # Implement OCR text detection here if needed
-                pass
+                time.sleep(0.5)
                 
-            time.sleep(0.5)
+            return None
+        
+    def template_appears(self, image_paths: List[str], confidence: float = 0.9) -> Callable[[], Any]:
+        """
+        Condition that holds once any of the images is on screen
+        
+        Args:
+            image_paths: Paths to the candidate images, relative to the screenshot dir
+            confidence: Confidence level for image matching
             
-        return None
+        Returns:
+            Condition for wait_until
+        """
+        paths = [os.path.join(self.screenshot_dir, path) for path in image_paths]
+        return lambda: self._find_on_screen(paths, confidence)
+        
+    def template_disappears(self, image_paths: List[str], confidence: float = 0.9) -> Callable[[], bool]:
+        """
+        Condition that holds once none of the images is on screen
+        
+        Args:
+            image_paths: Paths to the images, relative to the screenshot dir
+            confidence: Confidence level for image matching
+            
+        Returns:
+            Condition for wait_until
+        """
+        appears = self.template_appears(image_paths, confidence)
+        return lambda: not appears()
+        
+    def wait_until(self,
+                   condition: Callable[[], Any],
+                   timeout: float = 10.0,
+                   poll_interval: float = 0.25,
+                   description: str = 'condition') -> Any:
+        """
+        Wait for a condition and log how long it took
+        
+        Args:
+            condition: Callable checked on every poll (see screen_stable, file_appears,
+                template_appears, template_disappears)
+            timeout: Maximum time to wait in seconds
+            poll_interval: Time between polls in seconds
+            description: Text used in the log messages
+            
+        Returns:
+            The first truthy value returned by the condition, None on timeout
+        """
+        start_time = time.monotonic()
+        result = wait_until(condition, timeout, poll_interval)
+        elapsed = time.monotonic() - start_time
+        if result:
+            self.logger.debug(f"Waited {elapsed:.2f}s for {description}")
+        else:
+            self.logger.warning(f"Timed out after {elapsed:.2f}s waiting for {description}")
+        return result
+        
+    def _wait_for_screen_stable(self, timeout: float = 5.0, stable_for: float = 0.3) -> bool:
+        """
+        Wait until the ERP stops redrawing the screen
+        
+        Args:
+            timeout: Maximum time to wait in seconds
+            stable_for: Seconds the screen must stay unchanged
+            
+        Returns:
+            True if the screen settled, False on timeout
+        """
+        return bool(self.wait_until(
+            screen_stable(stable_for=stable_for), timeout, poll_interval=0.1, description='screen to settle'
+        ))
         
     def _click_element(self, 
                       image_path: Optional[str] = None,
                       text: Optional[str] = None,
                       confidence: float = 0.9,
-                      timeout: int = 10) -> bool:
+                      timeout: int = 10,
+                      text_region: Optional[Tuple[int, int, int, int]] = None) -> bool:
         """
         Click on an element
         
@@ -64,25 +249,92 @@ class UniplusInterface(BaseBot):
             text: Text to find
             confidence: Confidence level for image matching
             timeout: Maximum time to wait in seconds
+            text_region: (left, top, width, height) read with OCR for the text
+                (default: full screen)
             
         Returns:
             True if clicked successfully, False otherwise
         """
-        location = self._wait_for_element(image_path, text, confidence, timeout)
+        location = self._wait_for_element(image_path, text, confidence, timeout, text_region)
         if location:
             pyautogui.click(location)
             return True
         return False
         
-    def _type_text(self, text: str, interval: float = 0.1):
+    def _click_text(self,
+                    text: str,
+                    timeout: int = 10,
+                    region: Optional[Tuple[int, int, int, int]] = None) -> bool:
         """
-        Type text with specified interval
+        Click on a text found with OCR
+        
+        Args:
+            text: Text to find
+            timeout: Maximum time to wait in seconds
+            region: (left, top, width, height) where the text shows (default: full screen)
+            
+        Returns:
+            True if clicked successfully, False otherwise
+        """
+        return self._click_element(text=text, timeout=timeout, text_region=region)
+        
+    def screen_region(self,
+                      fractions: Optional[Tuple[float, float, float, float]]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Convert a region given in fractions of the screen to pixels
+        
+        Args:
+            fractions: (left, top, width, height) between 0 and 1, or None
+            
+        Returns:
+            (left, top, width, height) in pixels, None for the full screen
+        """
+        if not fractions:
+            return None
+        screen_width, screen_height = pyautogui.size()
+        left, top, width, height = fractions
+        return (
+            int(left * screen_width), int(top * screen_height),
+            max(1, int(width * screen_width)), max(1, int(height * screen_height))
+        )
+        
+    def _click_any_element(self,
+                           image_paths: List[str],
+                           confidence: float = 0.9,
+                           timeout: int = 10) -> Optional[str]:
+        """
+        Click on the first of several candidate images to appear
+        
+        Args:
+            image_paths: Paths to the candidate images
+            confidence: Confidence level for image matching
+            timeout: Maximum time to wait in seconds
+            
+        Returns:
+            Path of the image that was clicked, None if none appeared
+        """
+        found = self._wait_for_any(image_paths, confidence=confidence, timeout=timeout)
+        if found:
+            pyautogui.click(found[1])
+            return found[0]
+        return None
+        
+    def _type_text(self,
+                   text: str,
+                   interval: float = 0.1,
+                   field: Optional[str] = None,
+                   strategy: Optional[str] = None):
+        """
+        Type text into the focused field
         
         Args:
             text: Text to type
-            interval: Time between keystrokes
+            interval: Time between keystrokes when typing key by key
+            field: Identifier of the field, to verify the text and remember
+                the fastest strategy that works for it
+            strategy: Strategy forced for this field ('paste', 'bulk', 'per_key')
         """
-        pyautogui.write(text, interval=interval)
+        self.type_text(text, interval=interval, field=field, strategy=strategy)
         
     def _press_keys(self, *keys: str):
         """
@@ -91,7 +343,7 @@ class UniplusInterface(BaseBot):
         Args:
             *keys: Keys to press
         """
-        pyautogui.hotkey(*keys)
+        self.press_hotkey(*keys)
         
     def _press_key(self, key: str):
         """
@@ -100,124 +352,186 @@ class UniplusInterface(BaseBot):
         Args:
             key: Key to press
         """
-        pyautogui.press(key)
+        self.press_key(key)
         
     def open_uniplus(self) -> bool:
         """
-        Open Uniplus application
+        Bring Uniplus to its main screen, launching it only if it is not running
+        
+        A Uniplus left open by a previous run is reused, so bots running back
+        to back share one warm ERP instance. The main screen is recognized by
+        uniplus_home.png in the screenshots dir when that image exists.
         
         Returns:
             True if opened successfully, False otherwise
         """
         try:
-            os.startfile(self.uniplus_path)
-            time.sleep(1)
-            # Press ESC multiple times to clear any popups
-            for _ in range(9):
-                self._press_key('esc')
-                time.sleep(0.1)
+            with span('open_uniplus') as step:
+                state = self.session.start()
+                step.set(session=state)
+                if state == 'launched':
+                    self._wait_for_screen_stable(timeout=30, stable_for=1.0)
+                    
+                # Press ESC to clear any popups or screens left open
+                home_templates = ['uniplus_home.png']
+                at_home = None
+                if self.templates.size(os.path.join(self.screenshot_dir, home_templates[0])):
+                    at_home = self.template_appears(home_templates)
+                if not self.session.go_home(at_home):
+                    self.logger.warning("Uniplus main screen not recognized after closing popups")
+                self._wait_for_screen_stable()
             self.logger.info("Uniplus opened successfully")
             return True
         except Exception as e:
             self.logger.error(f"Error opening Uniplus: {str(e)}")
             return False
             
-    def navigate_to_menu(self, menu_path: List[str], image_prefix: str = 'screenshots/') -> bool:
+    def navigate_to_menu(self, menu_path: List[str], image_prefix: str = '') -> bool:
         """
-        Navigate through the Uniplus menu using multiple methods
+        Navigate through the Uniplus menu following its route in the navigation map
+        
+        The strategies declared for the path (key sequence, coordinates,
+        templates) are tried fastest first. After each one the destination
+        screen is verified; on a failure the open menus are closed and the
+        next strategy is tried.
         
         Args:
             menu_path: List of menu items to navigate through
-            image_prefix: Prefix for image paths (default: 'screenshots/')
+            image_prefix: Prefix of the default template paths inside the screenshots dir
             
         Returns:
             bool: True if navigation successful, False otherwise
         """
-        try:
-            for menu_item in menu_path:
-                menu_found = False
-                
-                # Method 1: Try with primary image
-                image_path = f'{image_prefix}{menu_item}_1.png'
-                if self._click_element(image_path=image_path):
-                    menu_found = True
-                    self.logger.info(f"Found menu item '{menu_item}' using primary image")
-                
-                # Method 2: Try with secondary image
-                if not menu_found:
-                    image_path = f'{image_prefix}{menu_item}_2.png'
-                    if self._click_element(image_path=image_path):
-                        menu_found = True
-                        self.logger.info(f"Found menu item '{menu_item}' using secondary image")
-                
-                # Method 3: Try with coordinates from env
-                if not menu_found:
-                    # Get coordinates from environment variables
-                    x = os.getenv(f'MENU_{menu_item.upper()}_X')
-                    y = os.getenv(f'MENU_{menu_item.upper()}_Y')
-                    
-                    if x is not None and y is not None:
-                        try:
-                            x = int(x)
-                            y = int(y)
-                            if self._click_coordinates(x, y):
-                                menu_found = True
-                                self.logger.info(f"Found menu item '{menu_item}' using coordinates ({x}, {y})")
-                        except ValueError:
-                            self.logger.warning(f"Invalid coordinates for menu item '{menu_item}': x={x}, y={y}")
-                
-                if not menu_found:
-                    self.logger.error(f"Could not find menu item: {menu_item}")
-                    return False
-                
-                time.sleep(2)  # Wait for menu to load
+        route = get_route(menu_path, image_prefix)
+        strategies = route.available_strategies()
+        if not route.verifiable:
+            # Without a way to check the destination a wrong click cannot be
+            # detected, so blind coordinates are only used as a per-level fallback
+            strategies = [strategy for strategy in strategies if strategy != 'coordinates'][:1]
+            
+        for strategy in strategies:
+            with span('navigate_to_menu', path='/'.join(menu_path), strategy=strategy) as step:
+                try:
+                    start_time = time.monotonic()
+                    if getattr(self, f'_navigate_by_{strategy}')(route) and self._verify_route(route):
+                        step.set(success=True)
+                        self.logger.info(
+                            f"Navigated to {'/'.join(menu_path)} by {strategy} in {time.monotonic() - start_time:.2f}s"
+                        )
+                        return True
+                    self.logger.warning(f"Navigation to {'/'.join(menu_path)} by {strategy} failed")
+                except Exception as e:
+                    self.logger.error(f"Error navigating menu by {strategy}: {str(e)}")
                 
+            # Close whatever the failed attempt left open before the next one
+            for _ in menu_path:
+                self._press_key('esc')
+            self._wait_for_screen_stable()
+            
+        self.logger.error(f"Could not navigate to {'/'.join(menu_path)}")
+        return False
+        
+    def _navigate_by_keys(self, route: MenuRoute) -> bool:
+        """Send the declared key sequence of a route"""
+        for key in route.keys:
+            if '+' in key:
+                self._press_keys(*key.split('+'))
+            else:
+                self._press_key(key)
+        self._wait_for_screen_stable()
+        return True
+        
+    def _navigate_by_coordinates(self, route: MenuRoute) -> bool:
+        """Click the declared position of each level of a route"""
+        for menu_item, (x, y) in zip(route.path, route.coordinates):
+            if not self._click_coordinates(x, y):
+                return False
+            self.logger.debug(f"Clicked menu item '{menu_item}' at ({x}, {y})")
+            self._wait_for_screen_stable()  # Wait for menu to load
+        return True
+        
+    def _navigate_by_templates(self, route: MenuRoute) -> bool:
+        """Find and click each level of a route, falling back to its coordinates"""
+        for level, menu_item in enumerate(route.path):
+            # Try primary and secondary images against the same screenshots
+            matched_image = self._click_any_element(route.templates[level])
+            if matched_image:
+                self.logger.info(f"Found menu item '{menu_item}' using image {matched_image}")
+            elif route.coordinates and self._click_coordinates(*route.coordinates[level]):
+                self.logger.info(f"Found menu item '{menu_item}' using coordinates {route.coordinates[level]}")
+            else:
+                self.logger.error(f"Could not find menu item: {menu_item}")
+                return False
+            self._wait_for_screen_stable()  # Wait for menu to load
+        return True
+        
+    def _verify_route(self, route: MenuRoute) -> bool:
+        """Check that the destination screen of a route is showing"""
+        if not route.verifiable:
             return True
             
-        except Exception as e:
-            self.logger.error(f"Error navigating menu: {str(e)}")
-            return False
+        def destination_showing():
+            if route.expect and self.template_appears(route.expect)():
+                return True
+            return bool(route.expect_text and self._find_text_on_screen(
+                route.expect_text, self.screen_region(route.text_region)
+            ))
             
-    def save_report(self, filename: str, output_folder: str) -> bool:
+        return bool(self.wait_until(
+            destination_showing, route.expect_timeout, poll_interval=0.5,
+            description=f"{'/'.join(route.path)} screen"
+        ))
+        
+    def save_report(self, filename: str, output_folder: str, timeout: float = 120.0) -> bool:
         """
-        Save a report to the specified folder
+        Save a report to the specified folder and wait until the file is complete
         
         Args:
-            filename: Name of the file to save
+            filename: Name of the file to save (.xlsx is assumed without extension)
             output_folder: Folder to save the file in
+            timeout: Maximum time to wait for the file to be written, in seconds
             
         Returns:
-            True if saved successfully, False otherwise
+            True if the file was saved and is a valid workbook, False otherwise
         """
-        try:
-            # Press F12 to open save dialog
-            self._press_key('f12')
-            time.sleep(0.5)
-            
-            # Type filename
-            self._type_text(filename)
-            time.sleep(0.5)
-            
-            # Press F4 to focus on folder input
-            self._press_key('f4')
-            time.sleep(0.5)
-            
-            # Type folder path
-            self._press_keys('ctrl', 'a')  # Select all
-            self._type_text(output_folder)
-            time.sleep(0.5)
-            
-            # Press Enter and Alt+S to save
-            self._press_key('enter')
-            time.sleep(0.5)
-            self._press_keys('alt', 's')
-            
-            self.logger.info(f"Report saved as {filename} in {output_folder}")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Error saving report: {str(e)}")
-            return False
+        with span('save_report', filename=filename) as step:
+            try:
+                # Press F12 to open save dialog
+                self._press_key('f12')
+                self._wait_for_screen_stable(stable_for=0.2)
+                
+                # Type filename
+                self._type_text(filename, field='save_filename')
+                
+                # Press F4 to focus on folder input
+                self._press_key('f4')
+                self._wait_for_screen_stable(stable_for=0.2)
+                
+                # Type folder path
+                self._press_keys('ctrl', 'a')  # Select all
+                self._type_text(output_folder, field='save_folder')
+                
+                # Press Enter and Alt+S to save
+                self._press_key('enter')
+                self._wait_for_screen_stable(stable_for=0.2)
+                started_at = time.time()
+                self._press_keys('alt', 's')
+                
+                file_path = os.path.join(output_folder, filename)
+                if not os.path.splitext(filename)[1]:
+                    file_path += '.xlsx'
+                duration = wait_for_saved_file(file_path, started_at, timeout=timeout, logger=self.logger)
+                step.set(save_seconds=round(duration, 3) if duration is not None else None)
+                if duration is None:
+                    self.logger.error(f"Report {filename} was not saved in {output_folder}")
+                    return False
+                    
+                self.logger.info(f"Report saved as {filename} in {output_folder} ({duration:.2f}s)")
+                return True
+                
+            except Exception as e:
+                self.logger.error(f"Error saving report: {str(e)}")
+                return False
 
     def _click_coordinates(self, x: int, y: int) -> bool:
         """
@@ -0,0 +1,148 @@
+import os
+import time
+import logging
+from typing import Optional, Callable, Any
+from core.lazy import lazy_import
+from core.logger import get_logger
+
+pyautogui = lazy_import('pyautogui')
+
+try:
+    import pygetwindow
+except (ImportError, NotImplementedError):
+    # Window detection is only available on Windows; elsewhere Uniplus is always launched
+    pygetwindow = None
+
+class UniplusSession:
+    """Reuses a running Uniplus window and launches the ERP only when it is not open"""
+
+    def __init__(self,
+                 uniplus_path: str,
+                 window_title: Optional[str] = None,
+                 press_key: Optional[Callable[[str], Any]] = None,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            uniplus_path: Shortcut or executable that starts Uniplus
+            window_title: Text in the title of the Uniplus main window
+                (default: UNIPLUS_WINDOW_TITLE env or 'Uniplus')
+            press_key: Sends a key (default: pyautogui.press); bots pass their
+                own so the ESC presses are not taken for an emergency stop
+            logger: Logger instance (default: 'uniplus_session' logger)
+        """
+        self.uniplus_path = uniplus_path
+        self.window_title = window_title or os.getenv('UNIPLUS_WINDOW_TITLE', 'Uniplus')
+        self.press_key = press_key or (lambda key: pyautogui.press(key))
+        self.logger = logger or get_logger('uniplus_session')
+
+    def find_window(self) -> Optional[Any]:
+        """
+        Get the Uniplus main window if it is open
+
+        Windows whose title mentions a login are ignored, so a session stuck
+        at the login screen is not mistaken for a warm one.
+
+        Returns:
+            pygetwindow window, or None
+        """
+        if pygetwindow is None:
+            return None
+        for window in pygetwindow.getWindowsWithTitle(self.window_title):
+            if window.title and 'login' not in window.title.lower():
+                return window
+        return None
+
+    def activate(self, window: Any) -> bool:
+        """
+        Bring a window to the front, maximized
+
+        Args:
+            window: pygetwindow window
+
+        Returns:
+            True if the window is in the foreground, False otherwise
+        """
+        try:
+            if window.isMinimized:
+                window.restore()
+            try:
+                window.activate()
+            except Exception:
+                # Windows refuses focus changes from background processes;
+                # minimizing and restoring the window works around it
+                window.minimize()
+                window.restore()
+            if not window.isMaximized:
+                window.maximize()
+            return True
+        except Exception as e:
+            self.logger.warning(f"Could not activate Uniplus window: {str(e)}")
+            return False
+
+    def start(self, timeout: float = 60.0, activate_attempts: int = 3, retry_delay: float = 1.0) -> str:
+        """
+        Make sure Uniplus is open and in the foreground
+
+        A running Uniplus is never launched again: if its window cannot be
+        brought to the front, the run fails instead of opening a second instance.
+
+        Args:
+            timeout: Maximum time to wait for the window of a launched Uniplus
+            activate_attempts: Times a running window is brought to the front before giving up
+            retry_delay: Seconds between activation attempts
+
+        Returns:
+            'reused' if a running Uniplus was brought to the front,
+            'launched' if the application was started
+
+        Raises:
+            RuntimeError: If Uniplus is running but its window cannot be activated
+        """
+        window = self.find_window()
+        for attempt in range(activate_attempts):
+            if window is None:
+                break
+            if self.activate(window):
+                self.logger.info(f"Reusing running Uniplus window '{window.title}'")
+                return 'reused'
+            if attempt + 1 < activate_attempts:
+                time.sleep(retry_delay)
+                # The window may have been closed or recreated meanwhile
+                window = self.find_window()
+        if window is not None:
+            raise RuntimeError(
+                f"Uniplus window '{window.title}' is open but could not be activated; not launching a second instance"
+            )
+
+        self.logger.info("Uniplus is not running; launching it")
+        os.startfile(self.uniplus_path)
+        if pygetwindow is not None:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                window = self.find_window()
+                if window:
+                    self.activate(window)
+                    break
+                time.sleep(0.5)
+            else:
+                self.logger.warning(f"Uniplus window did not show up within {timeout:.0f}s")
+        return 'launched'
+
+    def go_home(self, at_home: Optional[Callable[[], Any]] = None, max_presses: int = 9) -> bool:
+        """
+        Close open screens and popups until the main screen shows
+
+        Args:
+            at_home: Condition that holds on the main screen; without it
+                ESC is pressed max_presses times
+            max_presses: Maximum number of ESC presses
+
+        Returns:
+            True if the main screen was reached (or cannot be checked), False otherwise
+        """
+        for presses in range(max_presses):
+            if at_home and at_home():
+                self.logger.debug(f"Reached the Uniplus main screen after {presses} ESC presses")
+                return True
+            self.press_key('esc')
+        return bool(at_home()) if at_home else True
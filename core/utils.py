@@ -1,8 +1,13 @@
+from __future__ import annotations
 import os
-import pandas as pd
-from typing import Optional, List, Dict, Any
+from collections import deque
+from typing import Optional, List, Dict, Any, Iterator
 from datetime import datetime
 import logging
+from core.lazy import lazy_import
+
+pd = lazy_import('pandas')
+openpyxl = lazy_import('openpyxl')
 
 def setup_project_structure():
     """Create necessary directories for the project"""
@@ -24,16 +29,107 @@ def read_excel_to_dataframe(file_path: str, header_row: int = 0) -> Optional[pd.
         file_path: Path to the Excel file
         header_row: Row number to use as header (0-based)
         
+    Returns:
+        DataFrame if successful, None otherwise
+    """
+    return read_excel_streaming(file_path, header_row=header_row)
+
+def iter_excel_chunks(file_path: str,
+                      header_row: int = 0,
+                      header_marker: Optional[Any] = None,
+                      footer_rows: int = 0,
+                      chunk_size: int = 5000,
+                      sheet_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream an Excel sheet as DataFrame chunks without loading the whole workbook
+    
+    The sheet is read with openpyxl in read-only mode, so only the rows of the
+    current chunk are kept in memory. Cell values keep the types stored in the
+    file (numbers, dates, text) and blank rows are skipped.
+    
+    Args:
+        file_path: Path to the Excel file
+        header_row: Row number to use as header (0-based, ignoring blank rows)
+        header_marker: If given, the first row whose first cell equals this value
+            is used as header instead of header_row
+        footer_rows: Number of rows at the end of the sheet to drop
+        chunk_size: Maximum number of rows per chunk
+        sheet_name: Sheet to read (default: active sheet)
+        
+    Yields:
+        DataFrames with the header as columns; a single empty one when the
+        header has no rows below it, so a sheet without data can be told
+        apart from a sheet without the header
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = (
+            [_convert_cell(value) for value in row]
+            for row in sheet.iter_rows(values_only=True)
+            if any(value is not None for value in row)
+        )
+        
+        # Find the header row on the fly
+        header = None
+        for index, row in enumerate(rows):
+            if header_marker is not None:
+                if row[0] == header_marker:
+                    header = row
+                    break
+            elif index == header_row:
+                header = row
+                break
+        if header is None:
+            return
+            
+        columns = [value if value is not None else f'Unnamed: {i}' for i, value in enumerate(header)]
+        width = len(columns)
+        
+        # Hold the last footer_rows rows back until we know they are not the footer
+        pending = deque()
+        chunk = []
+        chunks = 0
+        for row in rows:
+            pending.append((row + [None] * width)[:width])
+            if len(pending) > footer_rows:
+                chunk.append(pending.popleft())
+                if len(chunk) >= chunk_size:
+                    yield pd.DataFrame(chunk, columns=columns, dtype=object)
+                    chunks += 1
+                    chunk = []
+        if chunk or not chunks:
+            yield pd.DataFrame(chunk, columns=columns, dtype=object)
+    finally:
+        workbook.close()
+
+def read_excel_streaming(file_path: str, **kwargs) -> Optional[pd.DataFrame]:
+    """
+    Read an Excel file with the streaming reader and concatenate the chunks
+    
+    Args:
+        file_path: Path to the Excel file
+        **kwargs: Arguments passed to iter_excel_chunks
+        
     Returns:
         DataFrame if successful, None otherwise
     """
     try:
-        df = pd.read_excel(file_path, header=header_row)
-        return df
+        chunks = list(iter_excel_chunks(file_path, **kwargs))
+        if not chunks:
+            logging.error(f"No header row found in Excel file: {file_path}")
+            return None
+        return pd.concat(chunks, ignore_index=True)
     except Exception as e:
         logging.error(f"Error reading Excel file: {str(e)}")
         return None
 
+def _convert_cell(value: Any) -> Any:
+    """Convert integral floats to int, like pandas does when reading Excel files"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
 def save_dataframe_to_excel(df: pd.DataFrame, file_path: str) -> bool:
     """
     Save a pandas DataFrame to an Excel file
@@ -1,35 +1,207 @@
 import argparse
-import importlib
+import json
 import os
+import sys
+import threading
+from datetime import datetime, date
 from core.utils import setup_project_structure
 from core.logger import setup_logger
+from core.registry import discover_bots, get_bot
+
+def parse_date(value: str) -> date:
+    """Parse a command line date in dd/mm/yyyy or yyyy-mm-dd format"""
+    for date_format in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Invalid date: {value} (use dd/mm/yyyy or yyyy-mm-dd)")
+
+def list_bots() -> None:
+    """Print the registered bots without importing them"""
+    for name, spec in sorted(discover_bots().items()):
+        flags = ', '.join(flag for flag, enabled in (('gui', spec.gui), ('backfill', spec.backfill)) if enabled)
+        print(f"{name:<20} {spec.description or spec.target}" + (f" [{flags}]" if flags else ''))
+
+def check_bot(name: str, method: str = None) -> str:
+    """
+    Import a bot class, without creating it, and check it has a method
+
+    Returns:
+        The method checked (the bot's default one if not given)
+
+    Raises:
+        KeyError, ImportError or AttributeError describing the problem
+    """
+    spec = get_bot(name)
+    method = method or spec.method
+    bot_class = spec.load()
+    if not callable(getattr(bot_class, method, None)):
+        raise AttributeError(f"Bot {name} ({spec.target}) has no method {method}")
+    return method
+
+def migrate_tables(logger) -> None:
+    """
+    Convert the columns of the existing tables to their declared types and
+    delete duplicate keys before creating the unique indexes
+
+    Raises:
+        Exception describing the first table that could not be converted
+    """
+    from core.database_manager import DatabaseManager
+    from core.schema import TABLE_SCHEMAS, TABLE_UNIQUE_KEYS, get_column_types
+    
+    with DatabaseManager() as db:
+        for table_name, schema in TABLE_SCHEMAS.items():
+            converted = db.migrate_column_types(table_name, get_column_types(schema))
+            if converted:
+                logger.info(f"Converted {len(converted)} columns of {table_name}: {', '.join(converted)}")
+            else:
+                logger.info(f"Columns of {table_name} already have their declared types")
+        # Duplicate keys left by loads older than the unique index are removed once here
+        for table_name, columns in TABLE_UNIQUE_KEYS.items():
+            db.ensure_table(table_name, get_column_types(TABLE_SCHEMAS[table_name]))
+            db.ensure_unique_index(table_name, columns)
+
+def load_jobs(config_path: str, logger, check: bool = False):
+    """
+    Build the scheduler jobs from a JSON schedule file
+    
+    Each entry has name, bot, cron and optionally method (default: the bot's
+    own), kwargs, gui (default: the bot's own) and catch_up (default true).
+    Bot names are checked against the registry here, but bot modules are only
+    imported on the first run of their job. The bot is then reused by the next
+    runs, so templates, loggers and database connections stay warm.
+    
+    With check, every bot class is imported and its method looked up now.
+    """
+    from core.scheduler import Job
+    from core.tracing import start_trace, end_trace
+    
+    with open(config_path, 'r') as f:
+        entries = json.load(f)['jobs']
+        
+    def make_target(entry, spec):
+        bots = {}
+        lock = threading.Lock()
+        
+        def target():
+            with lock:
+                bot = bots.get('instance')
+                if bot is None:
+                    bot = bots['instance'] = spec.load()()
+                # BaseBot bots trace each of their runs; other bots get a trace per job run
+                from core.base_bot import BaseBot
+                tracer = None if isinstance(bot, BaseBot) else start_trace(entry['bot'], logger=logger)
+                try:
+                    getattr(bot, entry.get('method', spec.method))(**entry.get('kwargs', {}))
+                finally:
+                    end_trace(tracer)
+                
+        return target
+        
+    jobs = []
+    for entry in entries:
+        spec = get_bot(entry['bot'])
+        if check:
+            check_bot(entry['bot'], entry.get('method'))
+        jobs.append(Job(
+            entry['name'],
+            entry['cron'],
+            make_target(entry, spec),
+            gui=entry.get('gui', spec.gui),
+            catch_up=entry.get('catch_up', True)
+        ))
+        logger.info(f"Scheduled {entry['name']}: {entry['bot']}.{entry.get('method', spec.method)} at '{entry['cron']}'")
+    return jobs
+
+def run_daemon(config_path: str, logger) -> None:
+    """Run the bots of a schedule file in one resident process until interrupted"""
+    from core.scheduler import Scheduler
+    
+    scheduler = Scheduler(
+        load_jobs(config_path, logger),
+        status_file=os.getenv('SCHEDULER_STATUS_FILE', os.path.join('status', 'scheduler.json')),
+        max_workers=int(os.getenv('SCHEDULER_MAX_WORKERS', '4')),
+        logger=logger
+    )
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
 
 def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='RPA Bots Manager')
+    parser.add_argument('--bot', type=str, help='Name of the bot to run (see --list)')
+    parser.add_argument('--list', action='store_true', help='List the available bots and exit')
+    parser.add_argument('--dry-run', action='store_true', help='Check the bot or schedule file and exit without running it')
+    parser.add_argument('--config', type=str, help='Path to configuration file (schedule file with --daemon)')
+    parser.add_argument('--daemon', action='store_true', help='Run the bots of the schedule file on their cron schedules')
+    parser.add_argument('--start', type=parse_date, help='First day to backfill (bots with run_backfill)')
+    parser.add_argument('--end', type=parse_date, help='Last day to backfill (default: --start)')
+    parser.add_argument('--chunk-days', type=int, default=1, help='Maximum number of days per exported report')
+    parser.add_argument('--migrate', action='store_true', help='Convert existing tables to the declared column types and exit')
+    args = parser.parse_args()
+    if args.list:
+        list_bots()
+        return
+    if args.end and not args.start:
+        parser.error('--end requires --start')
+    if not args.daemon and not args.bot and not args.migrate:
+        parser.error('--bot is required unless --daemon, --list or --migrate is given')
+        
     # Setup project structure
     setup_project_structure()
     
     # Setup main logger
     logger = setup_logger('main')
     
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description='RPA Bots Manager')
-    parser.add_argument('--bot', type=str, required=True, help='Name of the bot to run')
-    parser.add_argument('--config', type=str, help='Path to configuration file')
-    args = parser.parse_args()
+    if args.migrate:
+        try:
+            migrate_tables(logger)
+        except Exception as e:
+            logger.error(f"Migration failed: {str(e)}")
+            sys.exit(1)
+        return
     
-    try:
-        # Import the bot module
-        bot_module = importlib.import_module(f'bots.{args.bot}.bot')
+    if args.dry_run:
+        try:
+            if args.daemon:
+                jobs = load_jobs(args.config or 'schedule.json', logger, check=True)
+                logger.info(f"Dry run OK: {len(jobs)} jobs in {args.config or 'schedule.json'}")
+            else:
+                method = check_bot(args.bot, 'run_backfill' if args.start else None)
+                logger.info(f"Dry run OK: {args.bot}.{method}")
+        except Exception as e:
+            logger.error(f"Dry run failed: {e.args[0] if isinstance(e, KeyError) else str(e)}")
+            sys.exit(1)
+        return
         
+    if args.daemon:
+        run_daemon(args.config or 'schedule.json', logger)
+        return
+    
+    try:
         # Create bot instance
-        bot_class = getattr(bot_module, f'{args.bot.capitalize()}Bot')
-        bot = bot_class()
+        spec = get_bot(args.bot)
+        bot = spec.load()()
         
-        # Run the bot
-        logger.info(f"Starting bot: {args.bot}")
-        bot.run()
+        # Run the bot, or backfill a date range in one session
+        if args.start:
+            if not hasattr(bot, 'run_backfill'):
+                logger.error(f"Bot {args.bot} does not support backfill")
+                return
+            end = args.end or args.start
+            logger.info(f"Starting backfill of bot {args.bot}: {args.start} to {end}")
+            bot.run_backfill(args.start, end, args.chunk_days)
+        else:
+            logger.info(f"Starting bot: {args.bot}")
+            getattr(bot, spec.method)()
         logger.info(f"Bot {args.bot} completed successfully")
         
+    except KeyError as e:
+        logger.error(e.args[0])
     except ImportError as e:
         logger.error(f"Error importing bot module: {str(e)}")
     except AttributeError as e:
@@ -38,4 +210,4 @@ def main():
         logger.error(f"Error running bot: {str(e)}")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file